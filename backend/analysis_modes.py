@@ -0,0 +1,93 @@
+"""
+Latency-tiered analysis modes
+Named presets that trade thoroughness for speed on /analyze-video
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class AnalysisMode:
+    """Frame budget, ensemble subset, decode backend and heuristics for one tier"""
+    name: str
+    max_frames: int
+    max_models: Optional[int]  # None means every loaded ensemble member
+    decode_backend: str        # "seek" (random access) or "sequential" (grab/retrieve scan)
+    quality_analysis: bool     # run the face quality / artifact heuristics
+    description: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+ANALYSIS_MODES: Dict[str, AnalysisMode] = {
+    "fast": AnalysisMode(
+        name="fast",
+        max_frames=8,
+        max_models=2,
+        decode_backend="seek",
+        quality_analysis=False,
+        description="8 frames, 2 models, no artifact heuristics"
+    ),
+    "standard": AnalysisMode(
+        name="standard",
+        max_frames=32,
+        max_models=None,
+        decode_backend="seek",
+        quality_analysis=True,
+        description="32 frames, full ensemble, artifact heuristics"
+    ),
+    "forensic": AnalysisMode(
+        name="forensic",
+        max_frames=64,
+        max_models=None,
+        decode_backend="sequential",
+        quality_analysis=True,
+        description="64 frames, full ensemble, full quality analysis"
+    ),
+}
+
+DEFAULT_MODE = "standard"
+
+# Order in which the load governor steps requests down when the service is saturated
+DEGRADATION_LADDER = ["forensic", "standard", "fast"]
+
+
+def get_analysis_mode(name: Optional[str]) -> AnalysisMode:
+    """Resolve a mode name, raising ValueError for unknown modes"""
+    mode_name = (name or DEFAULT_MODE).lower()
+    if mode_name not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{name}'. Choose from: {', '.join(ANALYSIS_MODES)}")
+    return ANALYSIS_MODES[mode_name]
+
+
+class ModeLatencyTracker:
+    """Keeps a rolling window of measured latencies per analysis mode"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(mode, deque(maxlen=self.window)).append(seconds)
+
+    def snapshot(self, mode: str) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._samples.get(mode, ()))
+        if not samples:
+            return {"samples": 0}
+        return {
+            "samples": len(samples),
+            "avg_seconds": round(float(np.mean(samples)), 2),
+            "p50_seconds": round(float(np.percentile(samples, 50)), 2),
+            "p95_seconds": round(float(np.percentile(samples, 95)), 2),
+        }
+
+    def all_snapshots(self) -> Dict[str, Dict[str, Any]]:
+        return {mode: self.snapshot(mode) for mode in ANALYSIS_MODES}
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Merkle anchoring of verification hashes
+Records without a leaf are sealed into batches in id order. A batch closes when
+MERKLE_BATCH_SIZE records are waiting or the oldest has waited
+MERKLE_BATCH_SECONDS. Each batch stores its root, and each record gets its
+leaf index and packed inclusion proof, so proving one record against a
+published root takes O(log n) hashes.
+
+Seal or audit by hand:
+    python anchoring.py seal [--force] [--all]
+    python anchoring.py audit [--batch 12]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import pytz
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import SessionLocal, AsyncSessionLocal, MerkleBatch, MerkleLeaf, VerificationRecord
+from merkle import build_levels, inclusion_proof, leaf_hash, proof_steps, root_from_proof
+
+MERKLE_BATCH_SIZE = int(os.getenv("MERKLE_BATCH_SIZE", "1024"))
+MERKLE_BATCH_SECONDS = float(os.getenv("MERKLE_BATCH_SECONDS", "60"))
+# How far back each seal looks for records below the newest sealed id.
+# PostgreSQL hands out ids before commit, so a slow transaction (or a group
+# commit) can commit a lower id after a higher one was sealed; such records are
+# found by created_at. 'anchoring.py seal --all' checks the whole table.
+MERKLE_LOOKBACK_SECONDS = float(os.getenv("MERKLE_LOOKBACK_SECONDS", "3600"))
+SEAL_INTERVAL_SECONDS = 5
+
+
+def _now() -> datetime:
+    return datetime.now(pytz.timezone('Asia/Kolkata')).replace(tzinfo=None)
+
+
+def seal_batch(session: Session, records) -> MerkleBatch:
+    """Build the tree over (id, analysis_id, verification_hash) rows and persist root and proofs"""
+    levels = build_levels([leaf_hash(analysis_id, verification_hash) for _, analysis_id, verification_hash in records])
+    batch = MerkleBatch(
+        root=levels[-1][0].hex(),
+        leaf_count=len(records),
+        first_record_id=records[0][0],
+        last_record_id=records[-1][0],
+        sealed_at=_now(),
+    )
+    session.add(batch)
+    session.flush()
+    session.execute(MerkleLeaf.__table__.insert(), [
+        {"record_id": record[0], "batch_id": batch.id, "leaf_index": index, "proof": inclusion_proof(levels, index)}
+        for index, record in enumerate(records)
+    ])
+    return batch
+
+
+def unanchored_records(session: Session, full_scan: bool = False):
+    """
+    Query for records without a Merkle leaf, in id order. Only ids above the
+    newest sealed id or records from the last MERKLE_LOOKBACK_SECONDS are
+    probed, unless full_scan.
+    """
+    query = select(
+        VerificationRecord.id, VerificationRecord.analysis_id, VerificationRecord.verification_hash,
+        VerificationRecord.created_at,
+    ).where(~select(MerkleLeaf.record_id).where(MerkleLeaf.record_id == VerificationRecord.id).exists())
+    if not full_scan:
+        last_sealed = session.execute(select(func.max(MerkleBatch.last_record_id))).scalar() or 0
+        query = query.where(
+            (VerificationRecord.id > last_sealed)
+            | (VerificationRecord.created_at >= _now() - timedelta(seconds=MERKLE_LOOKBACK_SECONDS))
+        )
+    return query.order_by(VerificationRecord.id)
+
+
+def seal_due_batches(session: Session, force: bool = False, full_scan: bool = False) -> int:
+    """
+    Seal every batch that is due: full ones always, a partial one once its
+    oldest record is MERKLE_BATCH_SECONDS old (or with force). Batches take
+    records that have no leaf yet, so a record that commits after higher ids
+    were sealed goes into the next batch. Returns the number of batches sealed.
+    """
+    sealed = 0
+    now = _now()
+    while True:
+        rows = session.execute(unanchored_records(session, full_scan).limit(MERKLE_BATCH_SIZE)).all()
+        if not rows:
+            break
+        if len(rows) < MERKLE_BATCH_SIZE and not force:
+            oldest = min((created_at for *_, created_at in rows if created_at is not None), default=None)
+            if oldest is not None and oldest > now - timedelta(seconds=MERKLE_BATCH_SECONDS):
+                break
+        records = [row[:3] for row in rows]
+        seal_batch(session, records)
+        sealed += 1
+        if len(rows) < MERKLE_BATCH_SIZE:
+            break
+    return sealed
+
+
+def reset_anchors(session: Session):
+    """Drop every batch and proof; for bulk DELETEs of verification_records"""
+    session.execute(delete(MerkleLeaf))
+    session.execute(delete(MerkleBatch))
+
+
+def prune_leaves(session: Session, *conditions) -> int:
+    """
+    Forget the leaves of the records matching conditions, before retention
+    deletes them: the leaf rows go and their batches count them in
+    pruned_count, so audits expect those records to be missing. Roots and
+    leaf_count are unchanged, so the remaining proofs still verify.
+    """
+    record_ids = select(VerificationRecord.id).where(*conditions)
+    pruned = session.execute(
+        select(MerkleLeaf.batch_id, func.count()).where(MerkleLeaf.record_id.in_(record_ids)).group_by(MerkleLeaf.batch_id)
+    ).all()
+    for batch_id, count in pruned:
+        session.execute(
+            update(MerkleBatch.__table__).where(MerkleBatch.id == batch_id)
+            .values(pruned_count=MerkleBatch.pruned_count + count)
+        )
+    session.execute(delete(MerkleLeaf.__table__).where(MerkleLeaf.record_id.in_(record_ids)))
+    return sum(count for _, count in pruned)
+
+
+def build_proof(record: VerificationRecord, leaf: MerkleLeaf, batch: MerkleBatch) -> Dict[str, Any]:
+    """The /verification/{id}/proof body, with the proof recomputed against the stored root"""
+    leaf_digest = leaf_hash(record.analysis_id, record.verification_hash)
+    root = root_from_proof(leaf_digest, leaf.proof, leaf.leaf_index, batch.leaf_count)
+    return {
+        "analysis_id": record.analysis_id,
+        "verification_hash": record.verification_hash,
+        "leaf_hash": leaf_digest.hex(),
+        "batch_id": batch.id,
+        "leaf_index": leaf.leaf_index,
+        "leaf_count": batch.leaf_count,
+        "pruned_count": batch.pruned_count or 0,
+        "root": batch.root,
+        "sealed_at": batch.sealed_at.isoformat() if batch.sealed_at else None,
+        "proof": [{"position": side, "hash": digest.hex()} for side, digest in
+                  proof_steps(leaf.proof, leaf.leaf_index, batch.leaf_count)],
+        "verified": root.hex() == batch.root,
+    }
+
+
+def audit_batch(session: Session, batch: MerkleBatch) -> List[str]:
+    """
+    Check every record of a batch against its root with its own proof, O(log n)
+    hashes each. Returns the analysis_ids that fail (changed, or missing).
+    Records dropped by retention are expected to be missing.
+    """
+    rows = session.execute(
+        select(VerificationRecord.analysis_id, VerificationRecord.verification_hash,
+               MerkleLeaf.leaf_index, MerkleLeaf.proof)
+        .join(MerkleLeaf, MerkleLeaf.record_id == VerificationRecord.id)
+        .where(MerkleLeaf.batch_id == batch.id)
+        .order_by(MerkleLeaf.leaf_index)
+    ).all()
+    root = bytes.fromhex(batch.root)
+    failures = [
+        analysis_id for analysis_id, verification_hash, index, proof in rows
+        if root_from_proof(leaf_hash(analysis_id, verification_hash), proof, index, batch.leaf_count) != root
+    ]
+    expected = batch.leaf_count - (batch.pruned_count or 0)
+    if len(rows) != expected:
+        failures.append(f"<{expected - len(rows)} records missing>")
+    return failures
+
+
+async def anchor_periodically():
+    """Background task started with the API: seal due batches every few seconds"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                sealed = await db.run_sync(seal_due_batches)
+                await db.commit()
+            if sealed:
+                print(f"🌳 Sealed {sealed} Merkle batch(es)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Merkle anchoring failed: {e}")
+        await asyncio.sleep(SEAL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seal or audit Merkle batches of verification hashes")
+    parser.add_argument("command", choices=["seal", "audit"])
+    parser.add_argument("--force", action="store_true", help="Seal the partial batch too")
+    parser.add_argument("--all", action="store_true", help="Look for unanchored records across the whole table")
+    parser.add_argument("--batch", type=int, default=None, help="Audit one batch instead of all")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "seal":
+            sealed = seal_due_batches(db, force=args.force, full_scan=args.all)
+            db.commit()
+            print(f"✅ Sealed {sealed} Merkle batch(es)")
+        else:
+            query = select(MerkleBatch).order_by(MerkleBatch.id)
+            if args.batch is not None:
+                query = query.where(MerkleBatch.id == args.batch)
+            failed = 0
+            for batch in db.execute(query).scalars():
+                failures = audit_batch(db, batch)
+                if failures:
+                    failed += 1
+                    print(f"❌ Batch {batch.id}: {len(failures)} failing record(s): {', '.join(failures[:10])}")
+            print(f"{'❌' if failed else '✅'} Audit finished, {failed} batch(es) with failures")
+    finally:
+        db.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Integrity audit sweep over verification_records
+Streams every record (a server-side cursor on PostgreSQL, short keyset pages on
+SQLite so audit writes are never blocked by an open reader) and recomputes
+verification hashes in a process pool with the same preimage the API uses
+(integrity.py). Failures go to integrity_audit_findings, and the run's
+checkpoint is committed with them, so an interrupted sweep resumes where it
+stopped without losing or duplicating findings.
+
+Usage (from backend/):
+    python audit.py run [--workers 8]
+    python audit.py resume [--run 3]
+    python audit.py report [--run 3]
+    python audit.py benchmark --workers 1,2,4,8 --limit 200000
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+import pytz
+from sqlalchemy import select, func
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import engine, is_postgres, SessionLocal, VerificationRecord, IntegrityAuditRun, IntegrityAuditFinding
+from details_codec import read_details
+from details_archive import archived_details
+from integrity import integrity_problem, UNVERIFIABLE
+
+AUDIT_BATCH_SIZE = 2000
+AUDIT_COLUMNS = (
+    VerificationRecord.id, VerificationRecord.analysis_id, VerificationRecord.file_hash,
+    VerificationRecord.verification_hash, VerificationRecord.analysis_details_packed,
+    VerificationRecord.analysis_details_json, VerificationRecord.hash_metadata,
+    VerificationRecord.hash_timestamp, VerificationRecord.ledger_seq, VerificationRecord.ledger_id,
+    VerificationRecord.details_archived, VerificationRecord.created_at,
+)
+
+
+def audit_chunk(rows: List[tuple]) -> Tuple[int, List[Tuple[int, str, str]]]:
+    """Worker: (number of unverifiable records, [(record id, analysis_id, problem)] for failures)"""
+    unverifiable = 0
+    findings = []
+    for (record_id, analysis_id, file_hash, verification_hash, packed, legacy_json, metadata, timestamp,
+         ledger_seq, ledger_id, archived, created_at) in rows:
+        if timestamp is None:
+            unverifiable += 1
+            continue
+        details = read_details(packed, legacy_json)
+        if details is None and archived:
+            details = archived_details(record_id, created_at)
+        problem = integrity_problem(
+            record_id, analysis_id, file_hash, verification_hash,
+            details, metadata, timestamp, ledger_seq, ledger_id
+        )
+        if problem == UNVERIFIABLE:
+            unverifiable += 1
+        elif problem is not None:
+            findings.append((record_id, analysis_id, problem))
+    return unverifiable, findings
+
+
+def iter_batches(after_id: int, max_id: int, batch_size: int = AUDIT_BATCH_SIZE) -> Iterator[List[tuple]]:
+    """Records with after_id < id <= max_id in id order, batch_size at a time"""
+    query = select(*AUDIT_COLUMNS).where(VerificationRecord.id <= max_id).order_by(VerificationRecord.id)
+    if is_postgres:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                query.where(VerificationRecord.id > after_id)
+            )
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+        return
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(query.where(VerificationRecord.id > after_id).limit(batch_size)).all()
+        if not rows:
+            return
+        yield [tuple(row) for row in rows]
+        after_id = rows[-1][0]
+
+
+def _now() -> datetime:
+    return datetime.now(pytz.timezone('Asia/Kolkata'))
+
+
+def start_run(workers: int) -> int:
+    db = SessionLocal()
+    try:
+        max_id = db.execute(select(func.max(VerificationRecord.id))).scalar() or 0
+        run = IntegrityAuditRun(status="running", workers=workers, max_record_id=max_id, last_record_id=0,
+                                checked=0, tampered=0, unverifiable=0)
+        db.add(run)
+        db.commit()
+        return run.id
+    finally:
+        db.close()
+
+
+def latest_unfinished_run() -> Optional[int]:
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(IntegrityAuditRun.id).where(IntegrityAuditRun.status == "running")
+            .order_by(IntegrityAuditRun.id.desc()).limit(1)
+        ).scalar()
+    finally:
+        db.close()
+
+
+def _commit_chunk(run_id: int, last_id: int, count: int, unverifiable: int, findings):
+    """Findings and the advanced checkpoint land in one transaction"""
+    db = SessionLocal()
+    try:
+        run = db.get(IntegrityAuditRun, run_id)
+        if findings:
+            db.execute(IntegrityAuditFinding.__table__.insert(), [
+                {"run_id": run_id, "record_id": record_id, "analysis_id": analysis_id,
+                 "problem": problem, "found_at": _now()}
+                for record_id, analysis_id, problem in findings
+            ])
+        run.last_record_id = last_id
+        run.checked += count
+        run.unverifiable += unverifiable
+        run.tampered += len(findings)
+        db.commit()
+        return run.checked, run.max_record_id
+    finally:
+        db.close()
+
+
+def run_audit(run_id: int, workers: int, batch_size: int = AUDIT_BATCH_SIZE):
+    db = SessionLocal()
+    try:
+        run = db.get(IntegrityAuditRun, run_id)
+        if run is None:
+            raise ValueError(f"No audit run {run_id}")
+        after_id, max_id = run.last_record_id, run.max_record_id
+        run.workers = workers
+        db.commit()
+    finally:
+        db.close()
+    print(f"🔎 Audit run {run_id}: records {after_id + 1}..{max_id} with {workers} worker(s)")
+
+    began = time.perf_counter()
+    checked_now = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Results are committed in submission order so the checkpoint never skips a chunk;
+        # at most two chunks per worker are in flight, which keeps memory flat
+        pending = deque()
+
+        def commit_oldest():
+            nonlocal checked_now
+            last_id, count, future = pending.popleft()
+            unverifiable, findings = future.result()
+            checked, _ = _commit_chunk(run_id, last_id, count, unverifiable, findings)
+            checked_now += count
+            rate = checked_now / (time.perf_counter() - began)
+            print(f"🔎 {checked:,} records checked, up to id {last_id:,}/{max_id:,} ({rate:,.0f} records/s)", end="\r")
+
+        for batch in iter_batches(after_id, max_id, batch_size):
+            pending.append((batch[-1][0], len(batch), pool.submit(audit_chunk, batch)))
+            while len(pending) >= workers * 2:
+                commit_oldest()
+        while pending:
+            commit_oldest()
+    print()
+
+    elapsed = time.perf_counter() - began
+    db = SessionLocal()
+    try:
+        run = db.get(IntegrityAuditRun, run_id)
+        run.status = "completed"
+        run.finished_at = _now()
+        run.records_per_second = checked_now / elapsed if elapsed > 0 else None
+        db.commit()
+        print(f"{'❌' if run.tampered else '✅'} Run {run_id}: {run.checked:,} checked, {run.tampered:,} tampered, "
+              f"{run.unverifiable:,} unverifiable ({run.records_per_second or 0:,.0f} records/s on {workers} worker(s))")
+    finally:
+        db.close()
+
+
+def report(run_id: Optional[int]):
+    db = SessionLocal()
+    try:
+        query = select(IntegrityAuditRun).order_by(IntegrityAuditRun.id.desc())
+        run = db.execute(query.where(IntegrityAuditRun.id == run_id) if run_id else query.limit(1)).scalar()
+        if run is None:
+            print("No audit runs yet")
+            return
+        print(f"Run {run.id} ({run.status}), started {run.started_at}, finished {run.finished_at}")
+        print(f"  checked {run.checked:,} up to id {run.last_record_id:,}/{run.max_record_id:,}, "
+              f"tampered {run.tampered:,}, unverifiable {run.unverifiable:,}, "
+              f"{run.records_per_second or 0:,.0f} records/s on {run.workers} worker(s)")
+        findings = db.execute(
+            select(IntegrityAuditFinding).where(IntegrityAuditFinding.run_id == run.id)
+            .order_by(IntegrityAuditFinding.record_id).limit(50)
+        ).scalars().all()
+        for finding in findings:
+            print(f"  ❌ {finding.analysis_id} (id {finding.record_id}): {finding.problem}")
+    finally:
+        db.close()
+
+
+def benchmark(worker_counts: List[int], limit: int, batch_size: int):
+    """Hashing throughput per worker count over the same in-memory records (no audit writes)"""
+    began = time.perf_counter()
+    batches = []
+    loaded = 0
+    for batch in iter_batches(0, 2**62, batch_size):
+        batches.append(batch[:limit - loaded])
+        loaded += len(batches[-1])
+        if loaded >= limit:
+            break
+    read_rate = loaded / (time.perf_counter() - began)
+    print(f"Loaded {loaded:,} records ({read_rate:,.0f} records/s read), {os.cpu_count()} CPUs available")
+
+    baseline = None
+    print(f"\n{'workers':>8}{'records/s':>14}{'speedup':>10}")
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(audit_chunk, [[]] * workers))  # start the workers outside the timing
+            began = time.perf_counter()
+            list(pool.map(audit_chunk, batches))
+            rate = loaded / (time.perf_counter() - began)
+        baseline = baseline or rate
+        print(f"{workers:>8}{rate:>14,.0f}{rate / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-verify every stored verification record")
+    parser.add_argument("command", choices=["run", "resume", "report", "benchmark"])
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1),
+                        help="Worker processes; a comma-separated list for benchmark")
+    parser.add_argument("--batch-size", type=int, default=AUDIT_BATCH_SIZE)
+    parser.add_argument("--run", type=int, default=None, help="Run id for resume / report")
+    parser.add_argument("--limit", type=int, default=200000, help="Records used by benchmark")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        benchmark([int(w) for w in args.workers.split(",")], args.limit, args.batch_size)
+    elif args.command == "report":
+        report(args.run)
+    else:
+        workers = int(args.workers.split(",")[0])
+        if args.command == "run":
+            run_id = start_run(workers)
+        else:
+            run_id = args.run or latest_unfinished_run()
+            if run_id is None:
+                sys.exit("No unfinished audit run to resume")
+        run_audit(run_id, workers, args.batch_size)
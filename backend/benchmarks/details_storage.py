@@ -0,0 +1,133 @@
+"""
+analysis_details storage benchmark: JSON column vs packed binary
+Writes the same synthetic detection results (32 faces x 7 models, the shape the
+standard tier produces) into two SQLite databases, one with the legacy JSON
+column and one packed by details_codec, then compares on-disk size and the
+time to read a page of rows with and without decoding the details.
+
+Usage (from backend/):
+    python benchmarks/details_storage.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from details_codec import pack_details, unpack_details, ZSTD_AVAILABLE
+
+FACES = 32
+MODELS = 7
+BATCH_SIZE = 5000
+READ_ROWS = 1000
+
+
+def synthetic_details(rng) -> dict:
+    model_predictions = rng.random(MODELS).tolist()
+    face_predictions = rng.random(FACES * MODELS).tolist()
+    return {
+        "is_deepfake": bool(rng.random() < 0.2),
+        "confidence": float(rng.random()),
+        "faces_analyzed": FACES,
+        "models_used": MODELS,
+        "ensemble_members": [f"b7_seed{seed}" for seed in range(MODELS)],
+        "model_predictions": model_predictions,
+        "all_face_predictions": face_predictions,
+        "min_prediction": min(model_predictions),
+        "max_prediction": max(model_predictions),
+        "std_prediction": float(np.std(model_predictions)),
+        "temporal_consistency": {
+            "consistency_score": float(rng.random()),
+            "variance": float(rng.random() / 10),
+            "trend": "stable",
+            "frame_predictions": rng.random(FACES).tolist(),
+        },
+        "face_quality": {"quality_score": 0.7, "issues": ["blurry"], "face_count": FACES,
+                         "deepfake_indicators": [], "deepfake_suspicion": 0.1},
+        "ensemble_weights": [1 / MODELS] * MODELS,
+        "decision_factors": {"base_prediction": 0.4, "model_agreement": 0.8, "final_confidence": 0.7},
+        "partial": False,
+        "coverage": {"faces_scored": FACES, "models_planned": MODELS, "models_used": MODELS},
+        "processing_time": 12.5,
+    }
+
+
+def build(path: str, rows: int, packed: bool) -> float:
+    rng = np.random.default_rng(7)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE verification_records (id INTEGER PRIMARY KEY, analysis_id TEXT, is_deepfake BOOLEAN, "
+        "confidence_score FLOAT, faces_analyzed INTEGER, analysis_details TEXT, analysis_details_packed BLOB)"
+    )
+    began = time.perf_counter()
+    for offset in range(0, rows, BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(rows, offset + BATCH_SIZE)):
+            details = synthetic_details(rng)
+            blob = pack_details(details) if packed else None
+            text = None if packed else json.dumps(details)
+            batch.append((f"id-{i}", details["is_deepfake"], details["confidence"], FACES, text, blob))
+        conn.executemany(
+            "INSERT INTO verification_records (analysis_id, is_deepfake, confidence_score, faces_analyzed, "
+            "analysis_details, analysis_details_packed) VALUES (?, ?, ?, ?, ?, ?)", batch
+        )
+        conn.commit()
+    elapsed = time.perf_counter() - began
+    conn.execute("VACUUM")
+    conn.close()
+    return elapsed
+
+
+def time_reads(path: str, packed: bool):
+    conn = sqlite3.connect(path)
+    column = "analysis_details_packed" if packed else "analysis_details"
+    decode = unpack_details if packed else json.loads
+
+    began = time.perf_counter()
+    conn.execute(f"SELECT id, analysis_id, is_deepfake, confidence_score, faces_analyzed "
+                 f"FROM verification_records ORDER BY id DESC LIMIT {READ_ROWS}").fetchall()
+    summary_ms = (time.perf_counter() - began) * 1000
+
+    began = time.perf_counter()
+    rows = conn.execute(f"SELECT id, {column} FROM verification_records ORDER BY id DESC LIMIT {READ_ROWS}").fetchall()
+    fetch_ms = (time.perf_counter() - began) * 1000
+    began = time.perf_counter()
+    for _, value in rows:
+        decode(value)
+    decode_ms = (time.perf_counter() - began) * 1000
+
+    column_bytes = conn.execute(f"SELECT AVG(LENGTH({column})) FROM verification_records").fetchone()[0]
+    conn.close()
+    return summary_ms, fetch_ms, decode_ms, column_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"Compression: {'zstd' if ZSTD_AVAILABLE else 'zlib'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for label, packed in (("json", False), ("packed", True)):
+            path = os.path.join(tmp, f"{label}.db")
+            write_s = build(path, args.rows, packed)
+            results[label] = (os.path.getsize(path), write_s, *time_reads(path, packed))
+
+        print(f"\n{'storage':<8}{'db size':>12}{'bytes/row':>11}{'write':>9}"
+              f"{'summary read':>14}{'fetch':>10}{'decode':>10}   (reads: {READ_ROWS} rows)")
+        for label, (size, write_s, summary_ms, fetch_ms, decode_ms, column_bytes) in results.items():
+            print(f"{label:<8}{size / 1e6:>10.1f}MB{column_bytes:>11.0f}{write_s:>8.1f}s"
+                  f"{summary_ms:>12.2f}ms{fetch_ms:>8.2f}ms{decode_ms:>8.2f}ms")
+        ratio = results["json"][0] / results["packed"][0]
+        print(f"\nDatabase is {ratio:.1f}x smaller with packed details")
+
+
+if __name__ == "__main__":
+    main()
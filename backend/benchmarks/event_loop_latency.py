@@ -0,0 +1,156 @@
+"""
+Event-loop latency benchmark: sync Session vs AsyncSession
+Runs a mixed read/write workload (statistics + listing reads, one insert and
+commit per simulated analysis) inside the event loop while a ticker coroutine
+measures how late it wakes up. Blocking database calls show up as loop lag.
+
+Usage (from backend/):
+    python benchmarks/event_loop_latency.py --rows 20000 --workers 16 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TICK_SECONDS = 0.005
+
+
+def configure_database(path: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+
+def seed(rows: int):
+    from database import Base, engine, VerificationRecord, Constituency
+    from details_codec import pack_details
+    from sqlalchemy import insert
+
+    Base.metadata.create_all(bind=engine)
+    now = time.time()
+    with engine.begin() as conn:
+        conn.execute(insert(Constituency), [{"id": i + 1, "name": f"Constituency {i}"} for i in range(50)])
+    batch = [
+        {
+            "analysis_id": str(uuid.uuid4()),
+            "filename": f"video_{i}.mp4",
+            "file_hash": uuid.uuid4().hex,
+            "verification_hash": uuid.uuid4().hex,
+            "is_deepfake": i % 7 == 0,
+            "confidence_score": (i % 100) / 100.0,
+            "constituency_id": i % 50 + 1,
+            "analysis_details_packed": pack_details({"faces_analyzed": i % 32}),
+            "faces_analyzed": i % 32,
+        }
+        for i in range(rows)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(VerificationRecord), batch)
+    print(f"🌱 Seeded {rows} rows in {time.time() - now:.1f}s")
+
+
+def new_record():
+    from database import VerificationRecord
+    return VerificationRecord(
+        analysis_id=str(uuid.uuid4()),
+        filename="bench.mp4",
+        file_hash=uuid.uuid4().hex,
+        verification_hash=uuid.uuid4().hex,
+        is_deepfake=False,
+        confidence_score=0.5,
+        analysis_details={"faces_analyzed": 8},
+    )
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((loop.time() - start - TICK_SECONDS) * 1000.0)
+
+
+async def sync_worker(worker_id: int, stop: asyncio.Event, ops: list):
+    """What the handlers did before: a blocking Session used directly in async def"""
+    from database import SessionLocal, VerificationRecord
+    from sqlalchemy import func, select
+
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            if worker_id % 4 == 0:
+                db.add(new_record())
+                db.commit()
+            else:
+                db.execute(select(func.count(VerificationRecord.id))).scalar()
+                db.execute(
+                    select(VerificationRecord.constituency_id, func.count(VerificationRecord.id))
+                    .group_by(VerificationRecord.constituency_id)
+                ).all()
+                db.execute(
+                    select(VerificationRecord).order_by(VerificationRecord.created_at.desc()).limit(50)
+                ).scalars().all()
+        finally:
+            db.close()
+        ops.append(1)
+        await asyncio.sleep(0)
+
+
+async def async_worker(worker_id: int, stop: asyncio.Event, ops: list):
+    from database import AsyncSessionLocal, VerificationRecord
+    from sqlalchemy import func, select
+
+    while not stop.is_set():
+        async with AsyncSessionLocal() as db:
+            if worker_id % 4 == 0:
+                db.add(new_record())
+                await db.commit()
+            else:
+                (await db.execute(select(func.count(VerificationRecord.id)))).scalar()
+                (await db.execute(
+                    select(VerificationRecord.constituency_id, func.count(VerificationRecord.id))
+                    .group_by(VerificationRecord.constituency_id)
+                )).all()
+                (await db.execute(
+                    select(VerificationRecord).order_by(VerificationRecord.created_at.desc()).limit(50)
+                )).scalars().all()
+        ops.append(1)
+
+
+async def run(mode: str, workers: int, seconds: float):
+    stop = asyncio.Event()
+    lags, ops = [], []
+    worker = sync_worker if mode == "sync" else async_worker
+    tasks = [asyncio.create_task(ticker(stop, lags))]
+    tasks += [asyncio.create_task(worker(i, stop, ops)) for i in range(workers)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    lags = np.array(lags) if lags else np.zeros(1)
+    print(f"{mode:>5}: ops/s={len(ops) / seconds:8.1f}  "
+          f"loop lag p50={np.percentile(lags, 50):7.2f}ms  "
+          f"p99={np.percentile(lags, 99):7.2f}ms  max={lags.max():7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_database(os.path.join(tmp, "bench.db"))
+        seed(args.rows)
+        for mode in ("sync", "async"):
+            asyncio.run(run(mode, args.workers, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Verification ledger benchmark
+Appends synthetic entries to a temporary ledger file, then times random
+lookups by sequence number and a full chain verification.
+
+Usage (from backend/):
+    python benchmarks/ledger.py --entries 5000000
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import VerificationLedger, ENTRY_SIZE
+
+LOOKUPS = 100000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--fsync", action="store_true", help="msync after every append")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = VerificationLedger(os.path.join(tmp, "ledger.bin"), fsync=args.fsync)
+        digests = [hashlib.sha256(str(i).encode()).digest() for i in range(min(args.entries, 65536))]
+
+        began = time.perf_counter()
+        for i in range(args.entries):
+            ledger.append(i + 1, digests[i % len(digests)])
+        append_s = time.perf_counter() - began
+
+        rng = np.random.default_rng(0)
+        targets = rng.integers(0, args.entries, LOOKUPS).tolist()
+        began = time.perf_counter()
+        for seq in targets:
+            ledger.entry(seq)
+        lookup_us = (time.perf_counter() - began) * 1e6 / LOOKUPS
+
+        began = time.perf_counter()
+        broken = ledger.verify_chain()
+        verify_s = time.perf_counter() - began
+        ledger.close()
+
+    print(f"entries        {args.entries:,} ({args.entries * ENTRY_SIZE / 1e6:.0f} MB)")
+    print(f"append         {args.entries / append_s:,.0f} entries/s{' (fsync)' if args.fsync else ''}")
+    print(f"lookup         {lookup_us:.2f} µs per entry")
+    print(f"verify chain   {verify_s:.2f}s ({args.entries / verify_s / 1e6:.2f}M entries/s), "
+          f"{'intact' if broken is None else f'broken at {broken}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Serialization CPU benchmark: before/after the orjson switch
+Measures CPU time per request for
+  - a /verifications page (per-row VerificationResponse + jsonable_encoder +
+    JSONResponse, versus plain dict rows + ORJSONResponse)
+  - the verification hash (json.dumps(sort_keys=True) versus canonical_bytes)
+over synthetic detection results shaped like the standard tier's output.
+
+Usage (from backend/):
+    python benchmarks/serialization.py --rows 200 --iterations 50
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canonical import canonical_bytes
+from details_codec import normalize_details
+from details_storage import synthetic_details
+from schemas import VerificationResponse
+
+
+def make_rows(count: int, rng):
+    return [
+        {
+            "analysis_id": f"analysis-{i}",
+            "filename": f"video_{i}.mp4",
+            "is_deepfake": bool(i % 5 == 0),
+            "confidence_score": float(rng.random()),
+            "verification_hash": hashlib.sha256(str(i).encode()).hexdigest(),
+            "is_tampered": False,
+            "election_context": "General Election",
+            "candidate_name": f"Candidate {i % 40}",
+            "constituency": f"Constituency {i % 90}",
+            "timestamp": datetime(2024, 5, 1, 12, i % 60).isoformat(),
+            "analysis_details": normalize_details(synthetic_details(rng)),
+            "analysis_mode": "standard",
+        }
+        for i in range(count)
+    ]
+
+
+def cpu_ms(func, iterations: int) -> float:
+    func()  # warm up
+    began = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - began) * 1000 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    rows = make_rows(args.rows, rng)
+
+    def list_before():
+        models = [VerificationResponse(**row) for row in rows]
+        return JSONResponse(content=jsonable_encoder(models)).body
+
+    def list_after():
+        return ORJSONResponse(content=[dict(row) for row in rows]).body
+
+    payloads = [
+        {
+            "analysis_id": row["analysis_id"],
+            "file_hash": row["verification_hash"],
+            "detection_result": row["analysis_details"],
+            "metadata": {"filename": row["filename"], "constituency": row["constituency"]},
+            "timestamp": row["timestamp"],
+        }
+        for row in rows
+    ]
+
+    def hash_before():
+        for payload in payloads:
+            hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def hash_after():
+        for payload in payloads:
+            hashlib.sha256(canonical_bytes(payload)).hexdigest()
+
+    size = len(list_after())
+    print(f"/verifications page: {args.rows} rows, {size / 1024:.0f} KB")
+    before, after = cpu_ms(list_before, args.iterations), cpu_ms(list_after, args.iterations)
+    print(f"  list serialization  before {before:8.2f} ms   after {after:8.2f} ms   ({before / after:.1f}x)")
+    before, after = cpu_ms(hash_before, args.iterations), cpu_ms(hash_after, args.iterations)
+    print(f"  hashing {args.rows} results  before {before:8.2f} ms   after {after:8.2f} ms   ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
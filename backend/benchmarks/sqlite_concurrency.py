@@ -0,0 +1,152 @@
+"""
+SQLite concurrency benchmark: default configuration vs SQLITE_TUNED
+Seeds a temporary database, then runs concurrent writers (record inserts, as
+/analyze-video stores them) and readers (/verifications pages and the
+statistics summary) for a fixed time, once per configuration. Each run is a
+separate process because the engines are configured when database.py is imported.
+
+Usage (from backend/):
+    python benchmarks/sqlite_concurrency.py --writers 8 --readers 32 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DETAILS = {"faces_analyzed": 8, "models_used": 7, "predictions": [0.1] * 32}
+CONSTITUENCIES = [f"Constituency {i}" for i in range(50)]
+
+
+def record_values(i: int):
+    return {
+        "analysis_id": str(uuid.uuid4()),
+        "filename": f"video_{i}.mp4",
+        "file_hash": uuid.uuid4().hex,
+        "verification_hash": uuid.uuid4().hex,
+        "is_deepfake": i % 5 == 0,
+        "confidence_score": 0.5,
+        "constituency": CONSTITUENCIES[i % len(CONSTITUENCIES)],
+        "analysis_details": DETAILS,
+        "analysis_mode": "fast",
+    }
+
+
+def seed(rows: int):
+    from database import SessionLocal, VerificationRecord
+    from migrate_database import migrate_database
+    from stats_aggregates import rebuild_aggregates
+
+    migrate_database()
+    db = SessionLocal()
+    try:
+        db.add_all(VerificationRecord(**record_values(i)) for i in range(rows))
+        db.flush()
+        rebuild_aggregates(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def workload(writers: int, readers: int, seconds: float):
+    from sqlalchemy import select
+    from database import AsyncSessionLocal, AsyncReadSessionLocal, VerificationRecord, StatisticsAggregate, dispose_async_engines
+    from dimensions import name_filter
+    from pagination import keyset_order
+
+    stop = time.perf_counter() + seconds
+    latencies = {"write": [], "read": []}
+    errors = {"write": 0, "read": 0}
+
+    async def writer():
+        i = 0
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    db.add(VerificationRecord(**record_values(i)))
+                    await db.commit()
+                latencies["write"].append(time.perf_counter() - began)
+            except Exception:
+                errors["write"] += 1
+            i += 1
+
+    async def reader(n: int):
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            try:
+                async with AsyncReadSessionLocal() as db:
+                    if n % 2:
+                        await db.execute(select(StatisticsAggregate))
+                    else:
+                        result = await db.execute(
+                            select(VerificationRecord)
+                            .where(name_filter("constituency", CONSTITUENCIES[n % len(CONSTITUENCIES)]))
+                            .order_by(*keyset_order()).limit(50)
+                        )
+                        result.scalars().all()
+                latencies["read"].append(time.perf_counter() - began)
+            except Exception:
+                errors["read"] += 1
+            n += 2
+
+    await asyncio.gather(*[writer() for _ in range(writers)], *[reader(n) for n in range(readers)])
+    await dispose_async_engines()
+    summary = {}
+    for kind in ("write", "read"):
+        done = latencies[kind]
+        summary[kind] = {
+            "per_second": len(done) / seconds,
+            "p50_ms": float(np.percentile(done, 50) * 1000) if done else 0.0,
+            "p95_ms": float(np.percentile(done, 95) * 1000) if done else 0.0,
+            "errors": errors[kind],
+        }
+    return summary
+
+
+def run_mode(tuned: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   SQLITE_TUNED="true" if tuned else "false")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", "--rows", str(args.rows),
+             "--writers", str(args.writers), "--readers", str(args.readers), "--seconds", str(args.seconds)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        seed(args.rows)
+        print(json.dumps(asyncio.run(workload(args.writers, args.readers, args.seconds))))
+        return
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s over {args.rows:,} seeded rows")
+    print(f"\n{'mode':<10}{'op':<7}{'ops/s':>10}{'p50':>10}{'p95':>11}{'errors':>8}")
+    for label, tuned in (("default", False), ("tuned", True)):
+        summary = run_mode(tuned, args)
+        for kind in ("write", "read"):
+            row = summary[kind]
+            print(f"{label:<10}{kind:<7}{row['per_second']:>10,.0f}{row['p50_ms']:>8.1f}ms{row['p95_ms']:>9.1f}ms{row['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+In-process caches
+Small thread-safe caches for read-mostly API responses: a TTL cache for
+/statistics and a byte-bounded LRU for serialized verification records
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Entries expire ttl_seconds after they are set; writers invalidate explicitly"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class LRUByteCache:
+    """
+    Least-recently-used cache bounded by the total size of its values.
+    `version` moves on every invalidation; readers capture it before loading
+    from the database and pass it back to set(), so a value loaded before an
+    invalidation is never stored after it. With ttl_seconds, entries also
+    expire, bounding staleness from changes this process never sees.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and time.monotonic() >= entry[1]:
+                del self._entries[key]
+                self.current_bytes -= entry[0]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any, size: int, if_version: Optional[int] = None) -> bool:
+        """Store value (of `size` bytes); returns False if it was not cached"""
+        if size > self.max_bytes or (self.ttl_seconds is not None and self.ttl_seconds <= 0):
+            return False
+        with self._lock:
+            if if_version is not None and if_version != self.version:
+                return False
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[0]
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, (evicted_size, _, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+            expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+            self._entries[key] = (size, expires_at, value)
+            self.current_bytes += size
+            return True
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            self.version += 1
+            if key is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            else:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.current_bytes -= entry[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
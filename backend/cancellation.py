@@ -0,0 +1,56 @@
+"""
+Cooperative cancellation for in-flight analyses
+The token is set from the event loop (client disconnect, request cancelled) and
+checked by the ensemble between frames and between models in its worker thread.
+"""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+
+from metrics import registry
+
+cancelled_analyses = registry.counter(
+    "veritas_analysis_cancelled_total", "Analyses stopped before completion", ("reason",))
+cancelled_work_seconds = registry.counter(
+    "veritas_cancelled_work_seconds_total", "Inference time spent on analyses that were later cancelled")
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside the analysis pipeline once its token has been cancelled"""
+
+
+class CancellationToken:
+    """Thread-safe flag shared between the request handler and the inference thread"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self.cancelled_at = time.time()
+            self._event.set()
+            cancelled_analyses.inc(reason=reason)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason or "cancelled")
+
+
+async def watch_disconnect(request: Request, token: CancellationToken, interval: float = 0.5):
+    """Cancel the token as soon as the HTTP client goes away"""
+    while not token.cancelled:
+        if await request.is_disconnected():
+            print("🔌 Client disconnected, cancelling analysis")
+            token.cancel("client_disconnected")
+            return
+        await asyncio.sleep(interval)
@@ -0,0 +1,39 @@
+"""
+Canonical JSON bytes for hashing
+Every hash over structured data (verification hashes, integrity checks) goes
+through canonical_bytes so the same value always yields the same bytes:
+sorted keys, compact separators, UTF-8, numpy values as plain numbers.
+"""
+import hashlib
+from typing import Any, Dict
+
+import numpy as np
+import orjson
+
+CANONICAL_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any):
+    """Types orjson does not handle natively"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def canonical_bytes(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=CANONICAL_OPTIONS)
+
+
+def payload_hash(analysis_id: str, file_hash: str, detection_result: Dict,
+                 metadata: Dict, timestamp: str) -> str:
+    """SHA-256 over the canonical bytes of one verification payload (the verification hash)"""
+    data = {
+        "analysis_id": analysis_id,
+        "file_hash": file_hash,
+        "detection_result": detection_result,
+        "metadata": metadata,
+        "timestamp": timestamp
+    }
+    return hashlib.sha256(canonical_bytes(data)).hexdigest()
@@ -1,19 +1,57 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Float, DateTime, Text, JSON
+from sqlalchemy import create_engine, event, Column, Integer, BigInteger, String, Boolean, Float, DateTime, Text, JSON, Index, LargeBinary, select
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, column_property
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 from datetime import datetime
 import pytz
 
+from details_codec import pack_details, read_details, summary_fields
+
 # Database configuration
 import os
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+def normalize_database_url(url: str) -> str:
+    """Accept the postgres:// scheme many hosts hand out; SQLAlchemy only knows postgresql://"""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+def is_postgres_url(url: str) -> bool:
+    return normalize_database_url(url).startswith("postgresql://")
 
 # Get database URL from environment variable (for production) or use SQLite (for development)
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./veritas_ai.db")
+DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL", "sqlite:///./veritas_ai.db"))
 
 # Determine if we're using PostgreSQL or SQLite
-is_postgres = DATABASE_URL.startswith("postgresql://")
+is_postgres = is_postgres_url(DATABASE_URL)
+
+# High-concurrency SQLite mode for single-node deployments: WAL so readers never
+# block behind the writer, one writer connection so in-process writers queue
+# instead of colliding on the database lock, and a separate pool of readers
+SQLITE_TUNED = not is_postgres and os.getenv("SQLITE_TUNED", "false").lower() == "true"
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", "8"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def tune_sqlite(engine, read_only: bool = False):
+    """Set the tuned-mode PRAGMAs on every new connection of engine"""
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL is a property of the database file; the other settings are per connection
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable at each checkpoint rather than each commit; WAL keeps the file consistent on power loss
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
 
 # Create SQLAlchemy engine with appropriate configuration
 if is_postgres:
@@ -31,10 +69,82 @@ else:
         DATABASE_URL,
         connect_args={"check_same_thread": False}
     )
+    if SQLITE_TUNED:
+        tune_sqlite(engine)
 
-# Create SessionLocal class
+# Create SessionLocal class (used for startup, migrations and CLI scripts)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def to_async_url(url: str):
+    """
+    Map a sync database URL to its async driver (asyncpg / aiosqlite).
+    Returns (async_url, connect_args); asyncpg takes ssl as a connect argument
+    instead of the libpq sslmode query parameter.
+    """
+    connect_args = {}
+    url = normalize_database_url(url)
+    if url.startswith("postgresql://"):
+        parsed = urlparse(url)
+        query = dict(parse_qsl(parsed.query))
+        sslmode = query.pop("sslmode", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode if sslmode in ("require", "verify-ca", "verify-full") else True
+        url = parsed._replace(scheme="postgresql+asyncpg", query=urlencode(query)).geturl()
+    elif url.startswith("sqlite://"):
+        url = url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url, connect_args
+
+ASYNC_DATABASE_URL, _async_connect_args = to_async_url(DATABASE_URL)
+
+# Async engine used by the request handlers so queries never block the event loop
+if is_postgres:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=_async_connect_args,
+        pool_size=10,
+        max_overflow=20,
+        pool_pre_ping=True,
+        pool_recycle=300
+    )
+elif SQLITE_TUNED:
+    # The single writer: sessions wait for this connection instead of retrying on SQLITE_BUSY.
+    # aiosqlite defaults to NullPool (a new connection per checkout), so the pool is explicit
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0, pool_timeout=60
+    )
+    tune_sqlite(async_engine.sync_engine)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Sessions for read-only work; in tuned SQLite mode a query_only reader pool
+# that reads WAL snapshots alongside the writer, otherwise the same engine
+if SQLITE_TUNED:
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=SQLITE_READERS, max_overflow=0, pool_timeout=60
+    )
+    tune_sqlite(async_read_engine.sync_engine, read_only=True)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+else:
+    AsyncReadSessionLocal = AsyncSessionLocal
+
+IST = pytz.timezone('Asia/Kolkata')
+
+class ISTDateTime(TypeDecorator):
+    """
+    Naive timestamp column holding Asia/Kolkata wall time.
+    Aware datetimes are converted and stripped before binding: psycopg2 and SQLite
+    silently drop the offset, but asyncpg rejects aware values for TIMESTAMP columns.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(IST).replace(tzinfo=None)
+        return value
+
 # Create Base class
 Base = declarative_base()
 
@@ -48,36 +158,235 @@ class User(Base):
     phone = Column(String, nullable=True)
     organization = Column(String, nullable=True)
     purpose = Column(String, nullable=True, default='general')
-    created_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
-    updated_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), onupdate=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    created_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    updated_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), onupdate=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
 
 class VerificationRecord(Base):
     """Database model for storing verification records"""
     __tablename__ = "verification_records"
     
     id = Column(Integer, primary_key=True, index=True)
+    # On partitioned PostgreSQL uniqueness is kept by verification_analysis_ids (partitions.py)
     analysis_id = Column(String, unique=True, index=True, nullable=False)
     filename = Column(String, nullable=False)
     file_hash = Column(String, nullable=False)  # SHA256 hash of the file
     verification_hash = Column(String, nullable=False)  # Blockchain hash
     is_deepfake = Column(Boolean, nullable=False)
     confidence_score = Column(Float, nullable=False)
-    election_context = Column(String, nullable=True)
-    candidate_name = Column(String, nullable=True)
-    constituency = Column(String, nullable=True)
-    analysis_details = Column(JSON, nullable=True)  # Store detailed analysis results
+    # Dictionary-encoded dimensions: ids into the lookup tables below. The
+    # election_context / candidate_name / constituency names are mapped further
+    # down and resolved to ids on flush (dimensions.py).
+    election_context_id = Column(Integer, nullable=True)
+    candidate_id = Column(Integer, nullable=True)
+    constituency_id = Column(Integer, nullable=True)
+    # Detailed analysis results: packed binary (see details_codec.py); the JSON
+    # column only holds rows written before packing and not yet migrated.
+    # Read and write both through the analysis_details property.
+    analysis_details_json = Column("analysis_details", JSON(none_as_null=True), nullable=True)
+    analysis_details_packed = Column(LargeBinary, nullable=True)
+    details_archived = Column(Boolean, nullable=True)  # Details moved to the month's archive file (partitions.py)
+    faces_analyzed = Column(Integer, nullable=True)  # Summary fields copied out of the details
+    models_used = Column(Integer, nullable=True)
     user_id = Column(Integer, nullable=True)  # Foreign key to users table
-    created_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
-    updated_at = Column(DateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), onupdate=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    analysis_mode = Column(String, nullable=True)  # fast / standard / forensic tier used
+    processing_time = Column(Float, nullable=True)  # Measured latency of the analysis in seconds
+    # Preimage fields of verification_hash besides the record's own columns, so it can be recomputed exactly
+    hash_timestamp = Column(String, nullable=True)
+    hash_metadata = Column(JSON(none_as_null=True), nullable=True)
+    ledger_seq = Column(BigInteger, nullable=True)  # Entry in the append-only ledger (ledger.py)
+    ledger_id = Column(String(32), nullable=True)  # Which ledger file ledger_seq refers to
+    created_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    updated_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')), onupdate=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    
+    # One index per supported list filter, each ending in the (created_at, id)
+    # keyset so filtered pages are a single range scan. Existing databases get
+    # these from migrate_database.py.
+    __table_args__ = (
+        Index("ix_verification_records_created_at_id", "created_at", "id"),
+        Index("ix_verification_records_constituency_id_created_at_id", "constituency_id", "created_at", "id"),
+        Index("ix_verification_records_candidate_id_created_at_id", "candidate_id", "created_at", "id"),
+        Index("ix_verification_records_user_created_at_id", "user_id", "created_at", "id"),
+        # Bulk lookups by file hash (POST /verifications/lookup)
+        Index("ix_verification_records_file_hash_created_at_id", "file_hash", "created_at", "id"),
+    )
+    
+    @property
+    def analysis_details(self):
+        """Decoded on first access and cached for the lifetime of the instance"""
+        packed = self.analysis_details_packed
+        cached = self.__dict__.get("_decoded_details")
+        if cached is not None and cached[0] is packed:
+            return cached[1]
+        details = read_details(packed, self.analysis_details_json)
+        if details is None and self.details_archived:
+            from details_archive import archived_details
+            details = archived_details(self.id, self.created_at)
+            self.__dict__["_decoded_details"] = (packed, details)
+            return details
+        if packed is not None:
+            self.__dict__["_decoded_details"] = (packed, details)
+        return details
+    
+    @analysis_details.setter
+    def analysis_details(self, details):
+        self.analysis_details_packed = pack_details(details) if details is not None else None
+        self.analysis_details_json = None
+        self.details_archived = None
+        for name, value in summary_fields(details).items():
+            setattr(self, name, value)
+
+class ElectionContext(Base):
+    """Distinct election_context values; verification_records stores the id"""
+    __tablename__ = "election_contexts"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class Candidate(Base):
+    """Distinct candidate_name values; verification_records stores the id"""
+    __tablename__ = "candidates"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class Constituency(Base):
+    """Distinct constituency values; verification_records stores the id"""
+    __tablename__ = "constituencies"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+# VerificationRecord name attribute -> (lookup table, id attribute)
+ENCODED_DIMENSIONS = {
+    "election_context": (ElectionContext, "election_context_id"),
+    "candidate_name": (Candidate, "candidate_id"),
+    "constituency": (Constituency, "constituency_id"),
+}
+
+# Names load as a primary-key subquery per dimension, so API code keeps reading
+# and assigning strings. expire_on_flush=False keeps an assigned name on the
+# instance after the INSERT instead of reloading it.
+for _attribute, (_table, _id_attribute) in ENCODED_DIMENSIONS.items():
+    setattr(VerificationRecord, _attribute, column_property(
+        select(_table.name)
+        .where(_table.id == getattr(VerificationRecord, _id_attribute))
+        .correlate_except(_table)
+        .scalar_subquery(),
+        expire_on_flush=False
+    ))
+
+class StatisticsAggregate(Base):
+    """Running counters behind /statistics, kept in step with verification_records"""
+    __tablename__ = "statistics_aggregates"
+    
+    dimension = Column(String, primary_key=True)  # "total", "constituency" or "candidate"
+    key = Column(String, primary_key=True)  # Dimension value ("" for records without one)
+    total_count = Column(Integer, nullable=False, default=0)
+    deepfake_count = Column(Integer, nullable=False, default=0)
+
+class StatisticsRollup(Base):
+    """Per-hour / per-day counters for the trend endpoint, keyed so filtered range scans hit the primary key"""
+    __tablename__ = "statistics_rollups"
+    
+    grain = Column(String, primary_key=True)  # "hour" or "day"
+    dimension = Column(String, primary_key=True)  # "total", "constituency" or "candidate"
+    key = Column(String, primary_key=True)  # Dimension value ("" for records without one)
+    bucket_start = Column(ISTDateTime, primary_key=True)  # Start of the bucket, Asia/Kolkata wall time
+    total_count = Column(Integer, nullable=False, default=0)
+    deepfake_count = Column(Integer, nullable=False, default=0)
+
+class MerkleBatch(Base):
+    """A sealed batch of verification hashes and the root of its Merkle tree"""
+    __tablename__ = "merkle_batches"
+
+    id = Column(Integer, primary_key=True)
+    root = Column(String(64), nullable=False)  # Hex SHA-256
+    leaf_count = Column(Integer, nullable=False)
+    first_record_id = Column(Integer, nullable=False)
+    last_record_id = Column(Integer, nullable=False, index=True)  # Highest id in the batch; late commits can land in a later batch
+    pruned_count = Column(Integer, nullable=False, default=0)  # Leaves whose records retention has dropped
+    sealed_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+
+class MerkleLeaf(Base):
+    """Where a record sits in its batch, with its packed inclusion proof"""
+    __tablename__ = "merkle_leaves"
+
+    record_id = Column(Integer, primary_key=True)  # verification_records.id
+    batch_id = Column(Integer, nullable=False, index=True)
+    leaf_index = Column(Integer, nullable=False)
+    proof = Column(LargeBinary, nullable=False)  # Sibling digests, 32 bytes each, bottom to top
+
+class IntegrityAuditRun(Base):
+    """One sweep of audit.py over verification_records; last_record_id is the resume checkpoint"""
+    __tablename__ = "integrity_audit_runs"
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False, default="running")  # running / completed
+    workers = Column(Integer, nullable=False)
+    max_record_id = Column(Integer, nullable=False)  # Records added after the run started are left for the next one
+    last_record_id = Column(Integer, nullable=False, default=0)
+    checked = Column(Integer, nullable=False, default=0)
+    tampered = Column(Integer, nullable=False, default=0)
+    unverifiable = Column(Integer, nullable=False, default=0)
+    records_per_second = Column(Float, nullable=True)
+    started_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+    finished_at = Column(ISTDateTime, nullable=True)
+
+class IntegrityAuditFinding(Base):
+    """A record that failed an audit run"""
+    __tablename__ = "integrity_audit_findings"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, nullable=False, index=True)
+    record_id = Column(Integer, nullable=False)
+    analysis_id = Column(String, nullable=False)
+    problem = Column(String, nullable=False)  # hash_mismatch / ledger_mismatch
+    found_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
+
+class RecordPartition(Base):
+    """
+    One month of verification_records (partitions.py): on PostgreSQL a range
+    partition, on SQLite a created_at range of the single table
+    """
+    __tablename__ = "record_partitions"
+
+    period_start = Column(ISTDateTime, primary_key=True)  # First day of the month, Asia/Kolkata wall time
+    period_end = Column(ISTDateTime, nullable=False)  # Exclusive
+    table_name = Column(String, nullable=True)  # PostgreSQL partition
+    state = Column(String, nullable=False, default="hot")  # hot / archived
+    archive_path = Column(String, nullable=True)
+    archived_records = Column(Integer, nullable=True)
+    archive_bytes = Column(BigInteger, nullable=True)
+    archived_at = Column(ISTDateTime, nullable=True)
+
+class SchemaVersion(Base):
+    """One row per applied migration (migrate_database.py); the newest row carries the model fingerprint"""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    fingerprint = Column(String(64), nullable=True)  # SHA-256 of the declared tables, columns and indexes
+    applied_at = Column(ISTDateTime, default=lambda: datetime.now(pytz.timezone('Asia/Kolkata')))
 
 def get_db():
-    """Dependency to get database session"""
+    """Dependency to get a synchronous database session (scripts and background jobs)"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session for request handlers"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engines():
+    """Close pooled async connections on shutdown; aiosqlite connection threads would keep the process alive"""
+    await async_engine.dispose()
+    if SQLITE_TUNED:
+        await async_read_engine.dispose()
+
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,122 @@
+"""
+Deadline-aware analysis helpers
+A client time budget plus live per-stage cost estimates used to plan how many
+frames and ensemble members fit before the deadline.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Fraction of the remaining budget the planner is allowed to spend on inference;
+# the rest covers hashing, the database write and response serialisation.
+PLANNING_SAFETY_FACTOR = 0.8
+MIN_PLANNED_FRAMES = 8
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a result is due"""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = float(budget_ms)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget_ms / 1000.0
+        # Pipeline stages that stopped early because the deadline passed
+        self.truncated_stages: List[str] = []
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000.0)
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started_at) * 1000.0
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def mark_truncated(self, stage: str):
+        if stage not in self.truncated_stages:
+            self.truncated_stages.append(stage)
+
+
+class StageCostEstimator:
+    """
+    Exponentially weighted per-stage costs, updated after every analysis:
+    decode + face detection per frame, inference per face for each member,
+    and the quality heuristics per face.
+    """
+
+    def __init__(self, alpha: float = 0.2, decode_ms_per_frame: float = 40.0,
+                 quality_ms_per_face: float = 15.0, default_infer_ms_per_face: float = 200.0):
+        self.alpha = alpha
+        self.decode_ms_per_frame = decode_ms_per_frame
+        self.quality_ms_per_face = quality_ms_per_face
+        self.default_infer_ms_per_face = default_infer_ms_per_face
+        self.infer_ms_per_face: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _blend(self, current: float, sample: float) -> float:
+        return (1 - self.alpha) * current + self.alpha * sample
+
+    def seed_member(self, name: str, cost_ms_per_face: Optional[float]):
+        """Start a member from its manifest benchmark until live samples arrive"""
+        with self._lock:
+            if name not in self.infer_ms_per_face and cost_ms_per_face is not None:
+                self.infer_ms_per_face[name] = float(cost_ms_per_face)
+
+    def observe_decode(self, ms_per_frame: float):
+        with self._lock:
+            self.decode_ms_per_frame = self._blend(self.decode_ms_per_frame, ms_per_frame)
+
+    def observe_quality(self, ms_per_face: float):
+        with self._lock:
+            self.quality_ms_per_face = self._blend(self.quality_ms_per_face, ms_per_face)
+
+    def observe_inference(self, name: str, ms_per_face: float):
+        with self._lock:
+            current = self.infer_ms_per_face.get(name)
+            self.infer_ms_per_face[name] = ms_per_face if current is None else self._blend(current, ms_per_face)
+
+    def infer_cost(self, name: str) -> float:
+        with self._lock:
+            return self.infer_ms_per_face.get(name, self.default_infer_ms_per_face)
+
+    def estimate_ms(self, frames: int, member_names: List[str], quality_analysis: bool) -> float:
+        per_face = sum(self.infer_cost(name) for name in member_names)
+        with self._lock:
+            per_face += self.decode_ms_per_frame
+            if quality_analysis:
+                per_face += self.quality_ms_per_face
+        return frames * per_face
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "decode_ms_per_frame": round(self.decode_ms_per_frame, 1),
+                "quality_ms_per_face": round(self.quality_ms_per_face, 1),
+                **{f"infer_ms_per_face.{name}": round(cost, 1) for name, cost in self.infer_ms_per_face.items()}
+            }
+
+
+def plan_budget(estimator: StageCostEstimator, deadline: Deadline, max_frames: int,
+                ranked_members: List[Tuple[int, str]], quality_analysis: bool) -> Tuple[int, List[int], float]:
+    """
+    Shrink the frame budget and ensemble subset until the estimated cost fits
+    in the remaining time. Frames are cut first (down to MIN_PLANNED_FRAMES),
+    then the least preferred members, then frames again down to one.
+    ranked_members is [(model_index, member_name)] in preference order.
+    Returns (frames, model_indices, estimated_ms).
+    """
+    budget_ms = deadline.remaining_ms() * PLANNING_SAFETY_FACTOR
+    frames = max_frames
+    members = list(ranked_members)
+
+    def estimate() -> float:
+        return estimator.estimate_ms(frames, [name for _, name in members], quality_analysis)
+
+    while estimate() > budget_ms and frames > min(MIN_PLANNED_FRAMES, max_frames):
+        frames = max(min(MIN_PLANNED_FRAMES, max_frames), frames // 2)
+    while estimate() > budget_ms and len(members) > 1:
+        members.pop()
+    while estimate() > budget_ms and frames > 1:
+        frames = max(1, frames // 2)
+
+    return frames, sorted(index for index, _ in members), estimate()
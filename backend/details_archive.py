@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Compressed month archives of analysis_details
+Once a month falls out of the hot window, partitions.py moves its records'
+details out of the database into one file per month under ARCHIVE_DIR:
+
+    header (16 bytes): MAGIC | codec byte | padding
+    frames:            compressed runs of entries  uint64 record id | uint32 length | payload
+    index:             per frame  uint64 first id | uint64 last id | uint64 offset | uint32 length
+    trailer (20 bytes): uint64 index offset | uint32 frame count | MAGIC
+
+Entries hold the uncompressed details_codec payload and each frame of
+ARCHIVE_FRAME_RECORDS entries is compressed as a whole, so the JSON skeleton
+repeated by every record compresses away. Entries are written in id order; a
+lookup reads the index once per file, bisects it and decompresses one frame.
+Files are written to a temporary name, fsynced and renamed into place, so a
+crashed archive run never leaves a truncated archive behind.
+
+Check an archive:
+    python details_archive.py verify archive/verification_details_2024_01.vda
+"""
+import argparse
+import bisect
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from details_codec import unpack_payload
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_FRAME_RECORDS = int(os.getenv("ARCHIVE_FRAME_RECORDS", "256"))
+# Open archives kept with their index in memory
+ARCHIVE_READERS = 16
+
+MAGIC = b"VDARCH01"
+HEADER = struct.Struct("<8sB7x")
+ENTRY = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<QQQI")
+TRAILER = struct.Struct("<QI8s")
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+ZSTD_LEVEL = 12
+ZLIB_LEVEL = 9
+
+
+def archive_path(month: datetime) -> str:
+    """Archive file for the month containing month (Asia/Kolkata wall time, as stored)"""
+    return os.path.join(ARCHIVE_DIR, f"verification_details_{month:%Y_%m}.vda")
+
+
+class ArchiveWriter:
+    """Writes one archive; add() entries in increasing record id order, then close()"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.codec = CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, self.codec))
+        self._frame: List[bytes] = []
+        self._frame_ids: List[int] = []
+        self._index: List[Tuple[int, int, int, int]] = []
+        self._last_id = 0
+        self.records = 0
+
+    def add(self, record_id: int, payload: bytes):
+        if record_id <= self._last_id:
+            raise ValueError("Archive entries must be added in increasing record id order")
+        self._frame.append(ENTRY.pack(record_id, len(payload)) + payload)
+        self._frame_ids.append(record_id)
+        self._last_id = record_id
+        self.records += 1
+        if len(self._frame) >= ARCHIVE_FRAME_RECORDS:
+            self._flush_frame()
+
+    def _flush_frame(self):
+        if not self._frame:
+            return
+        raw = b"".join(self._frame)
+        if self.codec == CODEC_ZSTD:
+            data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+        else:
+            data = zlib.compress(raw, ZLIB_LEVEL)
+        self._index.append((self._frame_ids[0], self._frame_ids[-1], self._file.tell(), len(data)))
+        self._file.write(data)
+        self._frame, self._frame_ids = [], []
+
+    def close(self) -> int:
+        """Finish the file and move it into place; returns its size in bytes"""
+        self._flush_frame()
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(TRAILER.pack(index_offset, len(self._index), MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        size = self._file.tell()
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        _fsync_directory(os.path.dirname(self.path) or ".")
+        return size
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def _fsync_directory(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Not supported for directories on every platform
+    finally:
+        os.close(fd)
+
+
+class ArchiveReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        with open(path, "rb") as f:
+            magic, self.codec = HEADER.unpack(f.read(HEADER.size))
+            f.seek(-TRAILER.size, os.SEEK_END)
+            index_offset, frames, trailer_magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC or trailer_magic != MAGIC:
+                raise ValueError(f"{path} is not a details archive")
+            f.seek(index_offset)
+            index = [INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size)) for _ in range(frames)]
+        self.first_ids = [entry[0] for entry in index]
+        self.index = index
+        self.identity = _file_identity(path)
+        self._cached_frame: Optional[Tuple[int, Dict[int, bytes]]] = None
+
+    def _read_frame(self, position: int) -> Dict[int, bytes]:
+        cached = self._cached_frame
+        if cached is not None and cached[0] == position:
+            return cached[1]
+        _, _, offset, length = self.index[position]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        if self.codec == CODEC_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("Archive was written with zstd; install zstandard to read it")
+            raw = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            raw = zlib.decompress(data)
+        entries = {}
+        cursor = 0
+        while cursor < len(raw):
+            record_id, size = ENTRY.unpack_from(raw, cursor)
+            cursor += ENTRY.size
+            entries[record_id] = raw[cursor:cursor + size]
+            cursor += size
+        self._cached_frame = (position, entries)
+        return entries
+
+    def payload(self, record_id: int) -> Optional[bytes]:
+        position = bisect.bisect_right(self.first_ids, record_id) - 1
+        if position < 0 or record_id > self.index[position][1]:
+            return None
+        with self._lock:
+            return self._read_frame(position).get(record_id)
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        for position in range(len(self.index)):
+            with self._lock:
+                entries = self._read_frame(position)
+            yield from sorted(entries.items())
+
+
+def _file_identity(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns
+
+
+_readers: "OrderedDict[str, ArchiveReader]" = OrderedDict()
+_readers_lock = threading.Lock()
+
+
+def open_archive(path: str) -> Optional[ArchiveReader]:
+    """Cached reader for path, reopened when the file is replaced; None if it does not exist"""
+    try:
+        identity = _file_identity(path)
+    except FileNotFoundError:
+        return None
+    with _readers_lock:
+        reader = _readers.get(path)
+        if reader is None or reader.identity != identity:
+            reader = ArchiveReader(path)
+            _readers[path] = reader
+        _readers.move_to_end(path)
+        while len(_readers) > ARCHIVE_READERS:
+            _readers.popitem(last=False)
+    return reader
+
+
+def forget_archive(path: str):
+    with _readers_lock:
+        _readers.pop(path, None)
+
+
+def archived_details(record_id: int, created_at: datetime) -> Optional[Dict[str, Any]]:
+    """Details of an archived record from its month's file"""
+    reader = open_archive(archive_path(created_at))
+    payload = reader.payload(record_id) if reader is not None else None
+    return unpack_payload(payload) if payload is not None else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect analysis_details month archives")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.path)
+    count = 0
+    for record_id, payload in reader:
+        unpack_payload(payload)
+        count += 1
+    print(f"✅ {args.path}: {count} records in {len(reader.index)} frames, all decode")
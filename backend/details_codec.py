@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Compact storage codec for analysis_details
+Numeric arrays (per-face, per-model and per-frame predictions) are pulled out of
+the detection dict and packed as binary: probabilities in [0, 1] are quantized
+to uint16, other floats stored as float16, and the whole blob is zstd-compressed
+(zlib when zstandard is not installed). The remaining structure is kept as a
+small JSON skeleton, so decoding only happens when the details are accessed.
+
+Blob layout (before compression):
+    uint32 skeleton length | skeleton JSON | array bytes...
+and after: MAGIC | codec byte | compressed payload. The skeleton lists each
+array as [dtype, byte length, path] so decoding patches arrays straight into
+place instead of walking the whole structure.
+
+Convert legacy JSON rows:
+    python details_codec.py migrate [--batch-size 500]
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    print("⚠️  zstandard not installed, analysis_details will be packed with zlib")
+
+MAGIC = b"VD1"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+
+# Shorter lists stay inline in the skeleton; packing them would not pay off
+PACK_MIN_LENGTH = 4
+
+# dtype tag -> (numpy dtype, lossy)
+DTYPES = {
+    "q16": (np.uint16, True),    # value * 65535, for probabilities in [0, 1]
+    "f16": (np.float16, True),
+    "f64": (np.float64, False),
+    "i32": (np.int32, False),
+    "i64": (np.int64, False),
+}
+Q16_SCALE = 65535.0
+F16_MAX = 65504.0
+
+
+def _numeric_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) >= PACK_MIN_LENGTH
+        and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value)
+    )
+
+
+def _choose_dtype(values: np.ndarray, all_ints: bool, lossless: bool) -> str:
+    if all_ints:
+        fits_int32 = values.size == 0 or (values.min() >= -2**31 and values.max() < 2**31)
+        return "i32" if fits_int32 else "i64"
+    if lossless or not np.all(np.isfinite(values)):
+        return "f64"
+    if values.min() >= 0.0 and values.max() <= 1.0:
+        return "q16"
+    if np.abs(values).max() <= F16_MAX:
+        return "f16"
+    return "f64"
+
+
+def _encode_array(value: List[Any], lossless: bool) -> Tuple[str, bytes]:
+    all_ints = all(isinstance(item, int) for item in value)
+    values = np.asarray(value, dtype=np.int64 if all_ints else np.float64)
+    tag = _choose_dtype(values, all_ints, lossless)
+    if tag == "q16":
+        packed = np.round(values * Q16_SCALE).astype("<u2")
+    else:
+        packed = values.astype(np.dtype(DTYPES[tag][0]).newbyteorder("<"))
+    return tag, packed.tobytes()
+
+
+def _decode_array(tag: str, data: bytes) -> List[Any]:
+    dtype = np.dtype(DTYPES[tag][0]).newbyteorder("<")
+    values = np.frombuffer(data, dtype=dtype)
+    if tag == "q16":
+        return (values.astype(np.float64) / Q16_SCALE).tolist()
+    if tag in ("i32", "i64"):
+        return values.astype(np.int64).tolist()
+    return values.astype(np.float64).tolist()
+
+
+def _compress(payload: bytes) -> bytes:
+    if ZSTD_AVAILABLE:
+        return MAGIC + bytes([CODEC_ZSTD]) + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return MAGIC + bytes([CODEC_ZLIB]) + zlib.compress(payload, ZLIB_LEVEL)
+
+
+def _decompress(blob: bytes) -> bytes:
+    if blob[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a packed analysis_details blob")
+    codec = blob[len(MAGIC)]
+    body = blob[len(MAGIC) + 1:]
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(body)
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("analysis_details was packed with zstd; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(body)
+    raise ValueError(f"Unknown analysis_details codec {codec}")
+
+
+def pack_details(details: Dict[str, Any], lossless: bool = False) -> bytes:
+    """
+    Pack a detection dict. lossless=True keeps float arrays as float64, which is
+    used for legacy rows whose verification hash covers the exact values.
+    """
+    arrays: List[bytes] = []
+    table: List[List[Any]] = []
+
+    def strip(value, path):
+        if _numeric_list(value):
+            tag, data = _encode_array(value, lossless)
+            table.append([tag, len(data), path])
+            arrays.append(data)
+            return None
+        if isinstance(value, dict):
+            return {key: strip(item, path + [key]) for key, item in value.items()}
+        if isinstance(value, list):
+            return [strip(item, path + [index]) for index, item in enumerate(value)]
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    skeleton = json.dumps({"arrays": table, "details": strip(details, [])}, separators=(",", ":")).encode()
+    payload = struct.pack("<I", len(skeleton)) + skeleton + b"".join(arrays)
+    return _compress(payload)
+
+
+def unpack_details(blob: bytes) -> Dict[str, Any]:
+    return unpack_payload(_decompress(blob))
+
+
+def unpack_payload(payload: bytes) -> Dict[str, Any]:
+    """Decode an uncompressed payload (see details_payload)"""
+    (skeleton_length,) = struct.unpack_from("<I", payload)
+    skeleton = json.loads(payload[4:4 + skeleton_length])
+
+    details = skeleton["details"]
+    offset = 4 + skeleton_length
+    for tag, length, path in skeleton["arrays"]:
+        container = details
+        for step in path[:-1]:
+            container = container[step]
+        container[path[-1]] = _decode_array(tag, payload[offset:offset + length])
+        offset += length
+    return details
+
+
+def normalize_details(details: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The dict exactly as it will read back from storage. Hash this, not the raw
+    result, so verify_integrity on a stored record sees the same values.
+    """
+    return unpack_details(pack_details(details))
+
+
+def read_details(packed: Optional[bytes], legacy_json: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Details from whichever column a row has (packed, or JSON for unmigrated rows)"""
+    if packed is not None:
+        return unpack_details(bytes(packed))
+    return legacy_json
+
+
+def details_payload(packed: Optional[bytes], legacy_json: Optional[Dict[str, Any]]) -> Optional[bytes]:
+    """
+    A row's details as an uncompressed payload, for the month archives
+    (details_archive.py), which compress many rows together. Legacy JSON is
+    packed losslessly first, like the migration does.
+    """
+    if packed is not None:
+        return _decompress(bytes(packed))
+    if legacy_json is not None:
+        return _decompress(pack_details(legacy_json, lossless=True))
+    return None
+
+
+def summary_fields(details: Optional[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+    """Fields promoted to real columns so lists and filters never decode the blob"""
+    details = details or {}
+    return {
+        "faces_analyzed": details.get("faces_analyzed"),
+        "models_used": details.get("models_used"),
+    }
+
+
+def migrate_legacy_rows(engine, batch_size: int = 500) -> int:
+    """
+    Pack rows that still hold JSON in analysis_details, in id order and in small
+    committed batches so it can be interrupted and resumed. Legacy arrays are
+    packed losslessly so their verification hashes stay reproducible.
+    Returns the number of rows converted.
+    """
+    from sqlalchemy import text
+
+    converted = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, analysis_details FROM verification_records "
+                "WHERE analysis_details_packed IS NULL AND analysis_details IS NOT NULL AND id > :last_id "
+                "ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+            updates = []
+            for record_id, raw in rows:
+                details = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+                if details is None or details == "null":
+                    continue
+                updates.append({
+                    "id": record_id,
+                    "packed": pack_details(details, lossless=True),
+                    **summary_fields(details),
+                })
+            if updates:
+                conn.execute(text(
+                    "UPDATE verification_records SET analysis_details_packed = :packed, analysis_details = NULL, "
+                    "faces_analyzed = :faces_analyzed, models_used = :models_used WHERE id = :id"
+                ), updates)
+            converted += len(updates)
+            last_id = rows[-1][0]
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack legacy analysis_details JSON rows")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    sys.path.append(os.path.dirname(__file__))
+    from database import engine
+
+    count = migrate_legacy_rows(engine, args.batch_size)
+    print(f"✅ Packed {count} legacy analysis_details rows")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Dictionary-encoded record dimensions
+verification_records stores election context, candidate and constituency as
+integer ids into the election_contexts / candidates / constituencies lookup
+tables (database.ENCODED_DIMENSIONS), so list filters, group-bys and indexes
+work on 4-byte keys instead of repeated strings. The API keeps using names:
+
+- writes: a before_flush hook turns assigned names into ids, creating lookup
+  rows on first use inside the writer's own transaction;
+- filters: name_filter() compares the id column against an id from the
+  in-process cache, or a one-row subquery for names this process has not seen;
+- reads: VerificationRecord.constituency etc. load the name by primary key.
+
+The name -> id cache only ever holds committed ids. Lookup rows are never
+deleted, so a cached id stays valid for the life of the process.
+"""
+import os
+import sys
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, select, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import SessionLocal, VerificationRecord, ENCODED_DIMENSIONS
+
+PENDING_KEY = "pending_dimension_ids"
+
+# Name attribute -> {name: id}, committed ids only
+_cache: Dict[str, Dict[str, int]] = {attribute: {} for attribute in ENCODED_DIMENSIONS}
+
+
+def cached_id(attribute: str, name: str) -> Optional[int]:
+    return _cache[attribute].get(name)
+
+
+def load_dimension_cache(session: Session = None) -> int:
+    """Fill the cache with every lookup row; returns the number of names cached"""
+    own_session = session is None
+    session = session or SessionLocal()
+    try:
+        for attribute, (table, _) in ENCODED_DIMENSIONS.items():
+            _cache[attribute].update(session.execute(select(table.name, table.id)).all())
+    finally:
+        if own_session:
+            session.close()
+    return sum(len(names) for names in _cache.values())
+
+
+def dimension_names(session: Session, attribute: str) -> Dict[int, str]:
+    """id -> name for one dimension, for mapping grouped ids back to names"""
+    table = ENCODED_DIMENSIONS[attribute][0]
+    return dict(session.execute(select(table.id, table.name)).all())
+
+
+def resolve_ids(session: Session, attribute: str, names: Iterable[str]) -> Dict[str, int]:
+    """
+    name -> id for names, inserting the missing ones in the session's transaction.
+    Ids created here reach the shared cache only once that transaction commits.
+    """
+    table = ENCODED_DIMENSIONS[attribute][0]
+    pending = session.info.setdefault(PENDING_KEY, {}).setdefault(attribute, {})
+    resolved = {}
+    missing = set()
+    for name in names:
+        found = cached_id(attribute, name)
+        if found is None:
+            found = pending.get(name)
+        if found is None:
+            missing.add(name)
+        else:
+            resolved[name] = found
+    if not missing:
+        return resolved
+
+    connection = session.connection()
+    existing = dict(connection.execute(select(table.name, table.id).where(table.name.in_(missing))).all())
+    # Already committed by someone else; safe to share
+    _cache[attribute].update(existing)
+    resolved.update(existing)
+    new_names = sorted(missing - existing.keys())
+    if new_names:
+        dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+        # DO NOTHING: a concurrent writer may insert the same name; its id is read back below
+        connection.execute(dialect_insert(table).values([{"name": name} for name in new_names]).on_conflict_do_nothing())
+        created = dict(connection.execute(select(table.name, table.id).where(table.name.in_(new_names))).all())
+        pending.update(created)
+        resolved.update(created)
+    return resolved
+
+
+def name_filter(attribute: str, name: str):
+    """WHERE clause matching records whose dimension is name"""
+    table, id_attribute = ENCODED_DIMENSIONS[attribute]
+    column = getattr(VerificationRecord, id_attribute)
+    found = cached_id(attribute, name)
+    if found is not None:
+        return column == found
+    # Unknown to this process (new, or created by another worker): one unique-index probe
+    return column == select(table.id).where(table.name == name).correlate(None).scalar_subquery()
+
+
+@event.listens_for(Session, "before_flush")
+def _encode_dimensions(session, flush_context, instances):
+    assigned: Dict[str, Dict[VerificationRecord, Optional[str]]] = {attribute: {} for attribute in ENCODED_DIMENSIONS}
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, VerificationRecord):
+            continue
+        state = sa_inspect(obj)
+        for attribute in ENCODED_DIMENSIONS:
+            history = state.attrs[attribute].history
+            if history.added:
+                assigned[attribute][obj] = history.added[0]
+
+    for attribute, records in assigned.items():
+        if not records:
+            continue
+        ids = resolve_ids(session, attribute, {name for name in records.values() if name is not None})
+        id_attribute = ENCODED_DIMENSIONS[attribute][1]
+        for record, name in records.items():
+            setattr(record, id_attribute, ids[name] if name is not None else None)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    for attribute, created in session.info.pop(PENDING_KEY, {}).items():
+        _cache[attribute].update(created)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    # The lookup rows were rolled back with the transaction
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,175 @@
+"""
+Ensemble manifest for the deepfake detection models
+Describes which classifiers make up the ensemble, where their checkpoints live,
+how much each one counts in the vote and what it costs per face.
+"""
+import os
+import sys
+import json
+import argparse
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Any, Optional
+
+# Classifier classes available in model/training/zoo/classifiers.py
+SUPPORTED_CLASSIFIERS = ("DeepFakeClassifier", "DeepFakeClassifierGWAP", "DeepFakeClassifierSRM")
+
+DEFAULT_INPUT_SIZE = 224
+
+
+def default_manifest_path() -> str:
+    """Resolve the manifest location (MODEL_MANIFEST_PATH or model/ensemble_manifest.json)"""
+    if os.getenv("MODEL_MANIFEST_PATH"):
+        return os.getenv("MODEL_MANIFEST_PATH")
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(backend_dir), "model", "ensemble_manifest.json")
+
+
+@dataclass
+class EnsembleMember:
+    """A single model in the ensemble"""
+    name: str
+    classifier: str
+    encoder: str
+    checkpoint: str
+    weight: float = 1.0
+    cost_ms_per_face: Optional[float] = None
+    benchmark_device: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EnsembleMember":
+        checkpoint = data["checkpoint"]
+        member = cls(
+            name=data.get("name") or checkpoint,
+            classifier=data.get("classifier", "DeepFakeClassifier"),
+            encoder=data["encoder"],
+            checkpoint=checkpoint,
+            weight=float(data.get("weight", 1.0)),
+            cost_ms_per_face=data.get("cost_ms_per_face"),
+            benchmark_device=data.get("benchmark_device"),
+        )
+        if member.classifier not in SUPPORTED_CLASSIFIERS:
+            raise ValueError(f"Unknown classifier '{member.classifier}' for member '{member.name}'")
+        if member.weight <= 0:
+            raise ValueError(f"Member '{member.name}' must have a positive weight")
+        return member
+
+    @property
+    def needs_benchmark(self) -> bool:
+        return self.cost_ms_per_face is None
+
+
+@dataclass
+class EnsembleManifest:
+    """Ordered list of ensemble members plus shared preprocessing settings"""
+    members: List[EnsembleMember] = field(default_factory=list)
+    input_size: int = DEFAULT_INPUT_SIZE
+    path: Optional[str] = None
+
+    @property
+    def checkpoints(self) -> List[str]:
+        return [member.checkpoint for member in self.members]
+
+    def get(self, name: str) -> Optional[EnsembleMember]:
+        for member in self.members:
+            if member.name == name:
+                return member
+        return None
+
+    def add(self, member: EnsembleMember):
+        if self.get(member.name):
+            raise ValueError(f"Member '{member.name}' is already in the manifest")
+        self.members.append(member)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "input_size": self.input_size,
+            "members": [asdict(member) for member in self.members],
+        }
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """Write the manifest back to disk; returns False if the file is not writable"""
+        target = path or self.path or default_manifest_path()
+        try:
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+                f.write("\n")
+            os.replace(tmp_path, target)
+            return True
+        except OSError as e:
+            print(f"⚠️  Could not write ensemble manifest {target}: {e}")
+            return False
+
+
+def load_manifest(path: Optional[str] = None) -> EnsembleManifest:
+    """Load and validate the ensemble manifest"""
+    manifest_path = path or default_manifest_path()
+    with open(manifest_path) as f:
+        data = json.load(f)
+
+    members = [EnsembleMember.from_dict(item) for item in data.get("members", [])]
+    names = [member.name for member in members]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate member names in {manifest_path}")
+
+    return EnsembleManifest(
+        members=members,
+        input_size=int(data.get("input_size", DEFAULT_INPUT_SIZE)),
+        path=manifest_path,
+    )
+
+
+def add_member(manifest_path: str, member: EnsembleMember, weights_dir: Optional[str] = None,
+               benchmark: bool = True) -> EnsembleMember:
+    """Append a member to the manifest and benchmark it if its checkpoint is available"""
+    manifest = load_manifest(manifest_path)
+    manifest.add(member)
+
+    if benchmark:
+        # Imported lazily so the manifest can be edited without torch installed
+        from model_loader import benchmark_member
+        cost_ms, device = benchmark_member(member, weights_dir, manifest.input_size)
+        if cost_ms is not None:
+            member.cost_ms_per_face = cost_ms
+            member.benchmark_device = device
+
+    manifest.save()
+    return member
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the deepfake ensemble manifest")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="Show ensemble members")
+    list_parser.add_argument("--manifest", default=None)
+
+    add_parser = subparsers.add_parser("add", help="Add a member and benchmark it")
+    add_parser.add_argument("--manifest", default=None)
+    add_parser.add_argument("--checkpoint", required=True)
+    add_parser.add_argument("--encoder", required=True)
+    add_parser.add_argument("--classifier", default="DeepFakeClassifier", choices=SUPPORTED_CLASSIFIERS)
+    add_parser.add_argument("--name", default=None)
+    add_parser.add_argument("--weight", type=float, default=1.0)
+    add_parser.add_argument("--weights-dir", default=os.getenv("MODEL_WEIGHTS_DIR"))
+    add_parser.add_argument("--no-benchmark", action="store_true")
+
+    args = parser.parse_args()
+    manifest_path = args.manifest or default_manifest_path()
+
+    if args.command == "list":
+        manifest = load_manifest(manifest_path)
+        for member in manifest.members:
+            cost = f"{member.cost_ms_per_face:.1f} ms/face" if member.cost_ms_per_face is not None else "not benchmarked"
+            print(f"{member.name}: {member.classifier}/{member.encoder} weight={member.weight} ({cost})")
+    else:
+        sys.path.append(os.path.dirname(__file__))
+        new_member = EnsembleMember.from_dict({
+            "name": args.name,
+            "classifier": args.classifier,
+            "encoder": args.encoder,
+            "checkpoint": args.checkpoint,
+            "weight": args.weight,
+        })
+        added = add_member(manifest_path, new_member, args.weights_dir, benchmark=not args.no_benchmark)
+        print(f"✅ Added {added.name} to {manifest_path} (cost: {added.cost_ms_per_face} ms/face)")
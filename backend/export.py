@@ -0,0 +1,188 @@
+"""
+Streaming bulk export of verification_records
+Rows are read through a server-side cursor (stream + yield_per) and encoded one
+batch at a time, so memory stays flat and the first bytes go out immediately
+however large the export is. Formats: NDJSON, CSV and, when pyarrow is
+installed, Parquet (one row group per batch).
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, VerificationRecord, ENCODED_DIMENSIONS
+from dimensions import name_filter
+from details_codec import read_details
+from details_archive import archived_details
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+    print("⚠️  pyarrow not installed, Parquet export is disabled")
+
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+EXPORT_COLUMNS = [
+    "analysis_id", "filename", "file_hash", "verification_hash", "is_deepfake", "confidence_score",
+    "election_context", "candidate_name", "constituency", "user_id", "analysis_mode",
+    "processing_time", "faces_analyzed", "models_used", "created_at",
+]
+DETAILS_COLUMN = "analysis_details"
+
+
+def export_query(constituency: Optional[str] = None, candidate_name: Optional[str] = None,
+                 user_id: Optional[int] = None, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None, include_details: bool = False):
+    """Export rows over [start, end) in (created_at, id) order"""
+    # Dimension names come from joins to the small lookup tables rather than a subquery per row
+    columns = [
+        ENCODED_DIMENSIONS[name][0].name.label(name) if name in ENCODED_DIMENSIONS else getattr(VerificationRecord, name)
+        for name in EXPORT_COLUMNS
+    ]
+    if include_details:
+        columns += [
+            VerificationRecord.analysis_details_packed, VerificationRecord.analysis_details_json,
+            VerificationRecord.details_archived, VerificationRecord.id,
+        ]
+    query = select(*columns).select_from(VerificationRecord)
+    for table, id_attribute in ENCODED_DIMENSIONS.values():
+        query = query.outerjoin(table, table.id == getattr(VerificationRecord, id_attribute))
+    if constituency:
+        query = query.where(name_filter("constituency", constituency))
+    if candidate_name:
+        query = query.where(name_filter("candidate_name", candidate_name))
+    if user_id is not None:
+        query = query.where(VerificationRecord.user_id == user_id)
+    if start:
+        query = query.where(VerificationRecord.created_at >= start)
+    if end:
+        query = query.where(VerificationRecord.created_at < end)
+    return query.order_by(VerificationRecord.created_at, VerificationRecord.id)
+
+
+def _row_values(row, include_details: bool) -> List[Any]:
+    values = list(row[:len(EXPORT_COLUMNS)])
+    if include_details:
+        packed, legacy_json, archived, record_id = row[len(EXPORT_COLUMNS):]
+        details = read_details(packed, legacy_json)
+        if details is None and archived:
+            # Months past the hot window keep their details in the month archive
+            details = archived_details(record_id, values[EXPORT_COLUMNS.index("created_at")])
+        values.append(details)
+    return values
+
+
+def _column_names(include_details: bool) -> List[str]:
+    return EXPORT_COLUMNS + ([DETAILS_COLUMN] if include_details else [])
+
+
+def _encode_ndjson(batch: Sequence, include_details: bool) -> bytes:
+    names = _column_names(include_details)
+    return b"".join(
+        orjson.dumps(dict(zip(names, _row_values(row, include_details))), option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+        for row in batch
+    )
+
+
+def _flat_value(value: Any) -> Any:
+    """CSV and Parquet cells: datetimes as ISO strings, details as a JSON string"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema(include_details: bool):
+    fields = [
+        ("analysis_id", pyarrow.string()), ("filename", pyarrow.string()), ("file_hash", pyarrow.string()),
+        ("verification_hash", pyarrow.string()), ("is_deepfake", pyarrow.bool_()),
+        ("confidence_score", pyarrow.float64()), ("election_context", pyarrow.string()),
+        ("candidate_name", pyarrow.string()), ("constituency", pyarrow.string()),
+        ("user_id", pyarrow.int64()), ("analysis_mode", pyarrow.string()),
+        ("processing_time", pyarrow.float64()), ("faces_analyzed", pyarrow.int32()),
+        ("models_used", pyarrow.int32()), ("created_at", pyarrow.timestamp("us")),
+    ]
+    if include_details:
+        fields.append((DETAILS_COLUMN, pyarrow.string()))
+    return pyarrow.schema(fields)
+
+
+async def stream_export(query, export_format: str, include_details: bool = False,
+                        batch_size: int = EXPORT_BATCH_SIZE,
+                        session_factory=AsyncSessionLocal) -> AsyncIterator[bytes]:
+    """
+    Yield the encoded export batch by batch. Runs in its own session (from
+    session_factory, e.g. a read replica's) so the cursor stays open for the
+    whole response, independent of request scope.
+    """
+    names = _column_names(include_details)
+    csv_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_buffer)
+    parquet_sink = parquet_writer = None
+    if export_format == "csv":
+        csv_writer.writerow(names)
+        yield csv_buffer.getvalue().encode()
+    elif export_format == "parquet":
+        schema = _parquet_schema(include_details)
+        parquet_sink = _ChunkSink()
+        parquet_writer = pyarrow.parquet.ParquetWriter(parquet_sink, schema, compression="zstd")
+
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            if export_format == "ndjson":
+                yield _encode_ndjson(batch, include_details)
+            elif export_format == "csv":
+                csv_buffer.seek(0)
+                csv_buffer.truncate()
+                csv_writer.writerows(
+                    [_flat_value(value) for value in _row_values(row, include_details)] for row in batch
+                )
+                yield csv_buffer.getvalue().encode()
+            else:
+                rows = [_row_values(row, include_details) for row in batch]
+                columns: Dict[str, List[Any]] = {
+                    name: [_flat_value(row[i]) if name == DETAILS_COLUMN else row[i] for row in rows]
+                    for i, name in enumerate(names)
+                }
+                parquet_writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+                yield parquet_sink.drain()
+
+    if parquet_writer is not None:
+        parquet_writer.close()
+        yield parquet_sink.drain()
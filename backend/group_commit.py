@@ -0,0 +1,132 @@
+"""
+Group-commit writer for verification records
+With WRITE_BEHIND_ENABLED, /analyze-video hands its record to a background
+task instead of committing it itself. The task gathers records for up to
+GROUP_COMMIT_WINDOW_MS (or until GROUP_COMMIT_MAX_RECORDS are waiting) and
+inserts them in one transaction, so concurrent analyses share a single commit
+and fsync. write() only returns once the transaction holding the record has
+committed, so a response is never sent for a record that is not durable;
+close() stops intake and commits everything already queued before returning.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from database import AsyncSessionLocal, VerificationRecord
+from metrics import registry
+import dimensions  # Registers the flush hook that turns record names into ids
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+GROUP_COMMIT_MAX_RECORDS = int(os.getenv("GROUP_COMMIT_MAX_RECORDS", "64"))
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+
+group_commits = registry.counter(
+    "veritas_group_commits_total", "Transactions run by the group-commit writer", ("outcome",))
+group_commit_records = registry.counter(
+    "veritas_group_commit_records_total", "Records committed by the group-commit writer")
+write_queue_depth = registry.gauge(
+    "veritas_write_queue_depth", "Records waiting for a group commit")
+
+
+class WriterClosed(RuntimeError):
+    """The writer is shutting down and takes no new records"""
+
+
+class GroupCommitWriter:
+    """
+    after_commit runs on each group once its transaction has committed, before
+    the waiting requests are released; main.py appends the records to the ledger
+    there. If a group fails, its records are retried one per transaction so a
+    single bad record only fails its own request.
+    """
+
+    def __init__(self,
+                 after_commit: Optional[Callable[[List[VerificationRecord]], Awaitable[None]]] = None,
+                 max_records: int = None,
+                 window_ms: float = None,
+                 session_factory=AsyncSessionLocal):
+        self.after_commit = after_commit
+        self.max_records = max_records or GROUP_COMMIT_MAX_RECORDS
+        self.window_seconds = (window_ms if window_ms is not None else GROUP_COMMIT_WINDOW_MS) / 1000
+        self.session_factory = session_factory
+
+        self._pending: Deque[Tuple[Dict[str, Any], asyncio.Future]] = deque()
+        self._ready = asyncio.Event()  # At least one record is waiting
+        self._full = asyncio.Event()  # A whole group is waiting; commit without finishing the window
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def write(self, values: Dict[str, Any]) -> VerificationRecord:
+        """Queue one record (VerificationRecord column values) and wait until it is committed"""
+        if self._closed:
+            raise WriterClosed("Record writer is shutting down")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((values, future))
+        write_queue_depth.set(len(self._pending))
+        self._ready.set()
+        if len(self._pending) >= self.max_records:
+            self._full.set()
+        # A cancelled request stops waiting, but its record is still committed with the group
+        return await asyncio.shield(future)
+
+    async def close(self):
+        """Refuse new records, commit the queued ones and stop"""
+        self._closed = True
+        self._ready.set()
+        self._full.set()
+        if self._task is not None:
+            await self._task
+        print("💾 Record writer drained")
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            if not self._closed and len(self._pending) < self.max_records:
+                # Give concurrent requests the window to join this group
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.max_records))]
+            write_queue_depth.set(len(self._pending))
+            if len(self._pending) < self.max_records and not self._closed:
+                self._full.clear()
+            if not self._pending and not self._closed:
+                self._ready.clear()
+            if batch:
+                await self._commit(batch)
+            if self._closed and not self._pending:
+                return
+
+    async def _commit(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        try:
+            records = await self._insert([values for values, _ in batch])
+        except Exception as e:
+            group_commits.inc(outcome="failed")
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            print(f"⚠️ Group commit of {len(batch)} records failed, retrying one by one: {e}")
+            for item in batch:
+                await self._commit([item])
+            return
+        group_commits.inc(outcome="committed")
+        group_commit_records.inc(len(records))
+        if self.after_commit is not None:
+            await self.after_commit(records)
+        for (_, future), record in zip(batch, records):
+            if not future.done():
+                future.set_result(record)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> List[VerificationRecord]:
+        # Records are rebuilt on every attempt: a rolled-back flush leaves ids on the old objects
+        records = [VerificationRecord(**values) for values in rows]
+        async with self.session_factory() as db:
+            db.add_all(records)
+            await db.commit()
+        return records
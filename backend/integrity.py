@@ -0,0 +1,54 @@
+"""
+Record integrity checks
+Shared by GET /verification/{id} and the audit job (audit.py), so both
+recompute the verification hash from exactly the same preimage: the record's
+analysis_id, file_hash and decoded analysis_details plus the stored
+hash_metadata and hash_timestamp. Records with a ledger entry must also match it,
+when that entry is in the ledger file this process has open.
+"""
+from typing import Any, Dict, Optional
+
+from canonical import payload_hash
+from ledger import get_ledger
+
+VERIFIED = "verified"
+TAMPERED = "tampered"
+UNVERIFIABLE = "unverifiable"
+
+# Reasons a record does not verify
+HASH_MISMATCH = "hash_mismatch"
+LEDGER_MISMATCH = "ledger_mismatch"
+
+
+def integrity_problem(record_id: int, analysis_id: str, file_hash: str, verification_hash: str,
+                      details: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]],
+                      timestamp: Optional[str], ledger_seq: Optional[int],
+                      ledger_id: Optional[str] = None) -> Optional[str]:
+    """None when the record verifies, else UNVERIFIABLE, HASH_MISMATCH or LEDGER_MISMATCH"""
+    if timestamp is None:
+        # Written before the preimage timestamp was stored
+        return UNVERIFIABLE
+    try:
+        expected = payload_hash(analysis_id, file_hash, details, metadata or {}, timestamp)
+    except Exception:
+        return HASH_MISMATCH
+    if expected != verification_hash:
+        return HASH_MISMATCH
+    if ledger_seq is not None:
+        ledger = get_ledger()
+        if ledger_id is not None and ledger_id != ledger.ledger_id:
+            # Written to another ledger file: another host's, or one that was lost and recreated
+            return UNVERIFIABLE
+        entry = ledger.entry(ledger_seq)
+        if entry is None:
+            return UNVERIFIABLE
+        if entry.record_id != record_id or entry.digest.hex() != verification_hash:
+            # Records from before ledger ids may point into a file that has since been replaced
+            return LEDGER_MISMATCH if ledger_id is not None else UNVERIFIABLE
+    return None
+
+
+def integrity_status(problem: Optional[str]) -> str:
+    if problem is None:
+        return VERIFIED
+    return UNVERIFIABLE if problem == UNVERIFIABLE else TAMPERED
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Append-only verification ledger
+A local file of fixed-size entries, one per verification, mapped with mmap:
+
+    header (64 bytes): MAGIC | entry size | entry count | ledger id
+    entry (128 bytes): seq | record id | created (µs since epoch) |
+                       preimage digest | previous entry hash | entry hash
+
+The preimage digest is the record's verification hash. Each entry hash covers
+the entry's fields and the previous entry's hash, so changing or dropping any
+entry breaks every link after it. Appends take a thread lock plus an flock on
+the file (several workers can share one ledger), lookups by sequence number
+are a single offset read, and verify_chain checks links and sequence numbers
+with numpy over the whole mapping before re-hashing entries.
+
+The ledger id is random and written when the file is created. Records store it
+next to their sequence number, so an entry is only compared with a record from
+the same file: a ledger that was lost and recreated, or another host's, restarts
+at seq 0. LEDGER_PATH must be on persistent storage that a single host writes.
+
+Check a ledger file:
+    python ledger.py verify [--path verification_ledger.bin]
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+    FLOCK_AVAILABLE = True
+except ImportError:
+    FLOCK_AVAILABLE = False
+
+LEDGER_PATH = os.getenv("LEDGER_PATH", "verification_ledger.bin")
+# msync after every append; off by default, the page cache is flushed by the OS
+LEDGER_FSYNC = os.getenv("LEDGER_FSYNC", "false").lower() == "true"
+
+MAGIC = b"VLEDGER1"
+HEADER = struct.Struct("<8sIxxxxQ16s")
+HEADER_SIZE = 64
+ENTRY = struct.Struct("<QQq32s32s32s8x")
+ENTRY_SIZE = ENTRY.size  # 128
+HASHED_SIZE = 8 + 8 + 8 + 32 + 32  # Everything before the entry hash
+GENESIS_HASH = bytes(32)
+GROW_ENTRIES = 8192  # File grows 1 MiB at a time
+VERIFY_CHUNK_ENTRIES = 262144
+
+ENTRY_DTYPE = np.dtype([
+    ("seq", "<u8"), ("record_id", "<u8"), ("created_us", "<i8"),
+    ("digest", "u1", 32), ("prev_hash", "u1", 32), ("entry_hash", "u1", 32), ("padding", "u1", 8),
+])
+assert ENTRY_DTYPE.itemsize == ENTRY_SIZE
+
+
+class LedgerEntry(NamedTuple):
+    seq: int
+    record_id: int
+    created_at: datetime
+    digest: bytes
+    prev_hash: bytes
+    entry_hash: bytes
+
+
+class VerificationLedger:
+    def __init__(self, path: str, fsync: bool = LEDGER_FSYNC):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._flock(True)
+        try:
+            new = os.fstat(self._fd).st_size == 0
+            if new:
+                os.ftruncate(self._fd, HEADER_SIZE + GROW_ENTRIES * ENTRY_SIZE)
+            self._map = mmap.mmap(self._fd, 0)
+            if new:
+                self._map[:HEADER.size] = HEADER.pack(MAGIC, ENTRY_SIZE, 0, uuid.uuid4().bytes)
+            magic, entry_size, count, ledger_id = HEADER.unpack_from(self._map)
+            if magic != MAGIC or entry_size != ENTRY_SIZE:
+                raise ValueError(f"{path} is not a verification ledger")
+            if ledger_id == bytes(16):
+                # Files from before ledger ids; records written to them carry no id
+                ledger_id = uuid.uuid4().bytes
+                self._map[:HEADER.size] = HEADER.pack(magic, entry_size, count, ledger_id)
+        finally:
+            self._flock(False)
+        self.ledger_id = ledger_id.hex()
+
+    def __len__(self) -> int:
+        return HEADER.unpack_from(self._map)[2]
+
+    def _remap(self, size: int):
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        if len(self._map) < size or os.fstat(self._fd).st_size != len(self._map):
+            # The old mapping is not closed: numpy views from entries() may still
+            # point into it; it is released once they are gone
+            self._map = mmap.mmap(self._fd, 0)
+
+    def _flock(self, locked: bool):
+        """Cross-process append lock; without fcntl (Windows) only the thread lock applies"""
+        if FLOCK_AVAILABLE:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if locked else fcntl.LOCK_UN)
+
+    def append(self, record_id: int, digest: bytes, created_at: Optional[datetime] = None) -> int:
+        """Append one entry and return its sequence number"""
+        if len(digest) != 32:
+            raise ValueError("Ledger digests are 32-byte SHA-256 values")
+        created = created_at or datetime.now(timezone.utc)
+        created_us = int(created.timestamp() * 1_000_000)
+        with self._lock:
+            self._flock(True)
+            try:
+                # Another process may have appended or grown the file since our last look
+                self._remap(HEADER_SIZE)
+                seq = len(self)
+                end = HEADER_SIZE + (seq + 1) * ENTRY_SIZE
+                if end > len(self._map):
+                    self._remap(end + GROW_ENTRIES * ENTRY_SIZE)
+                offset = HEADER_SIZE + seq * ENTRY_SIZE
+                prev_hash = GENESIS_HASH if seq == 0 else self._entry_hash_at(seq - 1)
+                body = struct.pack("<QQq32s32s", seq, record_id, created_us, digest, prev_hash)
+                self._map[offset:offset + ENTRY_SIZE] = ENTRY.pack(
+                    seq, record_id, created_us, digest, prev_hash, hashlib.sha256(body).digest()
+                )
+                # The count is bumped last: a crash mid-write leaves an entry that is simply overwritten
+                struct.pack_into("<Q", self._map, 16, seq + 1)
+                if self.fsync:
+                    self._map.flush()
+                return seq
+            finally:
+                self._flock(False)
+
+    def _entry_hash_at(self, seq: int) -> bytes:
+        offset = HEADER_SIZE + seq * ENTRY_SIZE + HASHED_SIZE
+        return bytes(self._map[offset:offset + 32])
+
+    def entry(self, seq: int) -> Optional[LedgerEntry]:
+        """Entry by sequence number, or None past the end"""
+        if seq < 0 or seq >= len(self):
+            return None
+        offset = HEADER_SIZE + (seq + 1) * ENTRY_SIZE
+        if offset > len(self._map):
+            with self._lock:
+                self._remap(offset)
+        seq_, record_id, created_us, digest, prev_hash, entry_hash = ENTRY.unpack_from(
+            self._map, HEADER_SIZE + seq * ENTRY_SIZE
+        )
+        created_at = datetime.fromtimestamp(created_us / 1_000_000, timezone.utc)
+        return LedgerEntry(seq_, record_id, created_at, digest, prev_hash, entry_hash)
+
+    def entries(self) -> np.ndarray:
+        """Structured numpy view of every entry (no copy)"""
+        count = len(self)
+        if HEADER_SIZE + count * ENTRY_SIZE > len(self._map):
+            with self._lock:
+                self._remap(HEADER_SIZE + count * ENTRY_SIZE)
+        return np.frombuffer(self._map, dtype=ENTRY_DTYPE, count=count, offset=HEADER_SIZE)
+
+    def verify_chain(self, chunk_entries: int = VERIFY_CHUNK_ENTRIES) -> Optional[int]:
+        """
+        Sequence number of the first broken entry, or None when the chain is intact.
+        Sequence numbers and prev-hash links are compared for all entries at
+        once; entry hashes are recomputed a chunk at a time straight from the
+        mapping and compared as one array per chunk.
+        """
+        entries = self.entries()
+        count = len(entries)
+        if count == 0:
+            return None
+        bad = entries["seq"] != np.arange(count, dtype=np.uint64)
+        bad[0] |= bool(entries["prev_hash"][0].any())
+        bad[1:] |= (entries["prev_hash"][1:] != entries["entry_hash"][:-1]).any(axis=1)
+        first_link = int(np.argmax(bad)) if bad.any() else count
+
+        sha256 = hashlib.sha256
+        with memoryview(self._map) as view:
+            for start in range(0, first_link, chunk_entries):
+                stop = min(first_link, start + chunk_entries)
+                digests = b"".join([
+                    sha256(view[offset:offset + HASHED_SIZE]).digest()
+                    for offset in range(HEADER_SIZE + start * ENTRY_SIZE, HEADER_SIZE + stop * ENTRY_SIZE, ENTRY_SIZE)
+                ])
+                computed = np.frombuffer(digests, dtype=np.uint8).reshape(-1, 32)
+                mismatched = (computed != entries["entry_hash"][start:stop]).any(axis=1)
+                if mismatched.any():
+                    return start + int(np.argmax(mismatched))
+        return None if first_link == count else first_link
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+_ledger: Optional[VerificationLedger] = None
+_ledger_pid: Optional[int] = None
+
+
+def get_ledger() -> VerificationLedger:
+    """
+    The process's ledger, opened on first use. Reopened after a fork: flock
+    locks belong to the open file, so forked workers must not share one.
+    """
+    global _ledger, _ledger_pid
+    if _ledger is None or _ledger_pid != os.getpid():
+        _ledger = VerificationLedger(LEDGER_PATH)
+        _ledger_pid = os.getpid()
+    return _ledger
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the verification ledger")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("--path", default=LEDGER_PATH)
+    args = parser.parse_args()
+
+    import time
+
+    ledger = VerificationLedger(args.path)
+    began = time.time()
+    broken = ledger.verify_chain()
+    elapsed = time.time() - began
+    if broken is None:
+        print(f"✅ {len(ledger):,} entries verified in {elapsed:.2f}s")
+    else:
+        print(f"❌ Chain broken at entry {broken} of {len(ledger):,}")
@@ -0,0 +1,135 @@
+"""
+Load-adaptive graceful degradation
+Watches inference queue depth and recent p95 latency and moves new requests
+to cheaper analysis modes while the service is saturated.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from analysis_modes import DEGRADATION_LADDER
+from metrics import registry
+
+degradation_level_gauge = registry.gauge(
+    "veritas_degradation_level", "Current load degradation level (0 = full quality)")
+degradation_events = registry.counter(
+    "veritas_degradation_events_total", "Degradation level changes", ("direction",))
+degraded_analyses = registry.counter(
+    "veritas_degraded_analyses_total", "Analyses run below the requested mode", ("requested_mode", "effective_mode"))
+queue_depth_gauge = registry.gauge(
+    "veritas_analysis_queue_depth", "Analyses currently queued or running")
+latency_p95_gauge = registry.gauge(
+    "veritas_analysis_latency_p95_seconds", "p95 latency over the recent analysis window")
+
+
+class LoadGovernor:
+    """
+    Degrades with hysteresis: a level is added when queue depth or p95 latency
+    crosses the degrade threshold and removed only once both fall below the
+    (lower) recover thresholds, with a minimum dwell time between changes.
+    """
+
+    def __init__(self,
+                 degrade_queue_depth: int = None,
+                 recover_queue_depth: int = None,
+                 degrade_p95_seconds: float = None,
+                 recover_p95_seconds: float = None,
+                 dwell_seconds: float = None,
+                 window: int = 50):
+        self.degrade_queue_depth = degrade_queue_depth if degrade_queue_depth is not None else int(os.getenv("DEGRADE_QUEUE_DEPTH", "4"))
+        self.recover_queue_depth = recover_queue_depth if recover_queue_depth is not None else int(os.getenv("RECOVER_QUEUE_DEPTH", "1"))
+        self.degrade_p95_seconds = degrade_p95_seconds if degrade_p95_seconds is not None else float(os.getenv("DEGRADE_P95_SECONDS", "60"))
+        self.recover_p95_seconds = recover_p95_seconds if recover_p95_seconds is not None else float(os.getenv("RECOVER_P95_SECONDS", "30"))
+        self.dwell_seconds = dwell_seconds if dwell_seconds is not None else float(os.getenv("DEGRADE_DWELL_SECONDS", "15"))
+        self.max_level = len(DEGRADATION_LADDER) - 1
+
+        self.level = 0
+        self.in_flight = 0
+        self._latencies = deque(maxlen=window)
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+
+    def p95_latency(self) -> float:
+        if not self._latencies:
+            return 0.0
+        return float(np.percentile(list(self._latencies), 95))
+
+    def admit(self, requested_mode: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Register a new analysis and pick the mode it should run in.
+        Returns (effective_mode, degradation_info or None).
+        """
+        with self._lock:
+            self.in_flight += 1
+            queue_depth_gauge.set(self.in_flight)
+            self._evaluate()
+            level = self.level
+            queue_depth = self.in_flight
+            p95 = self.p95_latency()
+
+        effective_mode = self._degrade(requested_mode, level)
+        if effective_mode == requested_mode:
+            return requested_mode, None
+
+        degraded_analyses.inc(requested_mode=requested_mode, effective_mode=effective_mode)
+        return effective_mode, {
+            "requested_mode": requested_mode,
+            "effective_mode": effective_mode,
+            "level": level,
+            "queue_depth": queue_depth,
+            "p95_latency_seconds": round(p95, 2),
+            "reason": "service under load"
+        }
+
+    def release(self, latency_seconds: Optional[float] = None):
+        """Mark an admitted analysis as finished and record its latency"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            queue_depth_gauge.set(self.in_flight)
+            if latency_seconds is not None:
+                self._latencies.append(latency_seconds)
+                latency_p95_gauge.set(self.p95_latency())
+            self._evaluate()
+
+    def _evaluate(self):
+        """Move one level up or down if the thresholds (and dwell time) allow it"""
+        now = time.monotonic()
+        if now - self._last_change < self.dwell_seconds:
+            return
+
+        p95 = self.p95_latency()
+        overloaded = self.in_flight >= self.degrade_queue_depth or p95 >= self.degrade_p95_seconds
+        calm = self.in_flight <= self.recover_queue_depth and p95 <= self.recover_p95_seconds
+
+        if overloaded and self.level < self.max_level:
+            self.level += 1
+            self._last_change = now
+            degradation_events.inc(direction="degrade")
+            print(f"⚠️  Load degradation level raised to {self.level} (queue={self.in_flight}, p95={p95:.1f}s)")
+        elif calm and self.level > 0:
+            self.level -= 1
+            self._last_change = now
+            degradation_events.inc(direction="recover")
+            print(f"✅ Load degradation level lowered to {self.level} (queue={self.in_flight}, p95={p95:.1f}s)")
+        degradation_level_gauge.set(self.level)
+
+    @staticmethod
+    def _degrade(mode: str, level: int) -> str:
+        """Step `level` rungs down the ladder, never below the cheapest mode"""
+        if level == 0 or mode not in DEGRADATION_LADDER:
+            return mode
+        index = min(DEGRADATION_LADDER.index(mode) + level, len(DEGRADATION_LADDER) - 1)
+        return DEGRADATION_LADDER[index]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "level": self.level,
+                "queue_depth": self.in_flight,
+                "p95_latency_seconds": round(self.p95_latency(), 2),
+                "effective_modes": {mode: self._degrade(mode, self.level) for mode in DEGRADATION_LADDER}
+            }
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from fastapi.responses import JSONResponse, PlainTextResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from sqlalchemy import select, update, func
 import uvicorn
 import os
 import sys
@@ -10,24 +11,52 @@ import hashlib
 import uuid
 from datetime import datetime
 import pytz
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import json
+import asyncio
 
 # Add model directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'model'))
 
-from database import get_db, create_tables, VerificationRecord, User
-from migrate_database import migrate_database
-from sqlalchemy import text, func, case
+from database import get_async_db, dispose_async_engines, AsyncSessionLocal, VerificationRecord, User, StatisticsAggregate, MerkleBatch, MerkleLeaf, RecordPartition
+from migrate_database import migrate_database, SchemaCapabilities, LATEST_VERSION
 from models import VerificationRecordCreate
 from services import DeepfakeDetectionService, BlockchainService
-from schemas import VideoAnalysisRequest, VideoAnalysisResponse, VerificationResponse, UserCreate, UserResponse
+from schemas import (
+    VideoAnalysisRequest, VideoAnalysisResponse, VerificationResponse, VerificationDetailsResponse,
+    VerificationLookupRequest, VerificationLookupResult, UserCreate, UserResponse
+)
+from analysis_modes import ANALYSIS_MODES, get_analysis_mode
+from metrics import registry as metrics_registry
+from deadline import Deadline
+from cancellation import AnalysisCancelled, CancellationToken, watch_disconnect
+from stats_aggregates import (
+    ensure_aggregates, reset_aggregates, build_statistics, statistics_cache, STATISTICS_CACHE_KEY, TOTAL_DIMENSION
+)
+from details_codec import normalize_details, read_details
+from response_cache import verification_cache, cache_entry, etag_matches
+from ledger import get_ledger
+from integrity import integrity_problem, integrity_status
+from anchoring import anchor_periodically, build_proof, reset_anchors
+from replicas import (
+    router as replica_router, get_read_db, read_sessionmaker, reads_own_writes, is_replica, stick_to_primary
+)
+from group_commit import GroupCommitWriter, WriterClosed, WRITE_BEHIND_ENABLED
+from dimensions import name_filter, load_dimension_cache
+from partitions import hot_floor, clear_records, remove_archives, maintain_partitions_periodically, oldest_month_cache
+from export import export_query, stream_export, EXPORT_FORMATS, PARQUET_AVAILABLE
+from pagination import decode_cursor, next_cursor, keyset_condition, keyset_order
+from rollups import (
+    ensure_rollups, reset_rollups, timeseries_query, build_timeseries, bucket_start, to_local,
+    GRAINS, GRAIN_STEP, MAX_TIMESERIES_BUCKETS
+)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Veritas AI - Deepfake Detection System",
     description="Veritas AI: Seeing Through the Illusion. Advanced AI-powered system to detect and verify deepfake videos in electoral content.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend communication
@@ -40,158 +69,215 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize services
 deepfake_service = DeepfakeDetectionService()
 blockchain_service = BlockchainService()
+anchor_task: Optional[asyncio.Task] = None
+replica_task: Optional[asyncio.Task] = None
+partition_task: Optional[asyncio.Task] = None
+# Group-commit writer for /analyze-video, started when WRITE_BEHIND_ENABLED
+record_writer: Optional[GroupCommitWriter] = None
+# Resolved by migrate_database() at startup
+schema_capabilities = SchemaCapabilities(LATEST_VERSION)
 
-def check_user_id_column_exists(db: Session) -> bool:
-    """Check if user_id column exists in verification_records table"""
-    try:
-        # Try to query the user_id column
-        result = db.execute(text("SELECT user_id FROM verification_records LIMIT 1"))
-        return True
-    except Exception:
-        return False
-
-def get_verification_records_safe(db: Session, limit: int = 50, offset: int = 0, 
-                                 constituency: Optional[str] = None, 
-                                 candidate_name: Optional[str] = None):
-    """Get verification records with fallback for missing user_id column"""
-    try:
-        # Try normal ORM query first
-        query = db.query(VerificationRecord)
-        
-        if constituency:
-            query = query.filter(VerificationRecord.constituency == constituency)
-        if candidate_name:
-            query = query.filter(VerificationRecord.candidate_name == candidate_name)
-        
-        return query.order_by(VerificationRecord.created_at.desc()).offset(offset).limit(limit).all()
-    except Exception as e:
-        print(f"⚠️ ORM query failed, trying raw SQL: {e}")
-        # Fallback to raw SQL without user_id column
-        sql = """
-        SELECT id, analysis_id, filename, file_hash, verification_hash, 
-               is_deepfake, confidence_score, election_context, candidate_name, 
-               constituency, analysis_details, created_at, updated_at
-        FROM verification_records
-        """
-        params = {}
-        conditions = []
-        
-        if constituency:
-            conditions.append("constituency = :constituency")
-            params['constituency'] = constituency
-        if candidate_name:
-            conditions.append("candidate_name = :candidate_name")
-            params['candidate_name'] = candidate_name
-            
-        if conditions:
-            sql += " WHERE " + " AND ".join(conditions)
-            
-        sql += " ORDER BY created_at DESC LIMIT :limit OFFSET :offset"
-        params['limit'] = limit
-        params['offset'] = offset
-        
-        result = db.execute(text(sql), params)
-        
-        # Convert to VerificationRecord objects
-        records = []
-        for row in result:
-            record = VerificationRecord()
-            record.id = row[0]
-            record.analysis_id = row[1]
-            record.filename = row[2]
-            record.file_hash = row[3]
-            record.verification_hash = row[4]
-            record.is_deepfake = row[5]
-            record.confidence_score = row[6]
-            record.election_context = row[7]
-            record.candidate_name = row[8]
-            record.constituency = row[9]
-            record.analysis_details = row[10]
-            record.created_at = row[11]
-            record.updated_at = row[12]
-            record.user_id = None  # Set to None since column doesn't exist
-            records.append(record)
-        
-        return records
+# Bulk lookup limits: keys per request, and keys per IN (...) query so the bind
+# parameter count stays well inside SQLite's and asyncpg's limits
+MAX_LOOKUP_KEYS = int(os.getenv("MAX_LOOKUP_KEYS", "5000"))
+LOOKUP_CHUNK_SIZE = 500
+LOOKUP_KEY_COLUMNS = {"analysis_id": VerificationRecord.analysis_id, "file_hash": VerificationRecord.file_hash}
 
-def get_verification_count_safe(db: Session):
-    """Get verification count with fallback for missing user_id column"""
-    try:
-        # Try normal ORM query first
-        return db.query(VerificationRecord).count()
-    except Exception as e:
-        print(f"⚠️ ORM count query failed, trying raw SQL: {e}")
-        # Fallback to raw SQL without user_id column
-        result = db.execute(text("SELECT COUNT(*) FROM verification_records"))
-        return result.scalar()
+async def get_verification_records(db: AsyncSession, limit: int = 50, offset: int = 0,
+                                   constituency: Optional[str] = None,
+                                   candidate_name: Optional[str] = None,
+                                   user_id: Optional[int] = None,
+                                   cursor: Optional[Tuple[datetime, int]] = None,
+                                   include_details: bool = True):
+    """
+    One page of verification records, newest first.
+    With a decoded cursor the page starts after that (created_at, id) position
+    and offset is ignored. include_details=False never reads analysis_details.
+    Columns the database lacks (see schema_capabilities) are not selected and read as None.
+    """
+    if user_id is not None and not schema_capabilities.has("user_id"):
+        # Without the column no record can belong to a user
+        return []
+    query = select(VerificationRecord).options(*schema_capabilities.record_load_options())
+    if not include_details:
+        query = query.options(
+            defer(VerificationRecord.analysis_details_json, raiseload=True),
+            defer(VerificationRecord.analysis_details_packed, raiseload=True)
+        )
+    
+    if constituency:
+        query = query.where(name_filter("constituency", constituency))
+    if candidate_name:
+        query = query.where(name_filter("candidate_name", candidate_name))
+    if user_id is not None:
+        query = query.where(VerificationRecord.user_id == user_id)
+    if cursor:
+        query = query.where(keyset_condition(*cursor))
+    query = query.order_by(*keyset_order())
+    
+    # Read the hot months first (on PostgreSQL only their partitions are scanned)
+    # and continue below them only when the page is not full and older months exist
+    floor = hot_floor()
+    hot = query.where(VerificationRecord.created_at >= floor)
+    skip = 0 if cursor else offset
+    records = []
+    if cursor is None or to_local(cursor[0]) >= floor:
+        result = await db.execute(hot.offset(skip).limit(limit))
+        records = list(result.scalars().all())
+        if len(records) == limit or not await has_cold_months(db, floor):
+            return schema_capabilities.fill_missing(records)
+        if records:
+            skip = 0
+        elif skip:
+            # The offset reaches past every hot row; skip the rest in the older months
+            hot_count = await db.execute(select(func.count(VerificationRecord.id)).where(hot.whereclause))
+            skip = max(0, skip - hot_count.scalar())
+    result = await db.execute(
+        query.where(VerificationRecord.created_at < floor).offset(skip).limit(limit - len(records))
+    )
+    records.extend(result.scalars().all())
+    return schema_capabilities.fill_missing(records)
 
-def get_deepfake_count_safe(db: Session):
-    """Get deepfake count with fallback for missing user_id column"""
-    try:
-        # Try normal ORM query first
-        return db.query(VerificationRecord).filter(VerificationRecord.is_deepfake == True).count()
-    except Exception as e:
-        print(f"⚠️ ORM deepfake count query failed, trying raw SQL: {e}")
-        # Fallback to raw SQL without user_id column
-        result = db.execute(text("SELECT COUNT(*) FROM verification_records WHERE is_deepfake = true"))
-        return result.scalar()
+async def has_cold_months(db: AsyncSession, floor: datetime) -> bool:
+    """Whether the month catalog reaches below the hot window; cached briefly"""
+    cached = oldest_month_cache.get("oldest")
+    if cached is None:
+        cached = ((await db.execute(select(func.min(RecordPartition.period_start)))).scalar(),)
+        oldest_month_cache.set("oldest", cached)
+    # An empty catalog (months not registered yet) cannot rule anything out
+    return cached[0] is None or cached[0] < floor
+
+def verification_list_row(record: VerificationRecord, include_details: bool) -> dict:
+    """One /verifications entry with the same fields as VerificationResponse"""
+    return {
+        "analysis_id": record.analysis_id,
+        "filename": record.filename,
+        "is_deepfake": record.is_deepfake,
+        "confidence_score": record.confidence_score,
+        "verification_hash": record.verification_hash,
+        "is_tampered": False,  # Assume not tampered for list view
+        "election_context": record.election_context,
+        "candidate_name": record.candidate_name,
+        "constituency": record.constituency,
+        "timestamp": record.created_at.isoformat(),
+        "analysis_details": record.analysis_details if include_details else None,
+        "analysis_mode": record.analysis_mode
+    }
+
+def check_integrity(record: VerificationRecord) -> str:
+    """verified / tampered / unverifiable, see integrity.py"""
+    return integrity_status(integrity_problem(
+        record.id, record.analysis_id, record.file_hash, record.verification_hash,
+        record.analysis_details, record.hash_metadata, record.hash_timestamp, record.ledger_seq,
+        record.ledger_id
+    ))
+
+def _append_entries(entries: List[Tuple[int, str]]) -> Tuple[str, List[int]]:
+    ledger = get_ledger()
+    return ledger.ledger_id, [ledger.append(record_id, bytes.fromhex(digest)) for record_id, digest in entries]
 
-def get_constituency_stats_safe(db: Session):
-    """Get constituency statistics with fallback for missing user_id column"""
+async def append_to_ledger(records: List[VerificationRecord]):
+    """
+    Append committed records to the ledger, then store their sequence numbers.
+    Only committed records get an entry, so a rolled-back insert never leaves one
+    for an id that may be reused. The flock/mmap I/O runs in a worker thread. If
+    this fails the records stay without ledger_seq and verify on their hash alone.
+    """
     try:
-        # Try normal ORM query first
-        return db.query(
-            VerificationRecord.constituency,
-            func.count(VerificationRecord.id).label('count'),
-            func.sum(case((VerificationRecord.is_deepfake == True, 1), else_=0)).label('deepfake_count')
-        ).group_by(VerificationRecord.constituency).all()
+        ledger_id, seqs = await asyncio.to_thread(
+            _append_entries, [(record.id, record.verification_hash) for record in records]
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(VerificationRecord), [
+                {"id": record.id, "ledger_seq": seq, "ledger_id": ledger_id} for record, seq in zip(records, seqs)
+            ])
+            await db.commit()
+        for record, seq in zip(records, seqs):
+            record.ledger_seq, record.ledger_id = seq, ledger_id
     except Exception as e:
-        print(f"⚠️ ORM constituency stats query failed, trying raw SQL: {e}")
-        # Fallback to raw SQL without user_id column
-        sql = """
-        SELECT constituency, 
-               COUNT(*) as count,
-               SUM(CASE WHEN is_deepfake = true THEN 1 ELSE 0 END) as deepfake_count
-        FROM verification_records 
-        GROUP BY constituency
-        """
-        result = db.execute(text(sql))
-        
-        # Convert to similar format as ORM result
-        stats = []
-        for row in result:
-            class Stat:
-                def __init__(self, constituency, count, deepfake_count):
-                    self.constituency = constituency
-                    self.count = count
-                    self.deepfake_count = deepfake_count
-            
-            stats.append(Stat(row[0], row[1], row[2]))
-        
-        return stats
+        print(f"⚠️ Ledger append failed for {len(records)} record(s): {e}")
+
+async def load_verification(analysis_id: str, db: AsyncSession) -> VerificationResponse:
+    """Build the VerificationResponse for one record, including the integrity check"""
+    result = await db.execute(
+        select(VerificationRecord).where(VerificationRecord.analysis_id == analysis_id)
+    )
+    record = result.scalars().first()
+    
+    if not record and is_replica(db):
+        # Possibly not replicated yet; the primary decides whether it exists
+        async with AsyncSessionLocal() as primary:
+            return await load_verification(analysis_id, primary)
+    if not record:
+        raise HTTPException(status_code=404, detail="Verification record not found")
+    
+    integrity = check_integrity(record)
+    
+    return VerificationResponse(
+        analysis_id=record.analysis_id,
+        filename=record.filename,
+        is_deepfake=record.is_deepfake,
+        confidence_score=record.confidence_score,
+        verification_hash=record.verification_hash,
+        is_tampered=integrity == "tampered",
+        integrity=integrity,
+        election_context=record.election_context,
+        candidate_name=record.candidate_name,
+        constituency=record.constituency,
+        timestamp=record.created_at.isoformat(),
+        analysis_details=record.analysis_details,
+        analysis_mode=record.analysis_mode
+    )
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and services on startup"""
-    create_tables()
-    # Run database migration to add missing columns
+    global anchor_task, replica_task, partition_task, record_writer, schema_capabilities
+    # Create tables and apply pending migrations; a no-op check when the schema is current
     print("🔄 Running database migration...")
+    schema_capabilities = migrate_database()
+    print(f"✅ Database schema at version {schema_capabilities.version}")
     try:
-        migrate_database()
-        print("✅ Database migration completed")
+        ensure_aggregates()
+        ensure_rollups()
     except Exception as e:
-        print(f"❌ Database migration failed: {e}")
-        # Don't fail startup, but log the error
+        print(f"❌ Statistics aggregate build failed: {e}")
+    try:
+        print(f"🔢 Cached {load_dimension_cache()} constituency, candidate and election context names")
+    except Exception as e:
+        print(f"⚠️ Dimension cache not loaded, names resolve on first use: {e}")
+    anchor_task = asyncio.create_task(anchor_periodically())
+    partition_task = asyncio.create_task(maintain_partitions_periodically())
+    if replica_router.replicas:
+        await replica_router.check_all()
+        replica_task = asyncio.create_task(replica_router.monitor())
+        print(f"📖 Routing reads across {len(replica_router.replicas)} replica(s)")
+    if WRITE_BEHIND_ENABLED:
+        record_writer = GroupCommitWriter(after_commit=append_to_ledger)
+        record_writer.start()
+        print(f"💾 Group commits enabled ({record_writer.max_records} records / {record_writer.window_seconds * 1000:g} ms)")
     print("🚀 Veritas AI - Deepfake Detection System started!")
     print("🎯 Seeing Through the Illusion")
     print("📊 Database initialized")
     print("🔗 Blockchain service ready")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work"""
+    if record_writer is not None:
+        # Commit every record already accepted before the process exits
+        await record_writer.close()
+    for task in (anchor_task, replica_task, partition_task):
+        if task is not None:
+            task.cancel()
+    await dispose_async_engines()
+
 @app.get("/")
 async def root():
     """Root endpoint with system information"""
@@ -217,17 +303,28 @@ async def health_check():
             "deepfake_detection": "active",
             "database": "connected",
             "blockchain": "ready"
-        }
+        },
+        "load": deepfake_service.load_governor.status(),
+        "verification_cache": verification_cache.stats(),
+        "read_replicas": replica_router.status()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-format service metrics"""
+    return PlainTextResponse(metrics_registry.render())
+
 @app.post("/users", response_model=UserResponse)
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_async_db)):
     """
     Create a new user or get existing user by email
     """
+    stick_to_primary(request, response)
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        result = await db.execute(select(User).where(User.email == user_data.email))
+        existing_user = result.scalars().first()
         
         if existing_user:
             # Update existing user information
@@ -237,8 +334,8 @@ async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
             existing_user.purpose = user_data.purpose
             existing_user.updated_at = datetime.now(pytz.timezone('Asia/Kolkata'))
             
-            db.commit()
-            db.refresh(existing_user)
+            await db.commit()
+            await db.refresh(existing_user)
             return existing_user
         else:
             # Create new user
@@ -251,36 +348,59 @@ async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
             )
             
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             return new_user
             
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
 @app.get("/users/{email}", response_model=UserResponse)
-async def get_user_by_email(email: str, db: Session = Depends(get_db)):
+async def get_user_by_email(email: str, db: AsyncSession = Depends(get_read_db)):
     """
     Get user by email address
     """
-    user = db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @app.post("/analyze-video", response_model=VideoAnalysisResponse)
 async def analyze_video(
+    request: Request,
     file: UploadFile = File(...),
     user_id: Optional[int] = None,
     election_context: Optional[str] = None,
     candidate_name: Optional[str] = None,
     constituency: Optional[str] = None,
-    db: Session = Depends(get_db)
+    mode: str = "standard",
+    deadline_ms: Optional[int] = None,
+    response: Response = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Analyze uploaded video for deepfake detection
+    
+    mode selects the latency tier: fast, standard or forensic.
+    deadline_ms is an optional time budget for the whole request; when it is too
+    short for the full analysis a partial verdict is returned with partial=true.
+    If the client disconnects, inference is cancelled and the upload is discarded.
     """
+    if deadline_ms is not None and deadline_ms <= 0:
+        raise HTTPException(status_code=400, detail="deadline_ms must be positive")
+    # Start the clock before the upload is read so the budget covers the whole request
+    deadline = Deadline(deadline_ms) if deadline_ms is not None else None
+    
+    try:
+        analysis_mode = get_analysis_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    temp_file_path = None
+    cancel_token = CancellationToken()
+    disconnect_watcher = None
     try:
         # Validate file type
         if not file.content_type.startswith('video/'):
@@ -300,22 +420,32 @@ async def analyze_video(
         # Calculate file hash for integrity
         file_hash = hashlib.sha256(content).hexdigest()
         
-        # Perform deepfake detection
+        # Perform deepfake detection, stopping early if the client goes away
         print(f"🔍 Analyzing video: {file.filename}")
-        detection_result = await deepfake_service.analyze_video(temp_file_path)
+        disconnect_watcher = asyncio.create_task(watch_disconnect(request, cancel_token))
+        detection_result = await deepfake_service.analyze_video(
+            temp_file_path, mode=analysis_mode.name, deadline=deadline, cancel_token=cancel_token
+        )
+        
+        # Hash exactly what storage will give back (arrays are packed lossily)
+        detection_result = normalize_details(detection_result)
         
-        # Create blockchain hash for tamper-proof verification
+        # Create blockchain hash for tamper-proof verification; the timestamp and
+        # metadata are stored with the record so the hash can be recomputed exactly
+        hash_timestamp = datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
+        hash_metadata = {
+            "filename": file.filename,
+            "election_context": election_context,
+            "candidate_name": candidate_name,
+            "constituency": constituency,
+            "timestamp": hash_timestamp
+        }
         verification_hash = blockchain_service.create_verification_hash(
             analysis_id=analysis_id,
             file_hash=file_hash,
             detection_result=detection_result,
-            metadata={
-                "filename": file.filename,
-                "election_context": election_context,
-                "candidate_name": candidate_name,
-                "constituency": constituency,
-                "timestamp": datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
-            }
+            metadata=hash_metadata,
+            timestamp=hash_timestamp
         )
         
         # Store verification record in database
@@ -329,18 +459,25 @@ async def analyze_video(
             election_context=election_context,
             candidate_name=candidate_name,
             constituency=constituency,
-            analysis_details=detection_result
+            analysis_details=detection_result,
+            analysis_mode=detection_result.get("analysis_mode", analysis_mode.name),
+            processing_time=detection_result.get("processing_time"),
+            hash_timestamp=hash_timestamp,
+            hash_metadata=hash_metadata
         )
         
-        db_record = VerificationRecord(**verification_record.dict())
+        values = verification_record.dict()
         if user_id:
-            db_record.user_id = user_id
-        db.add(db_record)
-        db.commit()
-        db.refresh(db_record)
-        
-        # Clean up temporary file
-        os.remove(temp_file_path)
+            values["user_id"] = user_id
+        if record_writer is not None:
+            # Returns once the group commit holding this record is durable
+            await record_writer.write(values)
+        else:
+            db_record = VerificationRecord(**values)
+            db.add(db_record)
+            await db.commit()
+            await append_to_ledger([db_record])
+        stick_to_primary(request, response)
         
         return VideoAnalysisResponse(
             analysis_id=analysis_id,
@@ -349,112 +486,282 @@ async def analyze_video(
             confidence_score=detection_result["confidence"],
             verification_hash=verification_hash,
             analysis_details=detection_result,
+            analysis_mode=verification_record.analysis_mode,
+            degraded=detection_result.get("degraded", False),
+            partial=detection_result.get("partial", False),
             timestamp=datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
         )
         
+    except HTTPException:
+        raise
+    except WriterClosed as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except AnalysisCancelled as e:
+        # Nobody is waiting for this response; 499 is the conventional "client closed request"
+        raise HTTPException(status_code=499, detail=f"Analysis cancelled: {e}")
     except Exception as e:
-        # Clean up temporary file if it exists
-        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-        
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+    finally:
+        if disconnect_watcher is not None:
+            disconnect_watcher.cancel()
+        # Clean up temporary file if it exists (also on cancellation)
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
 
 @app.get("/verification/{analysis_id}", response_model=VerificationResponse)
-async def get_verification(analysis_id: str, db: Session = Depends(get_db)):
+async def get_verification(analysis_id: str, request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Retrieve verification record by analysis ID
-    """
-    record = db.query(VerificationRecord).filter(
-        VerificationRecord.analysis_id == analysis_id
-    ).first()
     
-    if not record:
-        raise HTTPException(status_code=404, detail="Verification record not found")
-    
-    # Verify blockchain integrity
-    is_tampered = blockchain_service.verify_integrity(
-        analysis_id=record.analysis_id,
-        file_hash=record.file_hash,
-        verification_hash=record.verification_hash,
-        detection_result=record.analysis_details
-    )
+    Responses carry a strong ETag; a matching If-None-Match gets 304. Hot records
+    are served from an in-process LRU without touching the database for up to
+    VERIFICATION_CACHE_TTL_SECONDS.
+    """
+    entry = verification_cache.get(analysis_id)
+    if entry is None:
+        cache_version = verification_cache.version
+        body = (await load_verification(analysis_id, db)).model_dump_json().encode()
+        entry = cache_entry(body)
+        verification_cache.set(analysis_id, entry, size=len(body), if_version=cache_version)
     
-    return VerificationResponse(
-        analysis_id=record.analysis_id,
-        filename=record.filename,
-        is_deepfake=record.is_deepfake,
-        confidence_score=record.confidence_score,
-        verification_hash=record.verification_hash,
-        is_tampered=is_tampered,
-        election_context=record.election_context,
-        candidate_name=record.candidate_name,
-        constituency=record.constituency,
-        timestamp=record.created_at.isoformat(),
-        analysis_details=record.analysis_details
-    )
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/verifications", response_model=List[VerificationResponse])
 async def get_all_verifications(
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
+    constituency: Optional[str] = None,
+    candidate_name: Optional[str] = None,
+    user_id: Optional[int] = None,
+    view: str = "full",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get all verification records with optional filtering.
+    Pass the X-Next-Cursor header from the previous page as `cursor` to page
+    through history without OFFSET scans. view=summary leaves out
+    analysis_details; fetch it per record from /verification/{id}/details.
+    """
+    if view not in ("summary", "full"):
+        raise HTTPException(status_code=400, detail="view must be 'summary' or 'full'")
+    try:
+        decoded_cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    include_details = view == "full"
+    records = await get_verification_records(
+        db, limit, offset, constituency, candidate_name, user_id, decoded_cursor, include_details
+    )
+    
+    page_cursor = next_cursor(records, limit)
+    headers = {"X-Next-Cursor": page_cursor} if page_cursor else None
+    
+    # Fast path: the row values are already typed by the ORM columns, so the rows
+    # are built as plain dicts in VerificationResponse's shape and handed straight
+    # to orjson instead of being re-validated one model at a time.
+    return ORJSONResponse(
+        content=[verification_list_row(record, include_details) for record in records],
+        headers=headers
+    )
+
+@app.get("/verifications/export")
+async def export_verifications(
+    format: str = "ndjson",
     constituency: Optional[str] = None,
     candidate_name: Optional[str] = None,
-    db: Session = Depends(get_db)
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_details: bool = False,
+    request: Request = None
 ):
     """
-    Get all verification records with optional filtering
+    Stream every matching record as NDJSON, CSV or Parquet, oldest first.
+    start/end bound created_at to [start, end). Rows are fetched with a
+    server-side cursor and written as they arrive, so the export size is not
+    limited by memory or request timeouts.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow on the server")
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    query = export_query(
+        constituency, candidate_name, user_id,
+        to_local(start) if start else None, to_local(end) if end else None, include_details
+    )
+    filename = f"verifications-{datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return StreamingResponse(
+        stream_export(query, format, include_details, session_factory=read_sessionmaker(request)[0]),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/verifications/lookup", response_model=List[VerificationLookupResult])
+async def lookup_verifications(request: VerificationLookupRequest, db: AsyncSession = Depends(get_read_db)):
+    """
+    Resolve many analysis IDs or file SHA-256 hashes in one call.
+    Results come back in request order, one per key, with found=false for
+    unknown keys. A file hash analysed more than once resolves to its most
+    recent record. Records are list rows (like /verifications); use
+    /verification/{id} for the full integrity check.
+    """
+    column = LOOKUP_KEY_COLUMNS.get(request.key_type)
+    if column is None:
+        raise HTTPException(status_code=400, detail="key_type must be 'analysis_id' or 'file_hash'")
+    if request.view not in ("summary", "full"):
+        raise HTTPException(status_code=400, detail="view must be 'summary' or 'full'")
+    if len(request.keys) > MAX_LOOKUP_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_LOOKUP_KEYS} keys per lookup")
+    
+    include_details = request.view == "full"
+    unique_keys = list(dict.fromkeys(request.keys))
+    found = {}
+    for start in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+        query = select(VerificationRecord).where(column.in_(unique_keys[start:start + LOOKUP_CHUNK_SIZE]))
+        if not include_details:
+            query = query.options(
+                defer(VerificationRecord.analysis_details_json, raiseload=True),
+                defer(VerificationRecord.analysis_details_packed, raiseload=True)
+            )
+        # Oldest first, so the newest record for a repeated file hash wins
+        result = await db.execute(query.order_by(VerificationRecord.created_at, VerificationRecord.id))
+        for record in result.scalars():
+            found[getattr(record, request.key_type)] = verification_list_row(record, include_details)
+    
+    return ORJSONResponse(content=[
+        {"key": key, "found": key in found, "record": found.get(key)} for key in request.keys
+    ])
+
+@app.get("/verification/{analysis_id}/details", response_model=VerificationDetailsResponse)
+async def get_verification_details(analysis_id: str, db: AsyncSession = Depends(get_read_db)):
+    """
+    Full analysis details for one record (per-face predictions, decision factors, quality data)
     """
-    records = get_verification_records_safe(db, limit, offset, constituency, candidate_name)
+    result = await db.execute(
+        select(VerificationRecord.analysis_details_packed, VerificationRecord.analysis_details_json)
+        .where(VerificationRecord.analysis_id == analysis_id)
+    )
+    row = result.first()
+    
+    if row is None:
+        raise HTTPException(status_code=404, detail="Verification record not found")
     
-    return [
-        VerificationResponse(
-            analysis_id=record.analysis_id,
-            filename=record.filename,
-            is_deepfake=record.is_deepfake,
-            confidence_score=record.confidence_score,
-            verification_hash=record.verification_hash,
-            is_tampered=False,  # Assume not tampered for list view
-            election_context=record.election_context,
-            candidate_name=record.candidate_name,
-            constituency=record.constituency,
-            timestamp=record.created_at.isoformat(),
-            analysis_details=record.analysis_details
+    return VerificationDetailsResponse(analysis_id=analysis_id, analysis_details=read_details(*row) or {})
+
+@app.get("/verification/{analysis_id}/proof")
+async def get_verification_proof(analysis_id: str, db: AsyncSession = Depends(get_read_db)):
+    """
+    Merkle inclusion proof for one record: hash the leaf, then fold in each
+    sibling in order ("left" siblings go first) and compare with the batch root
+    """
+    result = await db.execute(
+        select(VerificationRecord, MerkleLeaf, MerkleBatch)
+        .outerjoin(MerkleLeaf, MerkleLeaf.record_id == VerificationRecord.id)
+        .outerjoin(MerkleBatch, MerkleBatch.id == MerkleLeaf.batch_id)
+        .where(VerificationRecord.analysis_id == analysis_id)
+        .options(
+            defer(VerificationRecord.analysis_details_json, raiseload=True),
+            defer(VerificationRecord.analysis_details_packed, raiseload=True)
         )
-        for record in records
-    ]
+    )
+    row = result.first()
+    
+    if row is None:
+        raise HTTPException(status_code=404, detail="Verification record not found")
+    record, leaf, batch = row
+    if leaf is None or batch is None:
+        raise HTTPException(status_code=404, detail="Record is not anchored in a Merkle batch yet")
+    
+    return build_proof(record, leaf, batch)
+
+@app.get("/analysis-modes")
+async def get_analysis_modes():
+    """
+    List the analysis tiers and their measured latency on this instance
+    """
+    latency = deepfake_service.mode_latency.all_snapshots()
+    return {
+        "default": "standard",
+        "modes": [
+            {**preset.to_dict(), "latency": latency[name]}
+            for name, preset in ANALYSIS_MODES.items()
+        ]
+    }
 
 @app.get("/statistics")
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Get system statistics
     """
-    total_verifications = get_verification_count_safe(db)
-    deepfake_count = get_deepfake_count_safe(db)
-    real_count = total_verifications - deepfake_count
+    # A client that just wrote reads the primary directly: the shared cache may
+    # have been filled from a lagging replica
+    own_writes = reads_own_writes(request)
+    statistics = None if own_writes else statistics_cache.get(STATISTICS_CACHE_KEY)
+    if statistics is None:
+        # Served from the summary table, so the cost does not grow with verification_records
+        result = await db.execute(select(StatisticsAggregate))
+        statistics = build_statistics(result.scalars().all())
+        if not own_writes:
+            statistics_cache.set(STATISTICS_CACHE_KEY, statistics)
+    return statistics
+
+@app.get("/statistics/timeseries")
+async def get_statistics_timeseries(
+    grain: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    constituency: Optional[str] = None,
+    candidate_name: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Deepfake counts and rate per hour or day, optionally for one constituency
+    or one candidate. Served from the rollup tables; buckets use Asia/Kolkata time.
+    """
+    if grain not in GRAINS:
+        raise HTTPException(status_code=400, detail=f"grain must be one of: {', '.join(GRAINS)}")
+    if constituency and candidate_name:
+        raise HTTPException(status_code=400, detail="Filter by constituency or candidate_name, not both")
+    
+    step = GRAIN_STEP[grain]
+    end = bucket_start(end, grain) + step if end else bucket_start(datetime.now(pytz.timezone('Asia/Kolkata')), grain) + step
+    start = bucket_start(start, grain) if start else end - step * (48 if grain == "hour" else 30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / step > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range too large: at most {MAX_TIMESERIES_BUCKETS} {grain} buckets")
     
-    # Get constituency statistics
-    constituency_stats = get_constituency_stats_safe(db)
+    if constituency:
+        dimension, key = "constituency", constituency
+    elif candidate_name:
+        dimension, key = "candidate", candidate_name
+    else:
+        dimension, key = "total", ""
     
+    result = await db.execute(timeseries_query(grain, start, end, dimension, key))
     return {
-        "total_verifications": total_verifications,
-        "deepfake_detected": deepfake_count,
-        "real_videos": real_count,
-        "deepfake_percentage": (deepfake_count / total_verifications * 100) if total_verifications > 0 else 0,
-        "constituency_breakdown": [
-            {
-                "constituency": stat.constituency or "Unknown",
-                "total_videos": stat.count,
-                "deepfake_count": stat.deepfake_count
-            }
-            for stat in constituency_stats
-        ]
+        "grain": grain,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "constituency": constituency,
+        "candidate_name": candidate_name,
+        "buckets": build_timeseries(result.all(), grain, start, end)
     }
 
 @app.post("/create-sample-data")
-async def create_sample_data(db: Session = Depends(get_db)):
+async def create_sample_data(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     Create sample verification records for testing
     """
+    stick_to_primary(request, response)
     import random
     from datetime import datetime, timedelta
     
@@ -468,33 +775,45 @@ async def create_sample_data(db: Session = Depends(get_db)):
         # More realistic confidence scores: high confidence for both deepfake and authentic
         confidence = random.uniform(0.75, 0.95) if is_deepfake else random.uniform(0.75, 0.95)
         
+        analysis_id = f"sample_{i+1:03d}"
+        file_hash = hashlib.sha256(f"sample_file_{i}".encode()).hexdigest()
+        analysis_details = normalize_details({
+            "analysis_method": "sample_data",
+            "is_deepfake": is_deepfake,
+            "confidence": confidence,
+            "faces_analyzed": random.randint(1, 5),
+            "models_used": 1,
+            "timestamp": (datetime.now() - timedelta(days=random.randint(0, 30))).isoformat()
+        })
+        hash_timestamp = datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
+        hash_metadata = {"sample": True}
+        
         record = VerificationRecord(
-            analysis_id=f"sample_{i+1:03d}",
+            analysis_id=analysis_id,
             filename=f"sample_video_{i+1:03d}.mp4",
-            file_hash=hashlib.sha256(f"sample_file_{i}".encode()).hexdigest(),
+            file_hash=file_hash,
             verification_hash=blockchain_service.create_verification_hash(
-                analysis_id=f"sample_{i+1:03d}",
-                file_hash=hashlib.sha256(f"sample_file_{i}".encode()).hexdigest(),
-                detection_result={"is_deepfake": is_deepfake, "confidence": confidence},
-                metadata={"sample": True}
+                analysis_id=analysis_id,
+                file_hash=file_hash,
+                detection_result=analysis_details,
+                metadata=hash_metadata,
+                timestamp=hash_timestamp
             ),
             is_deepfake=is_deepfake,
             confidence_score=confidence,
             election_context="Sample Context",
             candidate_name=random.choice(candidates),
             constituency=random.choice(constituencies),
-            analysis_details={
-                "analysis_method": "sample_data",
-                "faces_analyzed": random.randint(1, 5),
-                "models_used": 1,
-                "timestamp": (datetime.now() - timedelta(days=random.randint(0, 30))).isoformat()
-            }
+            analysis_details=analysis_details,
+            hash_timestamp=hash_timestamp,
+            hash_metadata=hash_metadata
         )
         sample_records.append(record)
     
     # Add all records to database
     db.add_all(sample_records)
-    db.commit()
+    await db.commit()
+    await append_to_ledger(sample_records)
     
     return {
         "message": f"Created {len(sample_records)} sample verification records",
@@ -503,13 +822,23 @@ async def create_sample_data(db: Session = Depends(get_db)):
     }
 
 @app.delete("/clear-all-data")
-async def clear_all_data(db: Session = Depends(get_db)):
+async def clear_all_data(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     Clear all verification records (for testing)
     """
-    count = db.query(VerificationRecord).count()
-    db.query(VerificationRecord).delete()
-    db.commit()
+    stick_to_primary(request, response)
+    # The maintained total instead of a COUNT(*) over the table
+    count = (await db.execute(
+        select(StatisticsAggregate.total_count).where(StatisticsAggregate.dimension == TOTAL_DIMENSION)
+    )).scalar() or 0
+    archives = await db.run_sync(clear_records)
+    # Bulk deletes skip the flush hooks that maintain the counters and the response cache
+    await db.run_sync(reset_aggregates)
+    await db.run_sync(reset_rollups)
+    await db.run_sync(reset_anchors)
+    await db.commit()
+    remove_archives(archives)
+    verification_cache.invalidate()
     
     return {"message": f"Cleared {count} verification records"}
 
@@ -0,0 +1,92 @@
+"""
+Merkle trees over verification hashes
+Leaves and inner nodes are domain-separated (0x00 / 0x01 prefixes, as in
+RFC 6962) so a leaf can never be passed off as an inner node. A level with an
+odd node count promotes its last node unchanged, which keeps proofs for
+leaf i of an n-leaf tree fully determined by (i, n): a proof is just the
+sibling digests, 32 bytes each, bottom to top.
+"""
+import hashlib
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+DIGEST_SIZE = 32
+
+
+def leaf_hash(analysis_id: str, verification_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + analysis_id.encode() + b"\n" + verification_hash.encode()).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def build_levels(leaves: Sequence[bytes]) -> List[List[bytes]]:
+    """Every level of the tree, leaves first and the root level last"""
+    if not leaves:
+        raise ValueError("A Merkle tree needs at least one leaf")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def _path(index: int, leaf_count: int) -> Iterator[Tuple[int, Optional[bool]]]:
+    """
+    (index at level, sibling position) from the leaf up. The position is True
+    when the sibling is on the left, False on the right and None when the node
+    is promoted without a sibling.
+    """
+    size = leaf_count
+    while size > 1:
+        if index % 2:
+            yield index, True
+        elif index + 1 < size:
+            yield index, False
+        else:
+            yield index, None
+        index //= 2
+        size = (size + 1) // 2
+
+
+def inclusion_proof(levels: List[List[bytes]], index: int) -> bytes:
+    """Packed sibling digests for leaf `index`"""
+    siblings = []
+    for level, (position, side) in zip(levels, _path(index, len(levels[0]))):
+        if side is True:
+            siblings.append(level[position - 1])
+        elif side is False:
+            siblings.append(level[position + 1])
+    return b"".join(siblings)
+
+
+def proof_steps(proof: bytes, index: int, leaf_count: int) -> List[Tuple[str, bytes]]:
+    """The proof as ("left" | "right", digest) steps, for clients that verify it themselves"""
+    steps = []
+    offset = 0
+    for _, side in _path(index, leaf_count):
+        if side is None:
+            continue
+        steps.append(("left" if side else "right", proof[offset:offset + DIGEST_SIZE]))
+        offset += DIGEST_SIZE
+    if offset != len(proof):
+        raise ValueError("Proof length does not match the tree shape")
+    return steps
+
+
+def root_from_proof(leaf: bytes, proof: bytes, index: int, leaf_count: int) -> bytes:
+    """Recompute the root in O(log n) hashes"""
+    node = leaf
+    for side, sibling in proof_steps(proof, index, leaf_count):
+        node = node_hash(sibling, node) if side == "left" else node_hash(node, sibling)
+    return node
+
+
+def verify_inclusion(leaf: bytes, proof: bytes, index: int, leaf_count: int, root: bytes) -> bool:
+    try:
+        return root_from_proof(leaf, proof, index, leaf_count) == root
+    except ValueError:
+        return False
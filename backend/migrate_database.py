@@ -1,96 +1,328 @@
 #!/usr/bin/env python3
 """
-Database migration script to add missing user_id column to verification_records table.
-This script safely adds the user_id column if it doesn't exist.
+Versioned database migrations.
+Applied migrations are recorded in the schema_version table together with a
+fingerprint of the tables declared in database.py. At startup the newest
+schema_version row is read once: when its version and fingerprint match this
+code nothing else runs. Otherwise tables are created, pending migrations are
+applied in order and verification_records is inspected once. Either way the
+result is a SchemaCapabilities that request handlers consult instead of
+probing the database per request.
+
+Migrations must be idempotent: databases created before schema_version
+existed run all of them once.
 """
 
+import hashlib
 import os
 import sys
-from sqlalchemy import create_engine, text, inspect
-from sqlalchemy.exc import OperationalError
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, NamedTuple, Optional, Tuple
+from sqlalchemy import create_engine, text, inspect, select, update
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.attributes import set_committed_value
 import logging
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(__file__))
 
-from database import DATABASE_URL, is_postgres
+from database import DATABASE_URL, normalize_database_url, engine as default_engine, Base, VerificationRecord, SchemaVersion, ENCODED_DIMENSIONS
+from details_codec import migrate_legacy_rows
+from partitions import partition_migration, is_partitioned, enforce_analysis_id_uniqueness
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def check_column_exists(engine, table_name, column_name):
-    """Check if a column exists in a table"""
-    inspector = inspect(engine)
-    columns = inspector.get_columns(table_name)
-    return any(col['name'] == column_name for col in columns)
+# Columns added to verification_records after the initial release: (name, SQL type)
+# A plain type name works on both PostgreSQL and SQLite; a dict maps dialect -> type.
+VERIFICATION_RECORD_COLUMNS = [
+    ("user_id", "INTEGER"),
+    ("analysis_mode", "VARCHAR"),
+    ("processing_time", "FLOAT"),
+    ("analysis_details_packed", {"postgresql": "BYTEA", "sqlite": "BLOB"}),
+    ("faces_analyzed", "INTEGER"),
+    ("models_used", "INTEGER"),
+    ("hash_timestamp", "VARCHAR"),
+    ("hash_metadata", "JSON"),
+    ("ledger_seq", "BIGINT"),
+    ("ledger_id", "VARCHAR(32)"),
+]
 
-def migrate_database(database_url=None):
-    """Add missing user_id column to verification_records table"""
-    try:
-        # Use provided database URL or default to the one from database module
-        db_url = database_url or DATABASE_URL
-        logger.info(f"🔍 Starting migration with database URL: {db_url}")
-        # Create engine
-        engine = create_engine(db_url)
-        
-        with engine.connect() as conn:
-            # Check if verification_records table exists
-            inspector = inspect(engine)
-            table_names = inspector.get_table_names()
-            logger.info(f"📋 Found tables: {table_names}")
-            
-            if 'verification_records' not in table_names:
-                logger.info("verification_records table doesn't exist. Skipping migration.")
-                return
-            
-            # Check if user_id column already exists
-            logger.info("🔍 Checking if user_id column exists...")
-            if check_column_exists(engine, 'verification_records', 'user_id'):
-                logger.info("user_id column already exists in verification_records table. No migration needed.")
-                return
-            
-            logger.info("➕ Adding user_id column to verification_records table...")
-            
-            # Add the user_id column
-            if is_postgres:
-                # PostgreSQL syntax
-                alter_sql = """
-                ALTER TABLE verification_records 
-                ADD COLUMN user_id INTEGER;
-                """
-                logger.info("🐘 Using PostgreSQL syntax")
-            else:
-                # SQLite syntax
-                alter_sql = """
-                ALTER TABLE verification_records 
-                ADD COLUMN user_id INTEGER;
-                """
-                logger.info("🗃️ Using SQLite syntax")
-            
-            logger.info(f"🔧 Executing SQL: {alter_sql.strip()}")
+# Attribute key -> column name for every mapped VerificationRecord column
+RECORD_COLUMN_KEYS = {
+    prop.key: prop.columns[0].name for prop in VerificationRecord.__mapper__.column_attrs
+    if prop.columns[0].table is VerificationRecord.__table__
+}
+# String columns replaced by dictionary-encoded ids (migration 4): name -> (lookup table, id column)
+ENCODED_RECORD_COLUMNS = {
+    attribute: (table.__tablename__, id_attribute) for attribute, (table, id_attribute) in ENCODED_DIMENSIONS.items()
+}
+# Old string-keyed list indexes, superseded by the *_id ones
+LEGACY_DIMENSION_INDEXES = [
+    "ix_verification_records_constituency_created_at_id",
+    "ix_verification_records_candidate_created_at_id",
+]
+# Records whose ids are backfilled per transaction
+DIMENSION_BACKFILL_BATCH = 50000
+
+# pg_advisory_lock key held while migrating, so app workers starting together migrate once
+MIGRATION_LOCK_KEY = 7260451
+
+
+@dataclass(frozen=True)
+class SchemaCapabilities:
+    """What the connected database supports, resolved once at startup"""
+    version: int
+    missing_record_columns: FrozenSet[str] = frozenset()  # VerificationRecord attribute keys
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing_record_columns
+
+    def has(self, key: str) -> bool:
+        return key not in self.missing_record_columns
+
+    def missing_name(self, attribute: str) -> bool:
+        """A name attribute is unreadable while its id column is missing"""
+        return not self.has(ENCODED_DIMENSIONS[attribute][1])
+
+    def record_load_options(self):
+        """Query options that keep missing columns out of SELECT VerificationRecord"""
+        return [defer(getattr(VerificationRecord, key)) for key in sorted(self._unloadable())]
+
+    def fill_missing(self, records):
+        """Missing columns read as None on loaded records"""
+        unloadable = self._unloadable()
+        for record in records if unloadable else ():
+            for key in unloadable:
+                set_committed_value(record, key, None)
+        return records
+
+    def _unloadable(self) -> FrozenSet[str]:
+        return self.missing_record_columns | {
+            attribute for attribute in ENCODED_DIMENSIONS if self.missing_name(attribute)
+        }
+
+
+def add_record_columns(engine):
+    """Add VERIFICATION_RECORD_COLUMNS that an older verification_records lacks"""
+    existing = {column["name"] for column in inspect(engine).get_columns("verification_records")}
+    with engine.begin() as conn:
+        for column_name, column_type in VERIFICATION_RECORD_COLUMNS:
+            if column_name in existing:
+                continue
+            if isinstance(column_type, dict):
+                column_type = column_type[engine.dialect.name]
+            alter_sql = f"ALTER TABLE verification_records ADD COLUMN {column_name} {column_type}"
+            logger.info(f"🔧 Executing SQL: {alter_sql}")
             conn.execute(text(alter_sql))
-            conn.commit()
-            
-            logger.info("✅ Successfully added user_id column to verification_records table")
-            
-            # Verify the column was added
-            if check_column_exists(engine, 'verification_records', 'user_id'):
+
+def create_list_indexes(engine):
+    """
+    Create the composite list indexes declared on VerificationRecord.
+    PostgreSQL builds them with CREATE INDEX CONCURRENTLY (outside a transaction),
+    so inserts keep flowing while a large table is indexed; an interrupted build
+    leaves an INVALID index behind, which is dropped and rebuilt. Once the table
+    is partitioned (migration 5) they are plain builds on the parent.
+    """
+    postgres = engine.dialect.name == "postgresql"
+    indexes = [arg for arg in VerificationRecord.__table_args__ if hasattr(arg, "columns")]
+    existing = {column["name"] for column in inspect(engine).get_columns("verification_records")}
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Partitioned tables cannot be indexed CONCURRENTLY; the plain build cascades to every partition
+        concurrently = "CONCURRENTLY " if postgres and not is_partitioned(conn) else ""
+        for index in indexes:
+            if any(column.name not in existing for column in index.columns):
+                # Its columns arrive in a later migration, which builds it
+                continue
+            columns = ", ".join(column.name for column in index.columns)
+            if postgres:
+                invalid = conn.execute(text("""
+                    SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = :name AND NOT i.indisvalid
+                """), {"name": index.name}).first()
+                if invalid:
+                    logger.warning(f"♻️ Rebuilding invalid index {index.name}")
+                    conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {index.name}"))
+                create_sql = f"CREATE INDEX {concurrently}IF NOT EXISTS {index.name} ON verification_records ({columns})"
+            else:
+                create_sql = f"CREATE INDEX IF NOT EXISTS {index.name} ON verification_records ({columns})"
+            logger.info(f"🔧 Executing SQL: {create_sql}")
+            conn.execute(text(create_sql))
+
+def pack_legacy_details(engine):
+    """Pack analysis_details rows written before compact storage"""
+    packed = migrate_legacy_rows(engine)
+    if packed:
+        logger.info(f"📦 Packed analysis_details for {packed} legacy rows")
+
+
+def encode_dimensions(engine):
+    """
+    Move election_context / candidate_name / constituency into lookup tables.
+    Adds the *_id columns, fills the lookup tables from the distinct strings,
+    backfills ids in id-range batches (short transactions, so writers keep going),
+    swaps the list indexes over to the id columns and drops the string columns.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("verification_records")}
+    with engine.begin() as conn:
+        for _, id_column in ENCODED_RECORD_COLUMNS.values():
+            if id_column not in columns:
+                alter_sql = f"ALTER TABLE verification_records ADD COLUMN {id_column} INTEGER"
+                logger.info(f"🔧 Executing SQL: {alter_sql}")
+                conn.execute(text(alter_sql))
+
+    legacy = [name for name in ENCODED_RECORD_COLUMNS if name in columns]
+    if legacy:
+        with engine.begin() as conn:
+            for name in legacy:
+                table = ENCODED_RECORD_COLUMNS[name][0]
+                conn.execute(text(f"""
+                    INSERT INTO {table} (name)
+                    SELECT DISTINCT {name} FROM verification_records
+                    WHERE {name} IS NOT NULL AND {name} NOT IN (SELECT name FROM {table})
+                """))
+            last_id = conn.execute(text("SELECT MAX(id) FROM verification_records")).scalar() or 0
+
+        assignments = ", ".join(
+            f"{ENCODED_RECORD_COLUMNS[name][1]} = (SELECT id FROM {ENCODED_RECORD_COLUMNS[name][0]} "
+            f"WHERE name = verification_records.{name})"
+            for name in legacy
+        )
+        for first in range(0, last_id + 1, DIMENSION_BACKFILL_BATCH):
+            with engine.begin() as conn:
+                conn.execute(text(f"UPDATE verification_records SET {assignments} WHERE id >= :first AND id < :last"),
+                             {"first": first, "last": first + DIMENSION_BACKFILL_BATCH})
+        logger.info(f"🔢 Encoded {', '.join(legacy)} for records up to id {last_id}")
+
+    concurrently = "CONCURRENTLY " if engine.dialect.name == "postgresql" else ""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_name in LEGACY_DIMENSION_INDEXES:
+            conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {index_name}"))
+    create_list_indexes(engine)
+
+    with engine.begin() as conn:
+        for name in legacy:
+            # PostgreSQL drops the column in the catalog; its space is reused as rows are rewritten
+            logger.info(f"🔧 Executing SQL: ALTER TABLE verification_records DROP COLUMN {name}")
+            conn.execute(text(f"ALTER TABLE verification_records DROP COLUMN {name}"))
+
+
+def add_merkle_pruned_count(engine):
+    """merkle_batches.pruned_count for leaves whose records retention drops"""
+    existing = {column["name"] for column in inspect(engine).get_columns("merkle_batches")}
+    if "pruned_count" not in existing:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE merkle_batches ADD COLUMN pruned_count INTEGER NOT NULL DEFAULT 0"))
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable  # (engine) -> None
+
+# Append only; never renumber or edit an applied migration
+MIGRATIONS = [
+    Migration(1, "verification_record_columns", add_record_columns),
+    Migration(2, "list_indexes", create_list_indexes),
+    Migration(3, "pack_legacy_details", pack_legacy_details),
+    Migration(4, "dictionary_encoded_dimensions", encode_dimensions),
+    Migration(5, "monthly_partitions", partition_migration),
+    Migration(6, "merkle_pruned_count", add_merkle_pruned_count),
+    Migration(7, "verification_ledger_ids", add_record_columns),
+    Migration(8, "partitioned_analysis_id_uniqueness", enforce_analysis_id_uniqueness),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def schema_fingerprint() -> str:
+    """SHA-256 over the declared tables, columns, types and indexes plus LATEST_VERSION"""
+    digest = hashlib.sha256(str(LATEST_VERSION).encode())
+    for table in sorted(Base.metadata.tables.values(), key=lambda table: table.name):
+        digest.update(f"\n{table.name}".encode())
+        for column in table.columns:
+            digest.update(f"|{column.name}:{type(column.type).__name__}".encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(f"|{index.name}".encode())
+    return digest.hexdigest()
+
+def recorded_schema(engine) -> Optional[Tuple[int, Optional[str]]]:
+    """(version, fingerprint) of the newest schema_version row, None before the first migration"""
+    if not inspect(engine).has_table(SchemaVersion.__tablename__):
+        return None
+    with engine.connect() as conn:
+        row = conn.execute(
+            select(SchemaVersion.version, SchemaVersion.fingerprint).order_by(SchemaVersion.version.desc()).limit(1)
+        ).first()
+    return tuple(row) if row else None
+
+def resolve_capabilities(engine, version: int) -> SchemaCapabilities:
+    columns = {column["name"] for column in inspect(engine).get_columns("verification_records")}
+    missing = frozenset(key for key, name in RECORD_COLUMN_KEYS.items() if name not in columns)
+    return SchemaCapabilities(version, missing)
+
+@contextmanager
+def migration_lock(engine):
+    """Serialize migrations across processes; SQLite already has a single writer"""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+def migrate_database(database_url=None) -> SchemaCapabilities:
+    """Bring the database up to LATEST_VERSION and return what it supports"""
+    db_url = normalize_database_url(database_url) if database_url else DATABASE_URL
+    engine = default_engine if db_url == DATABASE_URL else create_engine(db_url)
+    fingerprint = schema_fingerprint()
+    version = 0
+    try:
+        if recorded_schema(engine) == (LATEST_VERSION, fingerprint):
+            logger.info(f"✅ Schema is current (version {LATEST_VERSION})")
+            return SchemaCapabilities(LATEST_VERSION)
+
+        with migration_lock(engine):
+            # Another process may have finished migrating while we waited for the lock
+            recorded = recorded_schema(engine)
+            if recorded == (LATEST_VERSION, fingerprint):
+                return SchemaCapabilities(LATEST_VERSION)
+            version = recorded[0] if recorded else 0
+            logger.info(f"🔍 Migrating {engine.dialect.name} schema from version {version} to {LATEST_VERSION}")
+
+            Base.metadata.create_all(bind=engine)
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                logger.info(f"🔄 Applying migration {migration.version}: {migration.name}")
+                migration.apply(engine)
+                with engine.begin() as conn:
+                    conn.execute(SchemaVersion.__table__.insert(), {"version": migration.version, "name": migration.name})
+                version = migration.version
+
+            capabilities = resolve_capabilities(engine, version)
+            if capabilities.complete:
+                # Only a schema that matches the models may take the fast path next time
+                with engine.begin() as conn:
+                    conn.execute(update(SchemaVersion).where(SchemaVersion.version == version).values(fingerprint=fingerprint))
                 logger.info("✅ Migration completed successfully")
             else:
-                logger.error("❌ Migration failed - user_id column not found after adding")
-                
-    except OperationalError as e:
-        if "already exists" in str(e) or "duplicate column" in str(e):
-            logger.info("user_id column already exists. No migration needed.")
-        else:
-            logger.error(f"Database error during migration: {e}")
-            # Don't raise the error to prevent app startup failure
-            logger.warning("Continuing with application startup despite migration error")
+                logger.warning(f"⚠️ verification_records lacks {sorted(capabilities.missing_record_columns)}; "
+                               "those fields read as empty")
+            return capabilities
     except Exception as e:
-        logger.error(f"Unexpected error during migration: {e}")
+        logger.error(f"Database error during migration: {e}")
         # Don't raise the error to prevent app startup failure
         logger.warning("Continuing with application startup despite migration error")
+        try:
+            return resolve_capabilities(engine, version)
+        except Exception:
+            return SchemaCapabilities(version)
 
 if __name__ == "__main__":
     logger.info("Starting database migration...")
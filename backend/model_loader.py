@@ -1,6 +1,6 @@
 """
-EfficientNet-B7 Model Loader for Deepfake Detection
-Loads and manages the ensemble of 7 EfficientNet-B7 models
+EfficientNet Model Loader for Deepfake Detection
+Loads and manages the ensemble described by model/ensemble_manifest.json
 """
 import os
 import sys
@@ -9,41 +9,114 @@ import time
 import torch
 import cv2
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from torchvision import transforms
 
 # Add model directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'model'))
 
-from training.zoo.classifiers import DeepFakeClassifier
+from training.zoo.classifiers import DeepFakeClassifier, DeepFakeClassifierGWAP, DeepFakeClassifierSRM, encoder_params
+from ensemble_manifest import EnsembleMember, load_manifest
+from deadline import Deadline, StageCostEstimator, plan_budget
+from cancellation import AnalysisCancelled, CancellationToken
+
+CLASSIFIER_CLASSES = {
+    "DeepFakeClassifier": DeepFakeClassifier,
+    "DeepFakeClassifierGWAP": DeepFakeClassifierGWAP,
+    "DeepFakeClassifierSRM": DeepFakeClassifierSRM,
+}
+
+BENCHMARK_BATCH_SIZE = 4
+BENCHMARK_ITERATIONS = 3
+
+# Faces per forward pass when a deadline is set, so it can be checked between chunks
+DEADLINE_CHUNK_SIZE = 8
+
+
+def build_member_model(member: EnsembleMember, checkpoint_path: str, device: torch.device) -> torch.nn.Module:
+    """Instantiate a manifest member and load its checkpoint"""
+    if member.encoder not in encoder_params:
+        raise ValueError(f"Unknown encoder '{member.encoder}' for member '{member.name}'")
+
+    model = CLASSIFIER_CLASSES[member.classifier](encoder=member.encoder).to(device)
+
+    checkpoint = torch.load(checkpoint_path, map_location=device)
+    state_dict = checkpoint.get("state_dict", checkpoint)
+
+    # Remove 'module.' prefix if present
+    state_dict = {re.sub("^module.", "", k): v for k, v in state_dict.items()}
+
+    model.load_state_dict(state_dict, strict=True)
+    model.eval()
+
+    # Use half precision if on GPU for faster inference
+    if device.type == "cuda":
+        model = model.half()
+
+    return model
+
+
+def measure_cost_ms_per_face(model: torch.nn.Module, device: torch.device, input_size: int) -> float:
+    """Time a forward pass on a dummy batch and return milliseconds per face"""
+    dummy_input = torch.randn(BENCHMARK_BATCH_SIZE, 3, input_size, input_size).to(device)
+    if device.type == "cuda":
+        dummy_input = dummy_input.half()
+
+    with torch.no_grad():
+        # Warm-up pass so lazy initialisation is not counted
+        model(dummy_input)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+
+        start_time = time.perf_counter()
+        for _ in range(BENCHMARK_ITERATIONS):
+            model(dummy_input)
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start_time
+
+    return round(elapsed * 1000 / (BENCHMARK_ITERATIONS * BENCHMARK_BATCH_SIZE), 2)
+
+
+def benchmark_member(member: EnsembleMember, weights_dir: Optional[str] = None,
+                     input_size: int = 224) -> Tuple[Optional[float], Optional[str]]:
+    """Load a single member and measure its per-face cost (used when adding to the manifest)"""
+    weights_dir = weights_dir or default_weights_dir()
+    checkpoint_path = os.path.join(weights_dir, member.checkpoint)
+    if not os.path.exists(checkpoint_path):
+        print(f"⚠️  Checkpoint not found, skipping benchmark: {checkpoint_path}")
+        return None, None
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = build_member_model(member, checkpoint_path, device)
+    cost_ms = measure_cost_ms_per_face(model, device, input_size)
+    print(f"⏱️  {member.name}: {cost_ms} ms/face on {device.type}")
+    return cost_ms, device.type
+
+
+def default_weights_dir() -> str:
+    """Default weights location: project root / model / weights"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(backend_dir), "model", "weights")
 
 
 class EfficientNetB7Ensemble:
     """
-    Ensemble of 7 EfficientNet-B7 models for robust deepfake detection
+    Ensemble of EfficientNet models for robust deepfake detection
     """
     
-    def __init__(self, weights_dir: str = None):
+    def __init__(self, weights_dir: str = None, manifest_path: str = None):
         # Resolve the weights directory path relative to this file
         if weights_dir is None:
-            # Get the directory where this file is located (backend/)
-            backend_dir = os.path.dirname(os.path.abspath(__file__))
-            # Go up one level and into model/weights
-            weights_dir = os.path.join(os.path.dirname(backend_dir), "model", "weights")
+            weights_dir = default_weights_dir()
         
         self.weights_dir = os.path.abspath(weights_dir)
+        self.manifest = load_manifest(manifest_path)
         self.models = []
+        self.members: List[EnsembleMember] = []
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.input_size = 224
-        self.model_files = [
-            "final_111_DeepFakeClassifier_tf_efficientnet_b7_ns_0_36",
-            "final_555_DeepFakeClassifier_tf_efficientnet_b7_ns_0_19",
-            "final_777_DeepFakeClassifier_tf_efficientnet_b7_ns_0_29",
-            "final_777_DeepFakeClassifier_tf_efficientnet_b7_ns_0_31",
-            "final_888_DeepFakeClassifier_tf_efficientnet_b7_ns_0_37",
-            "final_888_DeepFakeClassifier_tf_efficientnet_b7_ns_0_40",
-            "final_999_DeepFakeClassifier_tf_efficientnet_b7_ns_0_23"
-        ]
+        self.input_size = self.manifest.input_size
+        self.model_files = self.manifest.checkpoints
         
         # Preprocessing transform
         self.transform = transforms.Compose([
@@ -58,72 +131,38 @@ class EfficientNetB7Ensemble:
             cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         )
         
+        # Live per-stage costs used to plan deadline-bounded analyses
+        self.cost_estimator = StageCostEstimator()
+        
         self.models_loaded = False
     
     def load_models(self) -> bool:
-        """Load all 7 EfficientNet-B7 models"""
+        """Load every model listed in the ensemble manifest"""
         try:
-            print(f"🔄 Loading EfficientNet-B7 ensemble models...")
+            print(f"🔄 Loading ensemble models from {self.manifest.path}...")
             print(f"📁 Weights directory: {self.weights_dir}")
             print(f"🖥️  Device: {self.device}")
-            print(f"📋 Model files to load: {self.model_files}")
             
-            loaded_count = 0
-            for model_file in self.model_files:
-                model_path = os.path.join(self.weights_dir, model_file)
-                print(f"🔍 Checking model: {model_file}")
-                print(f"🔍 Full path: {model_path}")
+            for member in self.manifest.members:
+                model_path = os.path.join(self.weights_dir, member.checkpoint)
                 
                 if not os.path.exists(model_path):
-                    print(f"⚠️  Model file not found: {model_file}")
+                    print(f"⚠️  Model file not found: {member.checkpoint}")
                     continue
                 
-                print(f"✅ Model file exists, loading...")
-                # Initialize model
-                model = DeepFakeClassifier(encoder="tf_efficientnet_b7_ns").to(self.device)
-                
-                # Load checkpoint
-                print(f"   Loading {model_file}...")
-                checkpoint = torch.load(model_path, map_location=self.device)
-                state_dict = checkpoint.get("state_dict", checkpoint)
-                
-                # Remove 'module.' prefix if present
-                state_dict = {re.sub("^module.", "", k): v for k, v in state_dict.items()}
-                
-                # Load state dict
-                model.load_state_dict(state_dict, strict=True)
-                model.eval()
-                
-                # Use half precision if on GPU for faster inference
-                if self.device.type == "cuda":
-                    model = model.half()
+                print(f"   Loading {member.name} ({member.classifier}/{member.encoder})...")
+                model = build_member_model(member, model_path, self.device)
                 
                 self.models.append(model)
-                loaded_count += 1
-                print(f"   ✅ Loaded {model_file} (Model {loaded_count})")
+                self.members.append(member)
+                print(f"   ✅ Loaded {member.checkpoint}")
             
             if len(self.models) > 0:
                 self.models_loaded = True
-                print(f"🎉 Successfully loaded {len(self.models)} EfficientNet-B7 models")
-                print(f"🔍 DEBUG: Models loaded: {[f'Model_{i+1}' for i in range(len(self.models))]}")
-                
-                # Test models with dummy input
-                print(f"🧪 Testing models with dummy input...")
-                try:
-                    dummy_input = torch.randn(1, 3, self.input_size, self.input_size).to(self.device)
-                    if self.device.type == "cuda":
-                        dummy_input = dummy_input.half()
-                    
-                    for i, model in enumerate(self.models):
-                        with torch.no_grad():
-                            test_output = model(dummy_input)
-                            test_pred = torch.sigmoid(test_output).cpu().numpy().flatten()[0]
-                            print(f"   Model {i+1} test prediction: {test_pred:.3f}")
-                    
-                    print(f"✅ All models are working correctly!")
-                except Exception as e:
-                    print(f"❌ Error testing models: {e}")
-                
+                print(f"🎉 Successfully loaded {len(self.models)} ensemble models")
+                self._benchmark_new_members()
+                for member in self.members:
+                    self.cost_estimator.seed_member(member.name, member.cost_ms_per_face)
                 return True
             else:
                 print("❌ No models were loaded")
@@ -135,81 +174,164 @@ class EfficientNetB7Ensemble:
             traceback.print_exc()
             return False
     
-    def extract_faces_from_video(self, video_path: str, max_frames: int = 8) -> List[np.ndarray]:
-        """Extract faces from video frames - optimized for speed"""
+    def _benchmark_new_members(self):
+        """Measure per-face cost for members added to the manifest without one"""
+        benchmarked = False
+        for member, model in zip(self.members, self.models):
+            if not member.needs_benchmark:
+                continue
+            try:
+                member.cost_ms_per_face = measure_cost_ms_per_face(model, self.device, self.input_size)
+                member.benchmark_device = self.device.type
+                benchmarked = True
+                print(f"⏱️  Benchmarked {member.name}: {member.cost_ms_per_face} ms/face")
+            except Exception as e:
+                print(f"❌ Error benchmarking {member.name}: {e}")
+        
+        if benchmarked:
+            self.manifest.save()
+    
+    @property
+    def model_size_mb(self) -> float:
+        """Total size of the loaded checkpoints on disk"""
+        total_bytes = 0
+        for member in self.members:
+            model_path = os.path.join(self.weights_dir, member.checkpoint)
+            if os.path.exists(model_path):
+                total_bytes += os.path.getsize(model_path)
+        return total_bytes / (1024 * 1024)
+    
+    def extract_faces_from_video(self, video_path: str, max_frames: int = 8,
+                                 decode_backend: str = "seek",
+                                 deadline: Optional[Deadline] = None,
+                                 cancel_token: Optional[CancellationToken] = None) -> List[np.ndarray]:
+        """Extract faces from video frames - optimized for speed
+        
+        decode_backend "seek" jumps to each sampled frame; "sequential" grabs every frame
+        and only decodes the sampled ones, which is cheaper when many frames are sampled.
+        With a deadline, extraction stops between frames once it has expired; a cancelled
+        token aborts it with AnalysisCancelled.
+        """
         try:
             cap = cv2.VideoCapture(video_path)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             
-            print(f"🔍 DEBUG: Video opened successfully")
-            print(f"🔍 DEBUG: Total frames: {total_frames}")
-            print(f"🔍 DEBUG: Face cascade loaded: {self.face_cascade is not None}")
-            
             # Sample fewer frames for faster processing
             frame_indices = np.linspace(0, total_frames - 1, min(max_frames, total_frames), dtype=int)
             
-            print(f"🔍 DEBUG: Frame indices: {frame_indices}")
-            
             faces = []
-            faces_detected_count = 0
-            for frame_idx in frame_indices:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    continue
-                
-                # Convert to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Detect faces with improved parameters
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                detected_faces = self.face_cascade.detectMultiScale(
-                    gray, 
-                    scaleFactor=1.05,  # More sensitive
-                    minNeighbors=3,    # Lower threshold
-                    minSize=(50, 50)   # Minimum face size
-                )
-                
-                print(f"🔍 DEBUG: Frame {frame_idx}: {len(detected_faces)} faces detected")
-                
-                if len(detected_faces) > 0:
-                    faces_detected_count += 1
-                    # Use the largest face
-                    largest_face = max(detected_faces, key=lambda x: x[2] * x[3])
-                    x, y, w, h = largest_face
-                    
-                    # Add padding around face
-                    padding = 20
-                    x = max(0, x - padding)
-                    y = max(0, y - padding)
-                    w = min(frame_rgb.shape[1] - x, w + 2*padding)
-                    h = min(frame_rgb.shape[0] - y, h + 2*padding)
-                    
-                    face = frame_rgb[y:y+h, x:x+w]
-                    face_resized = cv2.resize(face, (self.input_size, self.input_size))
-                    faces.append(face_resized)
-                else:
-                    # Use center crop if no face detected
-                    h, w = frame_rgb.shape[:2]
-                    center_crop = frame_rgb[h//4:3*h//4, w//4:3*w//4]
-                    center_crop_resized = cv2.resize(center_crop, (self.input_size, self.input_size))
-                    faces.append(center_crop_resized)
+            start_time = time.perf_counter()
+            for frame in self._iter_frames(cap, frame_indices, decode_backend):
+                if cancel_token is not None and cancel_token.cancelled:
+                    cap.release()
+                    cancel_token.raise_if_cancelled()
+                faces.append(self._crop_face(frame))
+                if deadline is not None and deadline.expired() and len(faces) < len(frame_indices):
+                    print(f"⏰ Deadline reached after {len(faces)}/{len(frame_indices)} frames")
+                    deadline.mark_truncated("frames")
+                    break
             
             cap.release()
-            print(f"🔍 DEBUG: Face extraction complete")
-            print(f"🔍 DEBUG: Total faces extracted: {len(faces)}")
-            print(f"🔍 DEBUG: Frames with faces detected: {faces_detected_count}/{len(frame_indices)}")
+            if faces:
+                self.cost_estimator.observe_decode((time.perf_counter() - start_time) * 1000 / len(faces))
             return faces
             
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error extracting faces: {e}")
             import traceback
             traceback.print_exc()
             return []
     
-    def predict_on_faces(self, faces: List[np.ndarray]) -> Dict[str, Any]:
-        """Run prediction on extracted faces using all models"""
+    def _iter_frames(self, cap, frame_indices: np.ndarray, decode_backend: str):
+        """Yield the decoded BGR frames at frame_indices"""
+        if decode_backend == "sequential":
+            wanted = set(int(idx) for idx in frame_indices)
+            last_index = int(frame_indices[-1]) if len(frame_indices) else -1
+            for frame_idx in range(last_index + 1):
+                if not cap.grab():
+                    break
+                if frame_idx not in wanted:
+                    continue
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield frame
+        else:
+            for frame_idx in frame_indices:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+                ret, frame = cap.read()
+                if ret:
+                    yield frame
+    
+    def _crop_face(self, frame: np.ndarray) -> np.ndarray:
+        """Crop the largest detected face (or the frame centre) resized to the model input"""
+        # Convert to RGB
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+        # Detect faces with improved parameters
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        detected_faces = self.face_cascade.detectMultiScale(
+            gray, 
+            scaleFactor=1.05,  # More sensitive
+            minNeighbors=3,    # Lower threshold
+            minSize=(50, 50)   # Minimum face size
+        )
+        
+        if len(detected_faces) > 0:
+            # Use the largest face
+            largest_face = max(detected_faces, key=lambda x: x[2] * x[3])
+            x, y, w, h = largest_face
+            
+            # Add padding around face
+            padding = 20
+            x = max(0, x - padding)
+            y = max(0, y - padding)
+            w = min(frame_rgb.shape[1] - x, w + 2*padding)
+            h = min(frame_rgb.shape[0] - y, h + 2*padding)
+            
+            face = frame_rgb[y:y+h, x:x+w]
+            return cv2.resize(face, (self.input_size, self.input_size))
+        
+        # Use center crop if no face detected
+        h, w = frame_rgb.shape[:2]
+        center_crop = frame_rgb[h//4:3*h//4, w//4:3*w//4]
+        return cv2.resize(center_crop, (self.input_size, self.input_size))
+    
+    def rank_members(self) -> List[int]:
+        """Member indices in preference order: highest weight first, then cheapest per face"""
+        def rank(i):
+            member = self.members[i]
+            cost = member.cost_ms_per_face if member.cost_ms_per_face is not None else float("inf")
+            return (-member.weight, cost, i)
+        
+        return sorted(range(len(self.models)), key=rank)
+    
+    def select_members(self, max_models: Optional[int] = None) -> List[int]:
+        """Indices of the members to run, in manifest order"""
+        indices = list(range(len(self.models)))
+        if max_models is None or max_models >= len(indices):
+            return indices
+        return sorted(self.rank_members()[:max(1, max_models)])
+    
+    def plan_for_deadline(self, deadline: Deadline, max_frames: int, max_models: Optional[int],
+                          quality_analysis: bool) -> Tuple[int, List[int], float]:
+        """Pick the frame budget and member subset that fit in the remaining time"""
+        selected = set(self.select_members(max_models))
+        ranked = [(i, self.members[i].name) for i in self.rank_members() if i in selected]
+        return plan_budget(self.cost_estimator, deadline, max_frames, ranked, quality_analysis)
+    
+    def predict_on_faces(self, faces: List[np.ndarray], max_models: Optional[int] = None,
+                         quality_analysis: bool = True, member_indices: Optional[List[int]] = None,
+                         deadline: Optional[Deadline] = None,
+                         cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Run prediction on extracted faces using the selected ensemble members
+        
+        With a deadline, it is checked between models and between face chunks. Once it
+        expires the verdict is built from the models that finished (or, if the first
+        model did not finish, from the faces it covered) and flagged as partial.
+        A cancelled token is checked between models and raises AnalysisCancelled.
+        """
         try:
             if not self.models_loaded or len(self.models) == 0:
                 raise Exception("Models not loaded")
@@ -230,42 +352,64 @@ class EfficientNetB7Ensemble:
             if self.device.type == "cuda":
                 batch = batch.half()
             
-            # SIMPLIFIED APPROACH: Direct weighted ensemble with proper thresholds
             all_predictions = []
             model_predictions_list = []
+            partial = False
+            
+            if member_indices is None:
+                member_indices = self.select_members(max_models)
+            members_used = []
+            chunk_size = DEADLINE_CHUNK_SIZE if deadline is not None else len(faces)
             
             with torch.no_grad():
-                # Use all 7 models for better accuracy
-                models_to_use = self.models
-                
-                print(f"🔍 DEBUG: Using {len(models_to_use)} models")
-                print(f"🔍 DEBUG: Batch shape: {batch.shape}")
-                print(f"🔍 DEBUG: Batch device: {batch.device}")
-                
-                for i, model in enumerate(models_to_use):
-                    print(f"🔍 DEBUG: Processing model {i+1}/{len(models_to_use)}")
+                for i in member_indices:
+                    model, member = self.models[i], self.members[i]
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if deadline is not None and members_used and deadline.expired():
+                        deadline.mark_truncated("models")
+                        partial = True
+                        break
                     
-                    # Get predictions for all faces
-                    predictions = model(batch)
-                    print(f"🔍 DEBUG: Raw predictions shape: {predictions.shape}")
-                    print(f"🔍 DEBUG: Raw predictions range: {predictions.min().item():.3f} - {predictions.max().item():.3f}")
+                    # Get predictions for all faces, one chunk at a time under a deadline
+                    model_start = time.perf_counter()
+                    chunks = []
+                    for start in range(0, len(faces), chunk_size):
+                        if deadline is not None and chunks and deadline.expired():
+                            break
+                        if cancel_token is not None:
+                            cancel_token.raise_if_cancelled()
+                        chunk_predictions = model(batch[start:start + chunk_size])
+                        chunks.append(torch.sigmoid(chunk_predictions).cpu().numpy().flatten())
+                    predictions = np.concatenate(chunks)
+                    self.cost_estimator.observe_inference(
+                        member.name, (time.perf_counter() - model_start) * 1000 / len(predictions)
+                    )
                     
-                    predictions = torch.sigmoid(predictions).cpu().numpy().flatten()
-                    print(f"🔍 DEBUG: Sigmoid predictions: {predictions}")
+                    if len(predictions) < len(faces):
+                        deadline.mark_truncated("inference")
+                        partial = True
+                        if members_used:
+                            # Drop the unfinished model, the completed ones cover every face
+                            break
+                        # Out of time inside the first model: keep only the faces it scored
+                        faces = faces[:len(predictions)]
                     
                     # Calculate average across faces for this model
                     model_avg = float(np.mean(predictions))
                     model_predictions_list.append(model_avg)
                     all_predictions.extend(predictions.tolist())
+                    members_used.append(member)
                     
-                    print(f"🔍 DEBUG: Model {i+1} average: {model_avg:.3f}")
+                    if partial:
+                        break
             
-            # SIMPLE WEIGHTED AVERAGE - This is more reliable
-            # Use equal weights for all models
-            final_prediction = float(np.mean(model_predictions_list))
+            # Weighted average using the manifest weights (normalised to sum to 1)
+            member_weights = np.array([member.weight for member in members_used], dtype=float)
+            ensemble_weights = (member_weights / member_weights.sum()).tolist()
+            final_prediction = float(np.dot(ensemble_weights, model_predictions_list))
             
             # Calculate statistics for debugging
-            mean_pred = final_prediction
             std_pred = float(np.std(model_predictions_list))
             min_pred = float(np.min(model_predictions_list))
             max_pred = float(np.max(model_predictions_list))
@@ -273,12 +417,21 @@ class EfficientNetB7Ensemble:
             # Add temporal consistency analysis
             temporal_consistency = self._analyze_temporal_consistency(all_predictions, len(faces))
             
-            # Add quality assessment
-            face_quality = self._assess_face_quality(faces)
+            # Add quality assessment (skipped by the fast tier, or when out of time)
+            if quality_analysis and deadline is not None and deadline.expired():
+                deadline.mark_truncated("quality_analysis")
+                quality_analysis = False
+                partial = True
+            if quality_analysis:
+                quality_start = time.perf_counter()
+                face_quality = self._assess_face_quality(faces)
+                self.cost_estimator.observe_quality((time.perf_counter() - quality_start) * 1000 / len(faces))
+            else:
+                face_quality = {"quality_score": 0.5, "issues": [], "face_count": len(faces), "skipped": True}
             
             # Debug: Print prediction values
             print(f"🔍 Model predictions: {model_predictions_list}")
-            print(f"🔍 Final prediction (mean): {final_prediction:.3f}")
+            print(f"🔍 Final prediction (weighted): {final_prediction:.3f}")
             print(f"🔍 Prediction range: {min_pred:.3f} - {max_pred:.3f}")
             print(f"🔍 Prediction std: {std_pred:.3f}")
             print(f"🔍 Models above 0.5: {sum(1 for p in model_predictions_list if p > 0.5)}/{len(model_predictions_list)}")
@@ -300,18 +453,28 @@ class EfficientNetB7Ensemble:
                 "is_deepfake": is_deepfake,
                 "confidence": confidence,
                 "faces_analyzed": len(faces),
-                "models_used": len(self.models),
+                "models_used": len(model_predictions_list),
+                "ensemble_members": [member.name for member in members_used],
                 "model_predictions": model_predictions_list,
                 "all_face_predictions": all_predictions[:len(faces)],  # First face predictions
-                "min_prediction": float(np.min(model_predictions_list)),
-                "max_prediction": float(np.max(model_predictions_list)),
-                "std_prediction": float(np.std(model_predictions_list)),
+                "min_prediction": min_pred,
+                "max_prediction": max_pred,
+                "std_prediction": std_pred,
                 "temporal_consistency": temporal_consistency,
                 "face_quality": face_quality,
-                "ensemble_weights": [1.0/len(model_predictions_list)] * len(model_predictions_list),
-                "decision_factors": decision_factors
+                "ensemble_weights": ensemble_weights,
+                "decision_factors": decision_factors,
+                "partial": partial,
+                "coverage": {
+                    "faces_scored": len(faces),
+                    "models_planned": len(member_indices),
+                    "models_used": len(members_used),
+                    "quality_analysis": quality_analysis
+                }
             }
             
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             print(f"❌ Error during prediction: {e}")
             raise
@@ -518,6 +681,9 @@ class EfficientNetB7Ensemble:
             factors["face_quality"] = quality_score
             factors["deepfake_suspicion"] = deepfake_suspicion
             
+            # Artifact heuristics are skipped entirely by the fast analysis tier
+            heuristics_enabled = not face_quality.get("skipped", False)
+            
             # 4. HYBRID DECISION - Combine model prediction with heuristic analysis
             # Check if heuristic analysis suggests deepfake despite low model prediction
             deepfake_indicators = face_quality.get("deepfake_indicators", [])
@@ -575,10 +741,10 @@ class EfficientNetB7Ensemble:
                 confidence_boost += 0.04
             
             # CRITICAL: Boost confidence if deepfake suspicion supports the decision
-            if is_deepfake and deepfake_suspicion > 0.3:  # Deepfake detected + artifacts found
+            if heuristics_enabled and is_deepfake and deepfake_suspicion > 0.3:  # Deepfake detected + artifacts found
                 confidence_boost += 0.15  # Strong boost for deepfake with artifacts
                 print(f"🎯 DEEPFAKE ARTIFACTS DETECTED! Suspicion: {deepfake_suspicion:.3f}")
-            elif not is_deepfake and deepfake_suspicion < 0.2:  # Authentic + no artifacts
+            elif heuristics_enabled and not is_deepfake and deepfake_suspicion < 0.2:  # Authentic + no artifacts
                 confidence_boost += 0.1  # Boost for authentic with no artifacts
             
             # Special boost for heuristic-based decisions
@@ -595,7 +761,7 @@ class EfficientNetB7Ensemble:
                 confidence_boost -= 0.02
             
             # Reduce confidence if deepfake suspicion contradicts the decision
-            if is_deepfake and deepfake_suspicion < 0.1:  # Deepfake detected but no artifacts
+            if heuristics_enabled and is_deepfake and deepfake_suspicion < 0.1:  # Deepfake detected but no artifacts
                 confidence_boost -= 0.08
                 print(f"⚠️  WARNING: Deepfake detected but no artifacts found!")
             elif not is_deepfake and deepfake_suspicion > 0.5:  # Authentic but strong artifacts
@@ -640,12 +806,32 @@ class EfficientNetB7Ensemble:
                 "factors": {"error": str(e), "fallback": True}
             }
     
-    def analyze_video(self, video_path: str) -> Dict[str, Any]:
-        """Complete video analysis pipeline - optimized for speed"""
+    def analyze_video(self, video_path: str, max_frames: int = 32, max_models: Optional[int] = None,
+                      decode_backend: str = "seek", quality_analysis: bool = True,
+                      deadline: Optional[Deadline] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """Complete video analysis pipeline - optimized for speed
+        
+        With a deadline, the frame and model budget is planned from the live cost
+        estimates and the result reports the coverage actually achieved.
+        """
         start_time = time.time()
         try:
-            # Extract faces with MORE frames for better deepfake detection
-            faces = self.extract_faces_from_video(video_path, max_frames=32)
+            member_indices = self.select_members(max_models)
+            planned_frames = max_frames
+            estimated_ms = None
+            if deadline is not None:
+                planned_frames, member_indices, estimated_ms = self.plan_for_deadline(
+                    deadline, max_frames, max_models, quality_analysis
+                )
+                print(f"⏱️  Deadline plan: {planned_frames} frames x {len(member_indices)} models "
+                      f"(~{estimated_ms:.0f} ms of {deadline.remaining_ms():.0f} ms left)")
+            
+            # Frame budget, decode backend and ensemble subset come from the analysis mode
+            faces = self.extract_faces_from_video(
+                video_path, max_frames=planned_frames, decode_backend=decode_backend,
+                deadline=deadline, cancel_token=cancel_token
+            )
             
             if len(faces) == 0:
                 # Use computer vision fallback when no faces detected
@@ -654,15 +840,35 @@ class EfficientNetB7Ensemble:
                 return fallback_result
             
             # Run prediction
-            results = self.predict_on_faces(faces)
+            results = self.predict_on_faces(
+                faces, quality_analysis=quality_analysis, member_indices=member_indices,
+                deadline=deadline, cancel_token=cancel_token
+            )
             processing_time = round(time.time() - start_time, 2)
             results["processing_time"] = processing_time
             
+            coverage = results["coverage"]
+            coverage["frames_requested"] = max_frames
+            coverage["frames_planned"] = planned_frames
+            coverage["frames_extracted"] = len(faces)
+            if deadline is not None:
+                coverage["deadline_ms"] = deadline.budget_ms
+                coverage["estimated_ms"] = round(estimated_ms, 1)
+                coverage["deadline_met"] = not deadline.expired()
+                coverage["truncated_stages"] = list(deadline.truncated_stages)
+                # Planning below the requested budget is itself a partial result
+                if (deadline.truncated_stages or planned_frames < max_frames
+                        or len(member_indices) < len(self.select_members(max_models))):
+                    results["partial"] = True
+            
             print(f"🔍 Model loader processing_time: {processing_time}")
             print(f"🔍 Results keys: {list(results.keys())}")
             
             return results
             
+        except AnalysisCancelled as e:
+            print(f"🛑 Analysis cancelled after {time.time() - start_time:.2f}s: {e}")
+            raise
         except Exception as e:
             print(f"❌ Error analyzing video: {e}")
             raise
@@ -14,6 +14,10 @@ class VerificationRecordCreate(BaseModel):
     candidate_name: Optional[str] = None
     constituency: Optional[str] = None
     analysis_details: Optional[Dict[str, Any]] = None
+    analysis_mode: Optional[str] = None
+    processing_time: Optional[float] = None
+    hash_timestamp: Optional[str] = None
+    hash_metadata: Optional[Dict[str, Any]] = None
 
 class VerificationRecordResponse(BaseModel):
     """Pydantic model for verification record responses"""
@@ -28,6 +32,8 @@ class VerificationRecordResponse(BaseModel):
     candidate_name: Optional[str] = None
     constituency: Optional[str] = None
     analysis_details: Optional[Dict[str, Any]] = None
+    analysis_mode: Optional[str] = None
+    processing_time: Optional[float] = None
     created_at: datetime
     updated_at: datetime
 
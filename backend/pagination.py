@@ -0,0 +1,53 @@
+"""
+Keyset (cursor) pagination helpers
+Lists are ordered by (created_at DESC, id DESC); a cursor encodes the last row
+of a page so the next page starts with a bounded index range scan instead of
+skipping OFFSET rows.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from database import VerificationRecord
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def next_cursor(records, limit: int) -> Optional[str]:
+    """Cursor for the page after `records`, or None when this was the last page"""
+    if len(records) < limit or not records:
+        return None
+    last = records[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def keyset_condition(created_at: datetime, record_id: int):
+    """
+    Rows strictly after the cursor in (created_at DESC, id DESC) order.
+    The redundant created_at <= bound gives the planner (SQLite in particular,
+    which will not seek on a plain OR) a range on the index's leading column.
+    """
+    return and_(
+        VerificationRecord.created_at <= created_at,
+        or_(VerificationRecord.created_at < created_at, VerificationRecord.id < record_id)
+    )
+
+
+def keyset_order():
+    return (VerificationRecord.created_at.desc(), VerificationRecord.id.desc())
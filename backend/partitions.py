@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Time-partitioned verification storage
+verification_records is split by calendar month of created_at (Asia/Kolkata
+wall time, as stored). On PostgreSQL it is a RANGE-partitioned table with one
+partition per month, created PARTITION_PREMAKE_MONTHS ahead, plus a DEFAULT
+partition for anything outside them; queries bounded on created_at only scan
+the matching partitions. SQLite has no partitioning, so there a month is a
+created_at range of the one table, reached through the (created_at, id)
+index. Either way each month has a record_partitions row with its state.
+
+Retention: months older than the newest RETENTION_HOT_MONTHS are archived.
+Their analysis_details move to a compressed file per month
+(details_archive.py); the rows keep every other column, so lists, lookups,
+filters and statistics are unaffected and details are served from the file.
+With RETENTION_DROP_MONTHS set, months older than that are dropped outright:
+DETACH + DROP of the partition on PostgreSQL, batched range deletes on SQLite,
+with their counts subtracted from the statistics tables in the same
+transaction.
+
+Usage (from backend/):
+    python partitions.py status
+    python partitions.py ensure
+    python partitions.py retain
+    python partitions.py archive --month 2024-01
+    python partitions.py drop --month 2024-01
+"""
+import argparse
+import asyncio
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, case, delete, update, text, inspect
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(__file__))
+
+from cache import TTLCache
+from database import engine as default_engine, VerificationRecord, RecordPartition, StatisticsRollup, IST
+from anchoring import prune_leaves
+from details_archive import ArchiveWriter, archive_path, open_archive, forget_archive
+from details_codec import details_payload
+from dimensions import dimension_names
+from response_cache import verification_cache
+from rollups import to_local
+from stats_aggregates import (
+    DIMENSION_COLUMNS, MISSING_KEY, TOTAL_DIMENSION, apply_deltas, grouping_column, statistics_cache
+)
+
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+RETENTION_HOT_MONTHS = max(1, int(os.getenv("RETENTION_HOT_MONTHS", "6")))  # Includes the current month
+RETENTION_DROP_MONTHS = int(os.getenv("RETENTION_DROP_MONTHS", "0"))  # 0 keeps records forever
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() == "true"  # Apply retention from the API process
+PARTITION_CHECK_SECONDS = float(os.getenv("PARTITION_CHECK_SECONDS", "3600"))
+
+# Oldest catalogued month, so list pages know whether anything lies below the hot window
+oldest_month_cache = TTLCache(ttl_seconds=60, max_entries=1)
+
+ARCHIVE_BATCH_SIZE = 2000
+
+HOT = "hot"
+ARCHIVED = "archived"
+DEFAULT_PARTITION = "verification_records_default"
+# One row per analysis_id of a partitioned verification_records, kept by row triggers
+ANALYSIS_ID_TABLE = "verification_analysis_ids"
+
+
+def now_local() -> datetime:
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def month_start(value: datetime) -> datetime:
+    return to_local(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def hot_floor(now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest month whose details are still in the database"""
+    return add_months(month_start(now or now_local()), -(RETENTION_HOT_MONTHS - 1))
+
+
+def partition_table_name(period_start: datetime) -> str:
+    return f"verification_records_p{period_start:%Y_%m}"
+
+
+def _in_month(period_start: datetime):
+    return (VerificationRecord.created_at >= period_start,
+            VerificationRecord.created_at < add_months(period_start, 1))
+
+
+def is_partitioned(connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(text("""
+        SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = 'verification_records'
+    """)).first() is not None
+
+
+def _pg_table_exists(connection, name: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+
+def convert_to_partitioned(engine):
+    """
+    Rebuild a plain PostgreSQL verification_records as a partitioned table, in
+    one transaction holding an exclusive lock (writes wait until it commits).
+    The primary key becomes (id, created_at), as partitioning requires, and
+    analysis_id loses its table-wide UNIQUE; migration 8
+    (enforce_analysis_id_uniqueness) puts the check back.
+    """
+    table = VerificationRecord.__table__
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE verification_records IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("UPDATE verification_records SET created_at = COALESCE(updated_at, :now) WHERE created_at IS NULL"),
+                     {"now": now_local()})
+        conn.execute(text("ALTER TABLE verification_records RENAME TO verification_records_unpartitioned"))
+        # Free the index and constraint names for the new table
+        for (name,) in conn.execute(text("""
+            SELECT indexname FROM pg_indexes WHERE tablename = 'verification_records_unpartitioned'
+            AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = 'verification_records_unpartitioned'::regclass)
+        """)).all():
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("ALTER TABLE verification_records_unpartitioned DROP CONSTRAINT IF EXISTS verification_records_pkey"))
+        conn.execute(text("ALTER TABLE verification_records_unpartitioned DROP CONSTRAINT IF EXISTS verification_records_analysis_id_key"))
+
+        conn.execute(text("""
+            CREATE TABLE verification_records (LIKE verification_records_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (created_at)
+        """))
+        conn.execute(text("ALTER TABLE verification_records ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(text("ALTER TABLE verification_records ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text("ALTER SEQUENCE verification_records_id_seq OWNED BY verification_records.id"))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            columns = [column.name for column in index.columns]
+            unique = "UNIQUE " if index.unique and "created_at" in columns else ""
+            conn.execute(text(f"CREATE {unique}INDEX {index.name} ON verification_records ({', '.join(columns)})"))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF verification_records DEFAULT"))
+
+        first, last = conn.execute(text("SELECT MIN(created_at), MAX(created_at) FROM verification_records_unpartitioned")).one()
+        if first is not None:
+            period = month_start(first)
+            while period <= last:
+                conn.execute(text(
+                    f"CREATE TABLE {partition_table_name(period)} PARTITION OF verification_records "
+                    "FOR VALUES FROM (:start) TO (:end)"
+                ), {"start": period, "end": add_months(period, 1)})
+                period = add_months(period, 1)
+        moved = conn.execute(text("INSERT INTO verification_records SELECT * FROM verification_records_unpartitioned")).rowcount
+        conn.execute(text("DROP TABLE verification_records_unpartitioned"))
+    print(f"🗂️ Partitioned verification_records by month ({moved} records moved)")
+
+
+def _create_partition(connection, period_start: datetime):
+    """
+    Add a month to the partitioned table. Rows for it that already landed in the
+    DEFAULT partition are moved into the new table before it is attached.
+    """
+    name = partition_table_name(period_start)
+    bounds = {"start": period_start, "end": add_months(period_start, 1)}
+    connection.execute(text(f"CREATE TABLE {name} (LIKE verification_records INCLUDING DEFAULTS)"))
+    connection.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), bounds)
+    if _pg_table_exists(connection, ANALYSIS_ID_TABLE):
+        # The delete trigger released the moved ids; the detached table has no insert trigger
+        connection.execute(text(f"INSERT INTO {ANALYSIS_ID_TABLE} (analysis_id) SELECT analysis_id FROM {name}"))
+    connection.execute(text(f"ALTER TABLE verification_records ATTACH PARTITION {name} FOR VALUES FROM (:start) TO (:end)"), bounds)
+
+
+def ensure_partitions(engine=None) -> int:
+    """
+    Register every month from the oldest record to PARTITION_PREMAKE_MONTHS
+    ahead, creating the PostgreSQL partitions that are missing. Returns the
+    number of months added.
+    """
+    engine = engine or default_engine
+    session = Session(bind=engine)
+    try:
+        partitioned = is_partitioned(session.connection())
+        known = set(session.execute(select(RecordPartition.period_start)).scalars())
+        oldest = session.execute(select(func.min(VerificationRecord.created_at))).scalar()
+        period = month_start(min([oldest or now_local(), *known]))
+        last = add_months(month_start(now_local()), PARTITION_PREMAKE_MONTHS)
+        added = 0
+        while period <= last:
+            if period not in known:
+                name = None
+                if partitioned:
+                    name = partition_table_name(period)
+                    if not _pg_table_exists(session.connection(), name):
+                        _create_partition(session.connection(), period)
+                session.add(RecordPartition(period_start=period, period_end=add_months(period, 1),
+                                            table_name=name, state=HOT))
+                added += 1
+            period = add_months(period, 1)
+        session.commit()
+        oldest_month_cache.invalidate()
+        return added
+    finally:
+        session.close()
+
+
+def partition_migration(engine):
+    """Migration 5: details_archived column, monthly partitions on PostgreSQL, the month catalog"""
+    columns = {column["name"] for column in inspect(engine).get_columns("verification_records")}
+    if "details_archived" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE verification_records ADD COLUMN details_archived BOOLEAN"))
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            partitioned = is_partitioned(conn)
+        if not partitioned:
+            convert_to_partitioned(engine)
+    ensure_partitions(engine)
+
+
+def enforce_analysis_id_uniqueness(engine):
+    """
+    Migration 8: keep analysis_id unique on a partitioned PostgreSQL table.
+    A partitioned table only enforces UNIQUE constraints that contain the
+    partition key, so (analysis_id, created_at) gets one, and every insert also
+    goes into verification_analysis_ids (primary key analysis_id) through a
+    BEFORE INSERT trigger: an id already stored in any month fails with a
+    unique violation, as on an unpartitioned table. A BEFORE DELETE trigger
+    releases ids; partition drops and TRUNCATE bypass it, so drop_month and
+    clear_records clear the table themselves. Needs PostgreSQL 13+.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return
+        conn.execute(text("LOCK TABLE verification_records IN SHARE ROW EXCLUSIVE MODE"))
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {ANALYSIS_ID_TABLE} (analysis_id VARCHAR PRIMARY KEY)"))
+        duplicates = conn.execute(text(
+            "SELECT COUNT(*) - COUNT(DISTINCT analysis_id) FROM verification_records"
+        )).scalar()
+        if duplicates:
+            print(f"⚠️ {duplicates} records repeat an earlier analysis_id; they are kept, new duplicates are refused")
+        conn.execute(text(f"""
+            INSERT INTO {ANALYSIS_ID_TABLE} (analysis_id)
+            SELECT DISTINCT analysis_id FROM verification_records
+            ON CONFLICT DO NOTHING
+        """))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_verification_records_analysis_id_created_at "
+            "ON verification_records (analysis_id, created_at)"
+        ))
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION claim_analysis_id() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO {ANALYSIS_ID_TABLE} (analysis_id) VALUES (NEW.analysis_id);
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION release_analysis_id() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM {ANALYSIS_ID_TABLE} WHERE analysis_id = OLD.analysis_id;
+                RETURN OLD;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        # A row moving between partitions fires the DELETE trigger on its old partition, then INSERT on the new
+        conn.execute(text("DROP TRIGGER IF EXISTS claim_analysis_id ON verification_records"))
+        conn.execute(text("DROP TRIGGER IF EXISTS release_analysis_id ON verification_records"))
+        conn.execute(text(
+            "CREATE TRIGGER claim_analysis_id BEFORE INSERT ON verification_records "
+            "FOR EACH ROW EXECUTE FUNCTION claim_analysis_id()"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER release_analysis_id BEFORE DELETE ON verification_records "
+            "FOR EACH ROW EXECUTE FUNCTION release_analysis_id()"
+        ))
+    print("🔑 analysis_id is unique across all record partitions")
+
+
+def archive_month(period_start: datetime, engine=None) -> Tuple[int, int]:
+    """
+    Move one month's analysis_details to its archive file.
+    The file is complete and durable before any row loses its details; rows are
+    then cleared in short id-range transactions. A rerun after an interruption
+    carries over details that earlier runs already cleared from the database.
+    Returns (records archived, archive bytes).
+    """
+    engine = engine or default_engine
+    period_start = month_start(period_start)
+    if add_months(period_start, 1) > month_start(now_local()):
+        raise ValueError("Only past months can be archived")
+    path = archive_path(period_start)
+    previous = open_archive(path)
+    in_month = _in_month(period_start)
+    columns = (VerificationRecord.id, VerificationRecord.analysis_details_packed,
+               VerificationRecord.analysis_details_json, VerificationRecord.details_archived)
+
+    writer = ArchiveWriter(path)
+    first_id = last_id = None
+    try:
+        after_id = 0
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(*columns).where(*in_month, VerificationRecord.id > after_id)
+                    .order_by(VerificationRecord.id).limit(ARCHIVE_BATCH_SIZE)
+                ).all()
+            if not rows:
+                break
+            for record_id, packed, legacy_json, archived in rows:
+                payload = details_payload(packed, legacy_json)
+                if payload is None and archived and previous is not None:
+                    payload = previous.payload(record_id)
+                if payload is None:
+                    continue
+                writer.add(record_id, payload)
+                first_id = record_id if first_id is None else first_id
+                last_id = record_id
+            after_id = rows[-1][0]
+        size = writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    forget_archive(path)
+
+    if last_id is not None:
+        for low in range(first_id, last_id + 1, ARCHIVE_BATCH_SIZE):
+            with engine.begin() as conn:
+                conn.execute(
+                    update(VerificationRecord)
+                    .where(*in_month, VerificationRecord.id >= low,
+                           VerificationRecord.id < min(low + ARCHIVE_BATCH_SIZE, last_id + 1))
+                    .values({VerificationRecord.analysis_details_packed: None,
+                             VerificationRecord.analysis_details_json: None,
+                             VerificationRecord.details_archived: True})
+                    .execution_options(synchronize_session=False)
+                )
+        if engine.dialect.name == "postgresql":
+            # Rewrite just this partition without the dead row versions; other months stay available
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                if _pg_table_exists(conn, partition_table_name(period_start)):
+                    conn.execute(text(f"VACUUM FULL {partition_table_name(period_start)}"))
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(RecordPartition).where(RecordPartition.period_start == period_start).values(
+                state=ARCHIVED, archive_path=path, archived_records=writer.records,
+                archive_bytes=size, archived_at=now_local()
+            )
+        )
+    return writer.records, size
+
+
+def _subtract_statistics(session: Session, *conditions):
+    """Take the records matching conditions out of statistics_aggregates, before they are deleted"""
+    deepfake_sum = func.sum(case((VerificationRecord.is_deepfake == True, 1), else_=0))
+    deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    total, deepfakes = session.execute(
+        select(func.count(VerificationRecord.id), deepfake_sum).where(*conditions)
+    ).one()
+    if not total:
+        return 0
+    deltas[(TOTAL_DIMENSION, MISSING_KEY)] = [-total, -(deepfakes or 0)]
+    for dimension, attribute in DIMENSION_COLUMNS.items():
+        column = grouping_column(attribute)
+        names = dimension_names(session, attribute)
+        grouped = session.execute(
+            select(column, func.count(VerificationRecord.id), deepfake_sum).where(*conditions).group_by(column)
+        )
+        for value, count, deepfake_count in grouped:
+            key = names.get(value) or MISSING_KEY
+            deltas[(dimension, key)][0] -= count
+            deltas[(dimension, key)][1] -= deepfake_count or 0
+    apply_deltas(session.connection(), dict(deltas))
+    session.info["statistics_changed"] = True
+    return total
+
+
+def drop_month(period_start: datetime, engine=None) -> int:
+    """
+    Delete one month of records, with its counters, rollups, Merkle leaves and
+    archive file. PostgreSQL detaches and drops the partition in one
+    transaction (or deletes the month's rows from the DEFAULT partition when it
+    has no partition of its own); SQLite deletes in short id-range
+    transactions. Returns the number of records dropped.
+    """
+    engine = engine or default_engine
+    period_start = month_start(period_start)
+    period_end = add_months(period_start, 1)
+    if period_end > hot_floor():
+        raise ValueError(f"Only months before {hot_floor():%Y-%m} can be dropped")
+    in_month = _in_month(period_start)
+    dropped = 0
+
+    session = Session(bind=engine)
+    try:
+        if is_partitioned(session.connection()):
+            name = partition_table_name(period_start)
+            dropped = _subtract_statistics(session, *in_month)
+            prune_leaves(session, *in_month)
+            if _pg_table_exists(session.connection(), name):
+                if _pg_table_exists(session.connection(), ANALYSIS_ID_TABLE):
+                    # DROP TABLE fires no delete triggers
+                    session.execute(text(
+                        f"DELETE FROM {ANALYSIS_ID_TABLE} a USING {name} r WHERE a.analysis_id = r.analysis_id"
+                    ))
+                session.execute(text(f"ALTER TABLE verification_records DETACH PARTITION {name}"))
+                session.execute(text(f"DROP TABLE {name}"))
+            else:
+                session.execute(delete(VerificationRecord.__table__).where(*in_month))
+        else:
+            while True:
+                ids = session.execute(
+                    select(VerificationRecord.id).where(*in_month).order_by(VerificationRecord.id).limit(ARCHIVE_BATCH_SIZE)
+                ).scalars().all()
+                if not ids:
+                    break
+                batch = VerificationRecord.id.in_(ids)
+                dropped += _subtract_statistics(session, batch)
+                prune_leaves(session, batch)
+                session.execute(delete(VerificationRecord.__table__).where(batch))
+                session.commit()
+        session.execute(delete(StatisticsRollup).where(
+            StatisticsRollup.bucket_start >= period_start, StatisticsRollup.bucket_start < period_end
+        ))
+        session.execute(delete(RecordPartition).where(RecordPartition.period_start == period_start))
+        session.commit()
+    finally:
+        session.close()
+        # The Core deletes bypass the ORM commit hooks that keep these current
+        statistics_cache.invalidate()
+        verification_cache.invalidate()
+        oldest_month_cache.invalidate()
+
+    path = archive_path(period_start)
+    forget_archive(path)
+    if os.path.exists(path):
+        os.remove(path)
+    return dropped
+
+
+def apply_retention(engine=None) -> Dict[str, List[str]]:
+    """Archive months past the hot window and drop months past RETENTION_DROP_MONTHS"""
+    engine = engine or default_engine
+    with Session(bind=engine) as session:
+        months = session.execute(
+            select(RecordPartition.period_start, RecordPartition.state).order_by(RecordPartition.period_start)
+        ).all()
+    floor = hot_floor()
+    drop_before = add_months(month_start(now_local()), -(RETENTION_DROP_MONTHS - 1)) if RETENTION_DROP_MONTHS > 0 else None
+    done = {"archived": [], "dropped": []}
+    for period_start, state in months:
+        if drop_before is not None and period_start < min(drop_before, floor):
+            drop_month(period_start, engine)
+            done["dropped"].append(f"{period_start:%Y-%m}")
+        elif period_start < floor and state == HOT:
+            archive_month(period_start, engine)
+            done["archived"].append(f"{period_start:%Y-%m}")
+    return done
+
+
+def clear_records(session: Session) -> List[str]:
+    """
+    Empty verification_records for /clear-all-data: TRUNCATE on PostgreSQL (the
+    partitions stay; verification_analysis_ids is emptied with it), an
+    unfiltered DELETE on SQLite, which it runs as a table
+    truncate. Archived months go back to hot; returns the archive files to
+    remove once the transaction has committed.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("TRUNCATE verification_records"))
+        if _pg_table_exists(session.connection(), ANALYSIS_ID_TABLE):
+            session.execute(text(f"TRUNCATE {ANALYSIS_ID_TABLE}"))
+    else:
+        session.execute(text("DELETE FROM verification_records"))
+    archives = session.execute(
+        select(RecordPartition.archive_path).where(RecordPartition.archive_path.isnot(None))
+    ).scalars().all()
+    session.execute(update(RecordPartition).values(
+        state=HOT, archive_path=None, archived_records=None, archive_bytes=None, archived_at=None
+    ))
+    return list(archives)
+
+
+def remove_archives(paths: List[str]):
+    for path in paths:
+        forget_archive(path)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def maintain_partitions_periodically():
+    """Background task started with the API: keep upcoming months partitioned, optionally apply retention"""
+    while True:
+        try:
+            added = await asyncio.to_thread(ensure_partitions)
+            if added:
+                print(f"🗂️ Added {added} record partition(s)")
+            if RETENTION_ENABLED:
+                done = await asyncio.to_thread(apply_retention)
+                if done["archived"] or done["dropped"]:
+                    print(f"🧊 Retention archived {done['archived']} dropped {done['dropped']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Partition maintenance failed: {e}")
+        await asyncio.sleep(PARTITION_CHECK_SECONDS)
+
+
+def status(engine=None) -> List[dict]:
+    engine = engine or default_engine
+    with Session(bind=engine) as session:
+        months = session.execute(select(RecordPartition).order_by(RecordPartition.period_start)).scalars().all()
+        counts = dict(session.execute(
+            select(RecordPartition.period_start, func.count(VerificationRecord.id))
+            .join(VerificationRecord, (VerificationRecord.created_at >= RecordPartition.period_start)
+                  & (VerificationRecord.created_at < RecordPartition.period_end))
+            .group_by(RecordPartition.period_start)
+        ).all())
+    return [{
+        "month": f"{month.period_start:%Y-%m}",
+        "state": month.state,
+        "records": counts.get(month.period_start, 0),
+        "table": month.table_name,
+        "archive_bytes": month.archive_bytes,
+    } for month in months]
+
+
+def _parse_month(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage monthly verification_records partitions and retention")
+    parser.add_argument("command", choices=["status", "ensure", "retain", "archive", "drop"])
+    parser.add_argument("--month", type=_parse_month, default=None, help="YYYY-MM, for archive and drop")
+    args = parser.parse_args()
+
+    if args.command in ("archive", "drop") and args.month is None:
+        parser.error(f"{args.command} needs --month")
+    if args.command == "status":
+        print(f"{'month':<9}{'state':<10}{'records':>12}{'archive':>14}  table")
+        for row in status():
+            size = f"{row['archive_bytes'] / 1024 / 1024:,.1f} MB" if row["archive_bytes"] else "-"
+            print(f"{row['month']:<9}{row['state']:<10}{row['records']:>12,}{size:>14}  {row['table'] or '-'}")
+    elif args.command == "ensure":
+        print(f"✅ Added {ensure_partitions()} month(s)")
+    elif args.command == "retain":
+        done = apply_retention()
+        print(f"✅ Archived {done['archived'] or 'nothing'}, dropped {done['dropped'] or 'nothing'}")
+    elif args.command == "archive":
+        records, size = archive_month(args.month)
+        print(f"🧊 Archived details of {records} records from {args.month:%Y-%m} ({size / 1024:,.0f} KiB)")
+    else:
+        print(f"🗑️ Dropped {drop_month(args.month)} records from {args.month:%Y-%m}")
@@ -0,0 +1,152 @@
+"""
+Read replica routing
+DATABASE_REPLICA_URLS lists read-only copies of DATABASE_URL (PostgreSQL hot
+standbys, or SQLite files for local testing). Read-only endpoints take their
+session from get_read_db, which picks the next healthy replica round-robin and
+falls back to the primary (its reader pool in tuned SQLite mode) when none is healthy. A background task checks every
+replica each REPLICA_HEALTH_INTERVAL_SECONDS; a PostgreSQL standby more than
+REPLICA_MAX_LAG_SECONDS behind is taken out of rotation until it catches up.
+
+Read-your-writes: write endpoints call stick_to_primary, which sets a short
+cookie; while it is present the client's reads go to the primary, so it sees
+its own analysis straight away even when the replicas lag.
+"""
+import asyncio
+import itertools
+import os
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, InterfaceError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from database import AsyncReadSessionLocal, to_async_url, is_postgres_url
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_INTERVAL_SECONDS = float(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "15"))
+READ_PRIMARY_COOKIE = "veritas_read_primary"
+
+# Seconds the standby is behind; 0 when it has replayed everything it received
+# (an idle primary would otherwise look like growing lag)
+POSTGRES_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        # Shown in /health and logs, so never the credentials
+        self.name = parsed.path.lstrip("/") if url.startswith("sqlite") else f"{parsed.hostname}:{parsed.port or 5432}{parsed.path}"
+        self.is_postgres = is_postgres_url(url)
+        async_url, connect_args = to_async_url(url)
+        if self.is_postgres:
+            self.engine = create_async_engine(
+                async_url, connect_args=connect_args, pool_size=10, max_overflow=20, pool_pre_ping=True, pool_recycle=300
+            )
+        else:
+            self.engine = create_async_engine(async_url)
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def status(self):
+        return {"name": self.name, "healthy": self.healthy, "lag_seconds": self.lag_seconds, "error": self.error}
+
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = itertools.count()
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica, or None to use the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def mark_failed(self, replica: Replica, error: Exception):
+        """Out of rotation until the next health check succeeds"""
+        if replica.healthy:
+            print(f"⚠️ Read replica {replica.name} failed, routing reads elsewhere: {error}")
+        replica.healthy = False
+        replica.error = str(error)
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                lag = (await conn.execute(POSTGRES_LAG_SQL if replica.is_postgres else text("SELECT 0"))).scalar()
+        except Exception as e:
+            self.mark_failed(replica, e)
+            return
+        replica.lag_seconds = float(lag)
+        healthy = replica.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+        if healthy != replica.healthy:
+            print(f"{'✅' if healthy else '⚠️'} Read replica {replica.name} "
+                  f"{'back in rotation' if healthy else f'is {replica.lag_seconds:.1f}s behind, skipping it'}")
+        replica.healthy = healthy
+        replica.error = None
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def monitor(self):
+        """Background task started with the API"""
+        while True:
+            await self.check_all()
+            await asyncio.sleep(REPLICA_HEALTH_INTERVAL_SECONDS)
+
+    def status(self):
+        return [replica.status() for replica in self.replicas]
+
+
+router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+
+def reads_own_writes(request: Request) -> bool:
+    """True while the client's stick_to_primary cookie is live"""
+    return bool(router.replicas) and READ_PRIMARY_COOKIE in request.cookies
+
+
+def read_sessionmaker(request: Request):
+    """(session factory, replica or None) for a read-only request"""
+    replica = None if reads_own_writes(request) else router.choose()
+    return (replica.sessionmaker if replica else AsyncReadSessionLocal), replica
+
+
+async def get_read_db(request: Request):
+    """Dependency for read-only endpoints: a replica session unless the client just wrote"""
+    factory, replica = read_sessionmaker(request)
+    async with factory() as db:
+        db.info["replica"] = replica
+        try:
+            yield db
+        except (OperationalError, InterfaceError, OSError) as e:
+            if replica is not None:
+                router.mark_failed(replica, e)
+            raise
+
+
+def is_replica(db: AsyncSession) -> bool:
+    return db.info.get("replica") is not None
+
+
+def stick_to_primary(request: Request, response: Response):
+    """Send this client's reads to the primary for READ_YOUR_WRITES_SECONDS"""
+    if not router.replicas:
+        return
+    secure = request.url.scheme == "https" or request.headers.get("x-forwarded-proto") == "https"
+    # Cross-site frontends only send the cookie back with SameSite=None, which requires Secure
+    response.set_cookie(
+        READ_PRIMARY_COOKIE, "1", max_age=READ_YOUR_WRITES_SECONDS, httponly=True,
+        secure=secure, samesite="none" if secure else "lax"
+    )
@@ -0,0 +1,61 @@
+"""
+Hot-record response cache for /verification/{analysis_id}
+Serialized VerificationResponse bodies are kept in a byte-bounded LRU together
+with their strong ETag. Commits that insert, change or delete a record drop its
+entry; bulk deletes clear the whole cache. Those hooks only see this process's
+writes, so entries also expire after VERIFICATION_CACHE_TTL_SECONDS: deletes
+by other workers, retention runs and direct edits to a row (which the
+integrity status must reflect) show up within that window.
+"""
+import hashlib
+import os
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import LRUByteCache
+from database import VerificationRecord
+
+verification_cache = LRUByteCache(
+    max_bytes=int(os.getenv("VERIFICATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("VERIFICATION_CACHE_TTL_SECONDS", "5")),
+)
+
+
+def make_etag(body: bytes) -> str:
+    """Strong validator derived from the exact response bytes"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, so W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def cache_entry(body: bytes) -> Tuple[bytes, str]:
+    return body, make_etag(body)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_records(session, flush_context):
+    changed = session.info.setdefault("changed_analysis_ids", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, VerificationRecord) and obj.analysis_id:
+            changed.add(obj.analysis_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_records(session):
+    for analysis_id in session.info.pop("changed_analysis_ids", ()):
+        verification_cache.invalidate(analysis_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_records(session, previous_transaction):
+    session.info.pop("changed_analysis_ids", None)
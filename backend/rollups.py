@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Time-bucketed statistics rollups
+Hourly and daily counters per constituency and per candidate, maintained in the
+same flush as the verification write. /statistics/timeseries reads only these
+rows, never verification_records.
+
+Backfill from existing history:
+    python rollups.py backfill [--start 2024-01-01] [--end 2024-06-01] [--grain hour]
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, func, case, select, delete, and_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import SessionLocal, StatisticsRollup, VerificationRecord, IST
+from dimensions import dimension_names
+from stats_aggregates import (
+    DIMENSION_COLUMNS, MISSING_KEY, TOTAL_DIMENSION, grouping_column, record_changes, record_keys
+)
+
+GRAINS = ("hour", "day")
+GRAIN_STEP = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+# Longest series the trend endpoint returns in one response
+MAX_TIMESERIES_BUCKETS = 2000
+
+
+def to_local(value: datetime) -> datetime:
+    """Naive Asia/Kolkata wall time, the representation stored in the database"""
+    if value.tzinfo is not None:
+        value = value.astimezone(IST).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(value: datetime, grain: str) -> datetime:
+    value = to_local(value).replace(minute=0, second=0, microsecond=0)
+    if grain == "day":
+        value = value.replace(hour=0)
+    return value
+
+
+def collect_rollup_deltas(session: Session) -> Dict[Tuple[str, str, str, datetime], List[int]]:
+    """Counter changes keyed by (grain, dimension, key, bucket_start)"""
+    deltas: Dict[Tuple[str, str, str, datetime], List[int]] = defaultdict(lambda: [0, 0])
+    for sign, record, is_deepfake, values in record_changes(session):
+        if record.created_at is None:
+            continue
+        for grain in GRAINS:
+            bucket = bucket_start(record.created_at, grain)
+            for dimension, key, deepfake in record_keys(is_deepfake, values):
+                deltas[(grain, dimension, key, bucket)][0] += sign
+                deltas[(grain, dimension, key, bucket)][1] += sign * deepfake
+    return {key: value for key, value in deltas.items() if value != [0, 0]}
+
+
+def apply_rollup_deltas(connection, deltas: Dict[Tuple[str, str, str, datetime], List[int]]):
+    if not deltas:
+        return
+    dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    table = StatisticsRollup.__table__
+    for (grain, dimension, key, bucket), (total, deepfake) in sorted(deltas.items()):
+        stmt = dialect_insert(table).values(
+            grain=grain, dimension=dimension, key=key, bucket_start=bucket,
+            total_count=total, deepfake_count=deepfake
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.grain, table.c.dimension, table.c.key, table.c.bucket_start],
+            set_={
+                "total_count": table.c.total_count + stmt.excluded.total_count,
+                "deepfake_count": table.c.deepfake_count + stmt.excluded.deepfake_count,
+            }
+        )
+        connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_rollups(session, flush_context):
+    apply_rollup_deltas(session.connection(), collect_rollup_deltas(session))
+
+
+def reset_rollups(session: Session):
+    """Drop every rollup row; for bulk DELETEs that bypass the flush hook"""
+    session.execute(delete(StatisticsRollup))
+
+
+def _bucket_expression(session: Session, grain: str):
+    """SQL expression truncating created_at to the bucket start"""
+    if session.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(grain, VerificationRecord.created_at)
+    fmt = "%Y-%m-%d %H:00:00" if grain == "hour" else "%Y-%m-%d 00:00:00"
+    return func.strftime(fmt, VerificationRecord.created_at)
+
+
+def backfill_rollups(session: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     grains: Sequence[str] = GRAINS) -> int:
+    """
+    Rebuild the rollups for [start, end) from verification_records. The range is
+    widened to whole days so both grains are rebuilt for complete buckets.
+    Returns the number of rollup rows written.
+    """
+    start = bucket_start(start, "day") if start else None
+    end = bucket_start(end, "day") + GRAIN_STEP["day"] if end else None
+    deepfake_sum = func.sum(case((VerificationRecord.is_deepfake == True, 1), else_=0))
+
+    written = 0
+    for grain in grains:
+        bucket = _bucket_expression(session, grain).label("bucket")
+        conditions = []
+        if start:
+            conditions.append(VerificationRecord.created_at >= start)
+        if end:
+            conditions.append(VerificationRecord.created_at < end)
+
+        merged: Dict[Tuple[str, str, datetime], List[int]] = defaultdict(lambda: [0, 0])
+        groupings = [(TOTAL_DIMENSION, None, {})] + [
+            (dimension, grouping_column(attribute), dimension_names(session, attribute))
+            for dimension, attribute in DIMENSION_COLUMNS.items()
+        ]
+        for dimension, column, names in groupings:
+            columns = [bucket] + ([column] if column is not None else [])
+            query = select(*columns, func.count(VerificationRecord.id), deepfake_sum)
+            if conditions:
+                query = query.where(and_(*conditions))
+            for row in session.execute(query.group_by(*columns)):
+                value = names.get(row[1]) if column is not None else None
+                bucket_value = row[0]
+                if bucket_value is None:
+                    continue
+                if isinstance(bucket_value, str):
+                    bucket_value = datetime.fromisoformat(bucket_value)
+                entry = merged[(dimension, value or MISSING_KEY, bucket_value)]
+                entry[0] += row[-2]
+                entry[1] += row[-1] or 0
+
+        clear = delete(StatisticsRollup).where(StatisticsRollup.grain == grain)
+        if start:
+            clear = clear.where(StatisticsRollup.bucket_start >= start)
+        if end:
+            clear = clear.where(StatisticsRollup.bucket_start < end)
+        session.execute(clear)
+
+        rows = [
+            {"grain": grain, "dimension": dimension, "key": key, "bucket_start": bucket_value,
+             "total_count": count, "deepfake_count": deepfake_count}
+            for (dimension, key, bucket_value), (count, deepfake_count) in sorted(merged.items())
+        ]
+        if rows:
+            session.execute(StatisticsRollup.__table__.insert(), rows)
+        written += len(rows)
+    return written
+
+
+def ensure_rollups():
+    """Backfill once for databases that predate the rollup table"""
+    db = SessionLocal()
+    try:
+        has_rollups = db.execute(select(StatisticsRollup.grain).limit(1)).first() is not None
+        has_records = db.execute(select(VerificationRecord.id).limit(1)).first() is not None
+        if has_records and not has_rollups:
+            rows = backfill_rollups(db)
+            db.commit()
+            print(f"📈 Backfilled statistics rollups ({rows} rows)")
+    finally:
+        db.close()
+
+
+def timeseries_query(grain: str, start: datetime, end: datetime, dimension: str = TOTAL_DIMENSION,
+                     key: str = MISSING_KEY):
+    """Select the rollup rows for one series over [start, end)"""
+    return select(
+        StatisticsRollup.bucket_start, StatisticsRollup.total_count, StatisticsRollup.deepfake_count
+    ).where(
+        StatisticsRollup.grain == grain,
+        StatisticsRollup.dimension == dimension,
+        StatisticsRollup.key == key,
+        StatisticsRollup.bucket_start >= start,
+        StatisticsRollup.bucket_start < end,
+    ).order_by(StatisticsRollup.bucket_start)
+
+
+def build_timeseries(rows, grain: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """One entry per bucket in [start, end), with empty buckets filled with zeros"""
+    counts = {row[0]: (row[1], row[2]) for row in rows}
+    series = []
+    step = GRAIN_STEP[grain]
+    current = bucket_start(start, grain)
+    while current < end:
+        total, deepfakes = counts.get(current, (0, 0))
+        series.append({
+            "bucket_start": current.isoformat(),
+            "total_videos": total,
+            "deepfake_count": deepfakes,
+            "deepfake_rate": (deepfakes / total) if total > 0 else 0.0
+        })
+        current += step
+    return series
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the statistics rollup tables")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--grain", choices=GRAINS, default=None, help="Only rebuild one grain")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = backfill_rollups(db, args.start, args.end, [args.grain] if args.grain else GRAINS)
+        db.commit()
+        print(f"✅ Backfilled {rows} rollup rows")
+    finally:
+        db.close()
@@ -28,6 +28,7 @@ class VideoAnalysisRequest(BaseModel):
     election_context: Optional[str] = None
     candidate_name: Optional[str] = None
     constituency: Optional[str] = None
+    mode: Optional[str] = "standard"
 
 class VideoAnalysisResponse(BaseModel):
     """Response schema for video analysis"""
@@ -37,6 +38,9 @@ class VideoAnalysisResponse(BaseModel):
     confidence_score: float
     verification_hash: str
     analysis_details: Dict[str, Any]
+    analysis_mode: Optional[str] = None
+    degraded: bool = False
+    partial: bool = False
     timestamp: str
 
 class VerificationResponse(BaseModel):
@@ -51,8 +55,27 @@ class VerificationResponse(BaseModel):
     candidate_name: Optional[str] = None
     constituency: Optional[str] = None
     timestamp: str
+    analysis_details: Optional[Dict[str, Any]] = None  # Omitted (null) in view=summary lists
+    analysis_mode: Optional[str] = None
+    integrity: Optional[str] = None  # verified / tampered / unverifiable; only checked for single records
+
+class VerificationDetailsResponse(BaseModel):
+    """Full analysis_details for one record, fetched on demand by list views"""
+    analysis_id: str
     analysis_details: Dict[str, Any]
 
+class VerificationLookupRequest(BaseModel):
+    """Request schema for resolving many records at once"""
+    keys: List[str]
+    key_type: str = "analysis_id"  # analysis_id / file_hash
+    view: str = "full"  # summary leaves out analysis_details
+
+class VerificationLookupResult(BaseModel):
+    """One lookup result, in the position of its key in the request"""
+    key: str
+    found: bool
+    record: Optional[VerificationResponse] = None
+
 class StatisticsResponse(BaseModel):
     """Response schema for system statistics"""
     total_verifications: int
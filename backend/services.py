@@ -9,13 +9,19 @@ import cv2
 from typing import Dict, Any, List, Optional
 import asyncio
 import hashlib
-import json
 from datetime import datetime
 import pytz
 from PIL import Image
 import io
 import time
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from analysis_modes import AnalysisMode, ModeLatencyTracker, get_analysis_mode
+from load_governor import LoadGovernor
+from deadline import Deadline
+from cancellation import AnalysisCancelled, CancellationToken, cancelled_work_seconds
+from canonical import payload_hash
 
 # Add model directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'model'))
@@ -47,6 +53,8 @@ class DeepfakeDetectionService:
             self.model_path = os.path.join(os.path.dirname(backend_dir), "model", "weights")
         
         self.ensemble = None
+        self.mode_latency = ModeLatencyTracker()
+        self.load_governor = LoadGovernor()
         self.load_model()
     
     def load_model(self):
@@ -74,34 +82,87 @@ class DeepfakeDetectionService:
             traceback.print_exc()
             self.model_loaded = False
     
-    async def analyze_video(self, video_path: str) -> Dict[str, Any]:
+    async def analyze_video(self, video_path: str, mode: str = "standard",
+                            deadline: Optional[Deadline] = None,
+                            cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """
         Analyze video for deepfake detection using your model
+        
+        With a deadline the ensemble plans its budget to fit and may return a partial verdict.
+        Cancelling the token stops the ensemble and raises AnalysisCancelled.
         """
+        requested_mode = get_analysis_mode(mode)
+        
+        # Under load the governor moves new requests to a cheaper mode
+        effective_mode, degradation = self.load_governor.admit(requested_mode.name)
+        analysis_mode = get_analysis_mode(effective_mode)
+        
+        start_time = time.time()
+        completed = False
         try:
             if not self.model_loaded:
-                return await self._fallback_detection(video_path)
-            
-            # Use your actual model for detection
-            return await self._model_detection(video_path)
+                result = await self._fallback_detection(video_path)
+            else:
+                # Use your actual model for detection
+                result = await self._model_detection(video_path, analysis_mode, deadline, cancel_token)
+            completed = True
             
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             print(f"❌ Analysis error: {e}")
-            return await self._fallback_detection(video_path)
+            result = await self._fallback_detection(video_path)
+            completed = True
+        finally:
+            elapsed = time.time() - start_time
+            # Cancelled runs are not representative latency samples
+            self.load_governor.release(elapsed if completed else None)
+        
+        result = self._record_mode(result, analysis_mode, elapsed)
+        result["requested_mode"] = requested_mode.name
+        result.setdefault("partial", False)
+        result["degraded"] = degradation is not None
+        if degradation:
+            result["degradation"] = degradation
+        return result
+    
+    def _record_mode(self, result: Dict[str, Any], analysis_mode: AnalysisMode, elapsed: float) -> Dict[str, Any]:
+        """Tag the result with the tier that produced it and that tier's measured latency"""
+        self.mode_latency.record(analysis_mode.name, elapsed)
+        result["analysis_mode"] = analysis_mode.name
+        result["mode_settings"] = analysis_mode.to_dict()
+        result["mode_latency"] = {
+            "measured_seconds": round(elapsed, 2),
+            **self.mode_latency.snapshot(analysis_mode.name)
+        }
+        return result
     
-    async def _model_detection(self, video_path: str) -> Dict[str, Any]:
+    async def _model_detection(self, video_path: str, analysis_mode: AnalysisMode,
+                               deadline: Optional[Deadline] = None,
+                               cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """Use EfficientNet-B7 ensemble for detection"""
+        cancel_token = cancel_token or CancellationToken()
         try:
             start_time = time.time()
             
             # Run prediction using the ensemble in a thread pool to avoid blocking
             print(f"🔍 Running EfficientNet-B7 ensemble on video...")
             loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(
-                None,  # Use default executor
-                self.ensemble.analyze_video,
-                video_path
-            )
+            try:
+                results = await loop.run_in_executor(
+                    None,  # Use default executor
+                    partial(
+                        self._run_ensemble,
+                        video_path,
+                        analysis_mode,
+                        deadline,
+                        cancel_token
+                    )
+                )
+            except asyncio.CancelledError:
+                # The awaiting task was cancelled (timeout, shutdown): stop the worker thread too
+                cancel_token.cancel("request_cancelled")
+                raise
             
             processing_time = time.time() - start_time
             
@@ -110,8 +171,8 @@ class DeepfakeDetectionService:
             print(f"🔍 Model processing_time: {model_processing_time}")
             print(f"🔍 Service processing_time: {round(processing_time, 2)}")
             
-            # Calculate model size (approximate for 7 models)
-            model_size_mb = 267 * 7  # Each model is ~267MB
+            # Size of the checkpoints actually loaded from the ensemble manifest
+            model_size_mb = round(self.ensemble.model_size_mb)
             model_size_str = f"{model_size_mb/1024:.1f} GB" if model_size_mb > 1000 else f"{model_size_mb} MB"
             
             # Use model's processing_time if available, otherwise use service timing
@@ -127,7 +188,10 @@ class DeepfakeDetectionService:
                 "faces_detected": results.get("faces_analyzed", 0),
                 "frames_analyzed": results.get("faces_analyzed", 0),
                 "model_loaded": True,
-                "models_in_ensemble": results.get("models_used", 7),
+                "models_in_ensemble": results.get("models_used", len(self.ensemble.models)),
+                "partial": results.get("partial", False),
+                "coverage": results.get("coverage", {}),
+                "ensemble_members": results.get("ensemble_members", []),
                 "model_agreement": {
                     "min_confidence": results.get("min_prediction", 0.0),
                     "max_confidence": results.get("max_prediction", 1.0),
@@ -157,12 +221,32 @@ class DeepfakeDetectionService:
                 "timestamp": datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
             }
             
+        except AnalysisCancelled:
+            raise
         except Exception as e:
             print(f"❌ Model detection error: {e}")
             import traceback
             traceback.print_exc()
             return await self._fallback_detection(video_path)
     
+    def _run_ensemble(self, video_path: str, analysis_mode: AnalysisMode,
+                      deadline: Optional[Deadline], cancel_token: CancellationToken) -> Dict[str, Any]:
+        """Executor entry point; counts the seconds burned by runs that end up cancelled"""
+        start_time = time.time()
+        try:
+            return self.ensemble.analyze_video(
+                video_path,
+                max_frames=analysis_mode.max_frames,
+                max_models=analysis_mode.max_models,
+                decode_backend=analysis_mode.decode_backend,
+                quality_analysis=analysis_mode.quality_analysis,
+                deadline=deadline,
+                cancel_token=cancel_token
+            )
+        except AnalysisCancelled:
+            cancelled_work_seconds.inc(time.time() - start_time)
+            raise
+    
     async def _extract_frames(self, video_path: str, max_frames: int = 10) -> List[np.ndarray]:
         """Extract frames from video for analysis"""
         try:
@@ -438,31 +522,30 @@ class BlockchainService:
     Professional blockchain service for verification
     """
     
+    def hash_payload(self, analysis_id: str, file_hash: str, detection_result: Dict,
+                     metadata: Dict, timestamp: str) -> str:
+        """SHA-256 over the canonical bytes of one verification payload"""
+        return payload_hash(analysis_id, file_hash, detection_result, metadata, timestamp)
+    
     def create_verification_hash(self, analysis_id: str, file_hash: str, 
-                               detection_result: Dict, metadata: Dict) -> str:
-        """Create tamper-proof verification hash"""
-        data = {
-            "analysis_id": analysis_id,
-            "file_hash": file_hash,
-            "detection_result": detection_result,
-            "metadata": metadata,
-            "timestamp": datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
-        }
-        
-        # Create hash
-        data_string = json.dumps(data, sort_keys=True)
-        verification_hash = hashlib.sha256(data_string.encode()).hexdigest()
-        
-        return verification_hash
+                               detection_result: Dict, metadata: Dict,
+                               timestamp: Optional[str] = None) -> str:
+        """
+        Create tamper-proof verification hash. Pass the timestamp that is stored
+        with the record (hash_timestamp) so the hash can be recomputed exactly.
+        """
+        return self.hash_payload(
+            analysis_id, file_hash, detection_result, metadata,
+            timestamp or datetime.now(pytz.timezone('Asia/Kolkata')).isoformat()
+        )
     
     def verify_integrity(self, analysis_id: str, file_hash: str, 
-                        verification_hash: str, detection_result: Dict) -> bool:
-        """Verify blockchain integrity"""
+                        verification_hash: str, detection_result: Dict,
+                        metadata: Dict, timestamp: str) -> bool:
+        """Recompute the hash from the stored preimage fields and compare"""
         try:
-            # Recreate hash and compare
-            metadata = {"analysis_id": analysis_id}
-            expected_hash = self.create_verification_hash(
-                analysis_id, file_hash, detection_result, metadata
+            expected_hash = self.hash_payload(
+                analysis_id, file_hash, detection_result, metadata, timestamp
             )
             return expected_hash == verification_hash
         except:
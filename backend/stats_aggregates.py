@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained statistics aggregates
+Every flush that inserts, updates or deletes a VerificationRecord applies the
+matching counter deltas to statistics_aggregates in the same transaction, so
+/statistics reads a handful of summary rows instead of scanning the table.
+
+Drift repair (e.g. after manual SQL edits):
+    python stats_aggregates.py rebuild
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, case, select, delete, inspect as sa_inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(__file__))
+
+from database import SessionLocal, StatisticsAggregate, VerificationRecord, ENCODED_DIMENSIONS
+from dimensions import dimension_names
+from cache import TTLCache
+
+TOTAL_DIMENSION = "total"
+# Dimension name -> VerificationRecord attribute it counts by
+DIMENSION_COLUMNS = {
+    "constituency": "constituency",
+    "candidate": "candidate_name",
+}
+# Stored in place of NULL so the (dimension, key) primary key stays usable
+MISSING_KEY = ""
+
+# Cached /statistics payload; commits that touch the counters invalidate it
+statistics_cache = TTLCache(ttl_seconds=float(os.getenv("STATS_CACHE_TTL_SECONDS", "5")))
+STATISTICS_CACHE_KEY = "statistics"
+
+
+def record_keys(is_deepfake: bool, values: Dict[str, Optional[str]]) -> List[Tuple[str, str, int]]:
+    """(dimension, key, deepfake increment) for every counter a record contributes to"""
+    deepfake = 1 if is_deepfake else 0
+    keys = [(TOTAL_DIMENSION, MISSING_KEY, deepfake)]
+    for dimension, attribute in DIMENSION_COLUMNS.items():
+        keys.append((dimension, values.get(attribute) or MISSING_KEY, deepfake))
+    return keys
+
+
+def _current_values(record: VerificationRecord) -> Tuple[bool, Dict[str, Optional[str]]]:
+    return bool(record.is_deepfake), {attr: getattr(record, attr) for attr in DIMENSION_COLUMNS.values()}
+
+
+def _previous_values(record: VerificationRecord) -> Optional[Tuple[bool, Dict[str, Optional[str]]]]:
+    """Pre-flush values of a modified record, or None if no counted attribute changed"""
+    state = sa_inspect(record)
+    changed = False
+    previous = {}
+    for attribute in ("is_deepfake", *DIMENSION_COLUMNS.values()):
+        history = state.attrs[attribute].history
+        if history.deleted:
+            changed = True
+            previous[attribute] = history.deleted[0]
+        else:
+            previous[attribute] = getattr(record, attribute)
+    if not changed:
+        return None
+    return bool(previous.pop("is_deepfake")), previous
+
+
+def record_changes(session: Session) -> List[Tuple[int, VerificationRecord, bool, Dict[str, Optional[str]]]]:
+    """
+    (sign, record, is_deepfake, dimension values) for every counted contribution the
+    session's pending inserts, updates and deletes add (+1) or remove (-1)
+    """
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, VerificationRecord):
+            changes.append((1, obj, *_current_values(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, VerificationRecord):
+            previous = _previous_values(obj)
+            changes.append((-1, obj, *(previous or _current_values(obj))))
+    for obj in session.dirty:
+        if isinstance(obj, VerificationRecord) and obj not in session.deleted:
+            previous = _previous_values(obj)
+            if previous is not None:
+                changes.append((-1, obj, *previous))
+                changes.append((1, obj, *_current_values(obj)))
+    return changes
+
+
+def collect_deltas(session: Session) -> Dict[Tuple[str, str], List[int]]:
+    """Sum the counter changes implied by the session's pending inserts, updates and deletes"""
+    deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for sign, _, is_deepfake, values in record_changes(session):
+        for dimension, key, deepfake in record_keys(is_deepfake, values):
+            deltas[(dimension, key)][0] += sign
+            deltas[(dimension, key)][1] += sign * deepfake
+    return {key: value for key, value in deltas.items() if value != [0, 0]}
+
+
+def apply_deltas(connection, deltas: Dict[Tuple[str, str], List[int]]):
+    """Upsert counter deltas; keys are applied in sorted order so concurrent writers lock rows consistently"""
+    if not deltas:
+        return
+    dialect_insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    table = StatisticsAggregate.__table__
+    for (dimension, key), (total, deepfake) in sorted(deltas.items()):
+        stmt = dialect_insert(table).values(
+            dimension=dimension, key=key, total_count=total, deepfake_count=deepfake
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.dimension, table.c.key],
+            set_={
+                "total_count": table.c.total_count + stmt.excluded.total_count,
+                "deepfake_count": table.c.deepfake_count + stmt.excluded.deepfake_count,
+            }
+        )
+        connection.execute(stmt)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_aggregates(session, flush_context):
+    deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+        session.info["statistics_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("statistics_changed", False):
+        statistics_cache.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop("statistics_changed", None)
+
+
+def reset_aggregates(session: Session):
+    """Zero every counter; for bulk DELETEs that bypass the flush hook"""
+    session.execute(delete(StatisticsAggregate))
+    session.info["statistics_changed"] = True
+
+
+def grouping_column(attribute: str):
+    """Column to GROUP BY for a counted attribute: the id for dictionary-encoded dimensions"""
+    if attribute in ENCODED_DIMENSIONS:
+        return getattr(VerificationRecord, ENCODED_DIMENSIONS[attribute][1])
+    return getattr(VerificationRecord, attribute)
+
+
+def rebuild_aggregates(session: Session) -> int:
+    """Recompute every counter from verification_records; returns the number of summary rows"""
+    deepfake_sum = func.sum(case((VerificationRecord.is_deepfake == True, 1), else_=0))
+    rows = []
+
+    total, deepfakes = session.execute(
+        select(func.count(VerificationRecord.id), deepfake_sum)
+    ).one()
+    if total:
+        rows.append({"dimension": TOTAL_DIMENSION, "key": MISSING_KEY,
+                     "total_count": total, "deepfake_count": deepfakes or 0})
+
+    merged: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for dimension, attribute in DIMENSION_COLUMNS.items():
+        # Group on the integer id column, then name the (few) groups
+        column = grouping_column(attribute)
+        names = dimension_names(session, attribute)
+        grouped = session.execute(
+            select(column, func.count(VerificationRecord.id), deepfake_sum).group_by(column)
+        )
+        for value, count, deepfake_count in grouped:
+            # NULL and "" both land on the missing key
+            key = names.get(value) or MISSING_KEY
+            merged[(dimension, key)][0] += count
+            merged[(dimension, key)][1] += deepfake_count or 0
+    rows.extend(
+        {"dimension": dimension, "key": key, "total_count": count, "deepfake_count": deepfake_count}
+        for (dimension, key), (count, deepfake_count) in sorted(merged.items())
+    )
+
+    session.execute(delete(StatisticsAggregate))
+    if rows:
+        session.execute(StatisticsAggregate.__table__.insert(), rows)
+    session.info["statistics_changed"] = True
+    return len(rows)
+
+
+def ensure_aggregates():
+    """Build the counters once for databases that predate the summary table"""
+    db = SessionLocal()
+    try:
+        has_summary = db.execute(select(StatisticsAggregate.dimension).limit(1)).first() is not None
+        has_records = db.execute(select(VerificationRecord.id).limit(1)).first() is not None
+        if has_records and not has_summary:
+            rows = rebuild_aggregates(db)
+            db.commit()
+            print(f"📊 Built statistics aggregates ({rows} summary rows)")
+    finally:
+        db.close()
+
+
+def build_statistics(aggregates: List[StatisticsAggregate]) -> Dict[str, Any]:
+    """Shape summary rows into the /statistics response"""
+    total_verifications = 0
+    deepfake_count = 0
+    breakdowns: Dict[str, List[Dict[str, Any]]] = {dimension: [] for dimension in DIMENSION_COLUMNS}
+
+    for row in aggregates:
+        if row.dimension == TOTAL_DIMENSION:
+            total_verifications = row.total_count
+            deepfake_count = row.deepfake_count
+        elif row.dimension in breakdowns and row.total_count > 0:
+            breakdowns[row.dimension].append({
+                "name": row.key or None,
+                "total_videos": row.total_count,
+                "deepfake_count": row.deepfake_count
+            })
+
+    for entries in breakdowns.values():
+        entries.sort(key=lambda entry: (-entry["total_videos"], entry["name"] or ""))
+
+    return {
+        "total_verifications": total_verifications,
+        "deepfake_detected": deepfake_count,
+        "real_videos": total_verifications - deepfake_count,
+        "deepfake_percentage": (deepfake_count / total_verifications * 100) if total_verifications > 0 else 0,
+        "constituency_breakdown": [
+            {
+                "constituency": entry["name"] or "Unknown",
+                "total_videos": entry["total_videos"],
+                "deepfake_count": entry["deepfake_count"]
+            }
+            for entry in breakdowns["constituency"]
+        ],
+        "candidate_breakdown": [
+            {
+                "candidate_name": entry["name"] or "Unknown",
+                "total_videos": entry["total_videos"],
+                "deepfake_count": entry["deepfake_count"]
+            }
+            for entry in breakdowns["candidate"]
+        ]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the /statistics summary table")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_aggregates(db)
+        db.commit()
+        print(f"✅ Rebuilt statistics aggregates ({rows} summary rows)")
+    finally:
+        db.close()
@@ -25,7 +25,7 @@ function App() {
 
   const fetchStatistics = async () => {
     try {
-      const response = await fetch(buildApiUrl(API_ENDPOINTS.STATISTICS));
+      const response = await fetch(buildApiUrl(API_ENDPOINTS.STATISTICS), { credentials: 'include' });
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
@@ -46,7 +46,7 @@ function App() {
 
   const fetchVerificationHistory = async () => {
     try {
-      const response = await fetch(buildApiUrl(API_ENDPOINTS.VERIFICATIONS) + '?limit=1000');
+      const response = await fetch(buildApiUrl(API_ENDPOINTS.VERIFICATIONS) + '?limit=1000&view=summary', { credentials: 'include' });
       const data = await response.json();
       setVerificationHistory(data);
     } catch (error) {
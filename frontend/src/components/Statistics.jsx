@@ -27,7 +27,7 @@ const Statistics = ({ statistics, onRefresh }) => {
   useEffect(() => {
     const fetchVerificationHistory = async () => {
       try {
-        const response = await fetch(buildApiUrl(`${API_ENDPOINTS.VERIFICATIONS}?limit=100`));
+        const response = await fetch(buildApiUrl(`${API_ENDPOINTS.VERIFICATIONS}?limit=100&view=summary`), { credentials: 'include' });
         if (response.ok) {
           const data = await response.json();
           setVerificationHistory(data);
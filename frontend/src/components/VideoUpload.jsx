@@ -70,6 +70,7 @@ const VideoUpload = ({ onAnalysisComplete, onViewChange }) => {
     try {
       const response = await fetch(buildApiUrl(API_ENDPOINTS.USERS), {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
         },
@@ -118,6 +119,7 @@ const VideoUpload = ({ onAnalysisComplete, onViewChange }) => {
 
       const response = await fetch(buildApiUrl(API_ENDPOINTS.ANALYZE_VIDEO), {
         method: 'POST',
+        credentials: 'include',
         body: formData,
       });
 